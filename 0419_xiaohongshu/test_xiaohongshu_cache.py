@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+缓存模块的测试：过期和旧值返回、容量淘汰、缓存键，以及合并请求在调用方取消时的行为
+"""
+
+import asyncio
+
+import pytest
+
+import xiaohongshu_cache
+from xiaohongshu_cache import FRESH, MISS, STALE, SingleFlight, TTLCache, cache_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(xiaohongshu_cache.time, "monotonic", fake)
+    return fake
+
+def test_cache_fresh_stale_expired(clock):
+    cache = TTLCache(maxsize=10, ttl=10, stale_ttl=20)
+    cache.set("a", 1)
+    assert cache.get("a") == (1, FRESH)
+    clock.now += 10
+    assert cache.get("a") == (1, FRESH)
+    clock.now += 0.5
+    assert cache.get("a") == (1, STALE)
+    clock.now += 19.5
+    assert cache.get("a") == (1, STALE)
+    clock.now += 0.5
+    # 超过旧值保留时间后删除
+    assert cache.get("a") == (None, MISS)
+    assert len(cache) == 0
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (2, 2, 1)
+    assert stats["hit_ratio"] == 0.8
+
+def test_cache_set_refreshes_age(clock):
+    cache = TTLCache(maxsize=10, ttl=10, stale_ttl=0)
+    cache.set("a", 1)
+    clock.now += 8
+    cache.set("a", 2)
+    clock.now += 8
+    assert cache.get("a") == (2, FRESH)
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=10, stale_ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # 读取 a 后 b 成为最久未使用的条目
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") == (None, MISS)
+    assert cache.get("a") == (1, FRESH)
+    assert cache.get("c") == (3, FRESH)
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_stale_read_counts_as_use(clock):
+    cache = TTLCache(maxsize=2, ttl=1, stale_ttl=100)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    clock.now += 5
+    assert cache.get("a") == (1, STALE)
+    cache.set("c", 3)
+    assert cache.get("a") == (1, STALE)
+    assert cache.get("b") == (None, MISS)
+
+def test_cache_key_ignores_share_parameters():
+    note = "64f0c0a1000000001e03a1b2"
+    assert cache_key(f"https://www.xiaohongshu.com/explore/{note}?xsec_token=abc&source=share") == note
+    assert cache_key(f"https://www.xiaohongshu.com/discovery/item/{note.upper()}") == note
+    assert cache_key(f"https://www.xiaohongshu.com/user/profile/5f0a1b/{note}#comments") == note
+    assert cache_key("https://xhslink.com/a/AbCdEf/?from=app") == "xhslink.com/a/AbCdEf"
+
+def test_single_flight_coalesces():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return "page"
+
+        waiters = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert len(flight) == 1
+        release.set()
+        assert await asyncio.gather(*waiters) == ["page"] * 5
+        assert len(calls) == 1
+        assert len(flight) == 0
+        assert flight.stats()["coalesced"] == 4
+
+    asyncio.run(main())
+
+def test_single_flight_shares_errors():
+    async def main():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise RuntimeError("上游错误")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert results[0] is results[1]
+        # 出错的任务不会留下，下一次请求重新执行
+        assert len(flight) == 0
+
+    asyncio.run(main())
+
+def test_single_flight_cancelled_caller_does_not_cancel_others():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return "page"
+
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert first.cancelled()
+        release.set()
+        assert await second == "page"
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+def test_single_flight_survives_all_callers_cancelled():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        finished = []
+
+        async def fetch():
+            await release.wait()
+            finished.append(1)
+            return "page"
+
+        caller = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0)
+        # 进行中的任务仍然保留，后来的请求直接等待它，不重新发起
+        assert len(flight) == 1
+        later = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        release.set()
+        assert await later == "page"
+        assert finished == [1]
+        assert flight.stats()["calls"] == 1
+
+    asyncio.run(main())
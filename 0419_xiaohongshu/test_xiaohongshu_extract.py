@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+提取模块的测试：DOM 图片候选、图片变体去重、流式读取的提前停止、字段选择，以及初始状态和 DOM 两条路径的结果一致
+"""
+
+import os
+import json
+
+import pytest
+
+from xiaohongshu_extract import (
+    ALWAYS_FIELDS, FIELDS, HAS_LXML, IMG_PATTERN, SOURCE_DOM, SOURCE_STATE, STATE_END, STATE_MARKER,
+    ImageSet, PageScanner, PageTooLarge, canonical_image_key, clean_image_url,
+    extract_from_dom, extract_note, parse_fields, select_fields
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NOTE_URL = "https://www.xiaohongshu.com/explore/64f0c0a1000000001e03a1b2"
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(HERE, name), encoding="utf-8") as f:
+        return f.read()
+
+# DOM 图片候选
+
+BACKENDS = ("html.parser", "lxml") if HAS_LXML else ("html.parser",)
+
+STYLED_PAGE = """<html><head>
+<style>.cover { background-image: url(https://sns-img-qc.xhscdn.com/style01?imageView2/2/w/1080/format/jpg); }</style>
+<meta property="og:image" content="https://sns-img-qc.xhscdn.com/meta01.jpg">
+</head><body>
+<div class="content">原图 https://sns-img-qc.xhscdn.com/text01.jpg 见上</div>
+<p>前面<b>加粗</b>https://ci.xiaohongshu.com/tail01.png</p>
+<img src="https://sns-img-qc.xhscdn.com/img01.jpg">
+<script>var cover = "https://sns-img-qc.xhscdn.com/script01.webp";</script>
+</body></html>"""
+
+def full_document_images(html: str):
+    """
+    旧版对整个文档做正则匹配得到的图片
+    """
+    images = ImageSet()
+    for candidate in IMG_PATTERN.findall(html):
+        image_url = clean_image_url(candidate)
+        if image_url:
+            images.add(image_url)
+    return images.to_list()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_dom_images_from_style_and_text(backend):
+    images = extract_from_dom(STYLED_PAGE, NOTE_URL, backend)["images"]
+    assert sorted(images) == sorted([
+        "https://sns-img-qc.xhscdn.com/style01?imageView2/2/w/1080/format/jpg",
+        "https://sns-img-qc.xhscdn.com/meta01.jpg",
+        "https://sns-img-qc.xhscdn.com/text01.jpg",
+        "https://ci.xiaohongshu.com/tail01.png",
+        "https://sns-img-qc.xhscdn.com/img01.jpg",
+        "https://sns-img-qc.xhscdn.com/script01.webp"
+    ])
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("page", ("styled", "xiaohongshu_result.html"))
+def test_dom_images_cover_full_document_regex(backend, page):
+    html = STYLED_PAGE if page == "styled" else read_fixture(page)
+    # 单次遍历找到的图片至少包含旧版整页正则能找到的全部图片
+    assert set(full_document_images(html)) <= set(extract_from_dom(html, NOTE_URL, backend)["images"])
+
+# 图片变体
+
+def test_same_image_variants_share_key():
+    urls = [
+        "https://sns-webpic-qc.xhscdn.com/202401011200/abcdef/1040g2sg30ab!nd_prv_wlteh_webp_3",
+        "https://sns-webpic-qc.xhscdn.com/202402020800/123456/1040g2sg30ab!nd_dft_wlteh_webp_3",
+        "https://sns-img-qc.xhscdn.com/1040g2sg30ab.jpg",
+        "https://ci.xiaohongshu.com/1040g2sg30ab?imageView2/2/w/1080/format/jpg"
+    ]
+    assert {canonical_image_key(url)[0] for url in urls} == {"1040g2sg30ab"}
+
+def test_image_score_prefers_default_style_and_width():
+    prv = canonical_image_key("https://sns-webpic-qc.xhscdn.com/1/a/img1!nd_prv_wlteh_webp_3")
+    dft = canonical_image_key("https://sns-webpic-qc.xhscdn.com/1/a/img1!nd_dft_wlteh_webp_3")
+    other = canonical_image_key("https://sns-webpic-qc.xhscdn.com/1/a/img1!h5_1080jpg")
+    plain = canonical_image_key("https://sns-img-qc.xhscdn.com/img1")
+    assert other[1] < prv[1] < dft[1] < plain[1]
+
+    small = canonical_image_key("https://sns-img-qc.xhscdn.com/img1?imageView2/2/w/540/format/jpg")
+    large = canonical_image_key("https://sns-img-qc.xhscdn.com/img1?imageView2/2/w/1080/format/jpg")
+    thumb = canonical_image_key("https://sns-img-qc.xhscdn.com/img1?imageMogr2/thumbnail/720")
+    assert small[1] < thumb[1] < large[1] < plain[1]
+
+def test_non_cdn_url_keyed_by_itself():
+    url = "https://picasso-static.xiaohongshu.com/fe-platform/2213f0c2.png#top"
+    assert canonical_image_key(url) == ("https://picasso-static.xiaohongshu.com/fe-platform/2213f0c2.png", (0, 0))
+
+def test_empty_path_cdn_urls_stay_distinct():
+    # ci.xiaohongshu.com 上路径为空、只有处理参数的地址没有图片ID，不能都归到同一个键
+    urls = [
+        "https://ci.xiaohongshu.com/?imageMogr2/format/jpg/quality/92/auto-orient/strip/crop/450x300/gravity/center",
+        "https://ci.xiaohongshu.com/?imageMogr2/format/jpg/quality/92/auto-orient/strip/crop/300x300/gravity/center",
+        "https://ci.xiaohongshu.com?imageMogr2/format/webp/w/200"
+    ]
+    keys = [canonical_image_key(url)[0] for url in urls]
+    assert keys == urls
+    assert ImageSet(urls).to_list() == urls
+
+def test_image_set_replaces_variant_in_place():
+    images = ImageSet([
+        "https://sns-webpic-qc.xhscdn.com/1/a/first!nd_prv_wlteh_webp_3",
+        "https://sns-webpic-qc.xhscdn.com/1/a/second!nd_dft_wlteh_webp_3",
+        "https://sns-webpic-qc.xhscdn.com/2/b/first!nd_dft_wlteh_webp_3",
+        "https://sns-webpic-qc.xhscdn.com/3/c/second!nd_prv_wlteh_webp_3"
+    ])
+    # 更清晰的变体替换原来的地址，但保留首次出现的位置
+    assert images.to_list() == [
+        "https://sns-webpic-qc.xhscdn.com/2/b/first!nd_dft_wlteh_webp_3",
+        "https://sns-webpic-qc.xhscdn.com/1/a/second!nd_dft_wlteh_webp_3"
+    ]
+    assert len(images) == 2
+
+def test_image_set_keeps_first_of_equal_variants():
+    first = "https://sns-img-qc.xhscdn.com/img1?imageView2/2/w/1080/format/jpg"
+    images = ImageSet([first, "https://sns-img-bd.xhscdn.com/img1?imageView2/2/w/1080/format/webp"])
+    assert images.to_list() == [first]
+
+# 流式读取
+
+STATE = {"note": {"noteDetailMap": {"abc": {"note": {"title": "标题"}}}}}
+PAGE = (
+    "<html><head><script>var a = 1;</script>"
+    f"<script>{STATE_MARKER}{json.dumps(STATE, ensure_ascii=False)}{STATE_END}"
+    "<title>笔记</title></head><body>" + "正文" * 200 + "</body></html>"
+)
+
+def state_prefix(page: str) -> str:
+    return page[:page.index(STATE_END, page.index(STATE_MARKER)) + len(STATE_END)]
+
+def feed_chunks(scanner: PageScanner, chunks) -> int:
+    """
+    逐块喂给 scanner，返回停止时已喂入的块数
+    """
+    for count, chunk in enumerate(chunks, 1):
+        if scanner.feed(chunk):
+            return count
+    scanner.close()
+    return len(chunks)
+
+def split_at(data: bytes, *offsets: int):
+    bounds = [0, *offsets, len(data)]
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+@pytest.mark.parametrize("offset", range(1, len(STATE_MARKER)))
+def test_scanner_marker_split_across_chunks(offset):
+    data = PAGE.encode("utf-8")
+    start = data.index(STATE_MARKER.encode())
+    chunks = split_at(data, start + offset, len(data) - 50)
+    scanner = PageScanner()
+    assert feed_chunks(scanner, chunks) == 2
+    assert scanner.complete
+    assert scanner.text().startswith(state_prefix(PAGE))
+
+@pytest.mark.parametrize("offset", range(1, len(STATE_END)))
+def test_scanner_state_end_split_across_chunks(offset):
+    data = PAGE.encode("utf-8")
+    end = data.index(STATE_END.encode(), data.index(STATE_MARKER.encode()))
+    chunks = split_at(data, end + offset, len(data) - 50)
+    scanner = PageScanner()
+    # 第一块只有 </script> 的前半截，不能提前判定结束
+    assert not scanner.feed(chunks[0])
+    assert scanner.feed(chunks[1])
+    assert scanner.text() == PAGE[:len(scanner.text())]
+    assert scanner.text().startswith(state_prefix(PAGE))
+
+def test_scanner_ignores_script_end_before_marker():
+    data = PAGE.encode("utf-8")
+    marker = data.index(STATE_MARKER.encode())
+    scanner = PageScanner()
+    # 第一块里已有前一个脚本的 </script>，但还没有初始状态
+    assert not scanner.feed(data[:marker])
+    assert not scanner.feed(data[marker:marker + len(STATE_MARKER) + 5])
+
+@pytest.mark.parametrize("cut", (1, 2))
+def test_scanner_multibyte_split(cut):
+    data = PAGE.encode("utf-8")
+    # 在“标”字（3 字节）中间切开
+    char = data.index("标".encode("utf-8"))
+    scanner = PageScanner()
+    feed_chunks(scanner, split_at(data, char + cut))
+    assert scanner.complete
+    assert "�" not in scanner.text()
+    assert scanner.text().startswith(state_prefix(PAGE))
+
+def test_scanner_reads_bytewise():
+    data = PAGE.encode("utf-8")
+    scanner = PageScanner()
+    feed_chunks(scanner, [data[i:i + 1] for i in range(len(data))])
+    assert scanner.text() == state_prefix(PAGE)
+    assert scanner.bytes_read == len(state_prefix(PAGE).encode("utf-8"))
+
+def test_scanner_without_state_reads_to_end():
+    page = "<html><body>" + "没有初始状态" * 100 + "</body></html>"
+    data = page.encode("utf-8")
+    scanner = PageScanner()
+    assert feed_chunks(scanner, split_at(data, 7, 100, 301)) == 4
+    assert not scanner.complete
+    assert scanner.text() == page
+
+def test_scanner_full_page_mode():
+    data = PAGE.encode("utf-8")
+    scanner = PageScanner(stop_at_state=False)
+    feed_chunks(scanner, split_at(data, 10, len(data) // 2))
+    assert not scanner.complete
+    assert scanner.text() == PAGE
+
+def test_scanner_flushes_decoder_on_close():
+    data = "尾部".encode("utf-8")
+    scanner = PageScanner()
+    scanner.feed(data[:-1])
+    assert scanner.text() == "尾"
+    # 正文在多字节字符中间结束时，剩余字节在 close 时替换为 U+FFFD
+    scanner.close()
+    assert scanner.text() == "尾\ufffd"
+
+def test_scanner_other_encoding():
+    page = f"<script>{STATE_MARKER}{{\"a\": \"中文\"}}{STATE_END}<p>后面</p>"
+    data = page.encode("gbk")
+    scanner = PageScanner("gbk")
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+    feed_chunks(scanner, chunks)
+    assert scanner.complete
+    assert scanner.text().startswith(state_prefix(page))
+
+def test_scanner_size_limit():
+    scanner = PageScanner(max_bytes=100)
+    with pytest.raises(PageTooLarge):
+        scanner.check_length("101")
+    scanner.check_length("100")
+    scanner.check_length(None)
+    scanner.feed(b"x" * 60)
+    with pytest.raises(PageTooLarge):
+        scanner.feed(b"x" * 41)
+
+# 字段选择
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields("") is None
+    assert parse_fields("title") == frozenset({"title"})
+    assert parse_fields(" title , images ,") == frozenset({"title", "images"})
+    # url 和 source 总是返回，可以出现在请求中，但不计入需要提取的字段
+    assert parse_fields("url,source,author") == frozenset({"author"})
+    assert parse_fields("url") == frozenset()
+    # 请求全部字段等同于不指定
+    assert parse_fields(",".join(FIELDS)) is None
+    assert parse_fields(",".join(FIELDS + ALWAYS_FIELDS)) is None
+
+def test_parse_fields_rejects_unknown():
+    with pytest.raises(ValueError, match="likes"):
+        parse_fields("title,likes")
+
+def test_select_fields():
+    result = {"title": "t", "author": "a", "content": "c", "images": [], "url": "u", "source": SOURCE_STATE}
+    assert select_fields(result, None) is result
+    assert select_fields(result, frozenset({"title"})) == {"title": "t", "url": "u", "source": SOURCE_STATE}
+    assert select_fields(result, frozenset()) == {"url": "u", "source": SOURCE_STATE}
+
+def test_extract_only_requested_fields():
+    html = with_state("<html><head></head><body></body></html>", {"title": "标题", "desc": "正文"})
+    result = extract_note(html, NOTE_URL, fields=frozenset({"title"}))
+    assert result == {"title": "标题", "url": NOTE_URL, "source": SOURCE_STATE}
+
+# 初始状态与 DOM 的结果一致
+
+def with_state(html: str, note: dict) -> str:
+    """
+    在样例页面中插入包含同一篇笔记的初始状态脚本
+    """
+    state = {"note": {"currentNoteId": "64f0c0a1000000001e03a1b2", "noteDetailMap": {"64f0c0a1000000001e03a1b2": {"note": note}}}}
+    script = f"<script>{STATE_MARKER}{json.dumps(state, ensure_ascii=False)}{STATE_END}"
+    return html.replace("</head>", script + "</head>", 1)
+
+def test_fixture_dom_matches_saved_result():
+    html = read_fixture("xiaohongshu_result.html")
+    expected = json.loads(read_fixture("xiaohongshu_result.json"))
+    result = extract_note(html, NOTE_URL)
+    assert result["source"] == SOURCE_DOM
+    for name in ("title", "author", "content"):
+        assert result[name] == expected[name]
+    # 保存的结果来自旧版本，其中的 data: 图片和只有域名的地址现在会被过滤
+    kept = [url for url in expected["images"] if not url.startswith("data:") and url != "https://sns-webpic.xhscdn.com"]
+    assert result["images"] == kept
+
+def test_fixture_state_matches_dom():
+    html = read_fixture("xiaohongshu_result.html")
+    dom = extract_from_dom(html, NOTE_URL)
+    note = {
+        "title": dom["title"],
+        "desc": dom["content"],
+        "user": {"nickname": dom["author"]},
+        "imageList": [{"urlDefault": url} for url in dom["images"]]
+    }
+    state = extract_note(with_state(html, note), NOTE_URL)
+    assert state["source"] == SOURCE_STATE
+    assert {name: state[name] for name in FIELDS} == {name: dom[name] for name in FIELDS}
+    assert state["url"] == dom["url"] == NOTE_URL
+
+def test_fixture_state_prefix_is_enough():
+    html = with_state(read_fixture("xiaohongshu_result.html"), {"title": "提前停止", "desc": "正文", "imageList": []})
+    data = html.encode("utf-8")
+    scanner = PageScanner()
+    feed_chunks(scanner, [data[i:i + 512] for i in range(0, len(data), 512)])
+    assert scanner.complete
+    assert len(scanner.text()) < len(html)
+    result = extract_note(scanner.text(), NOTE_URL)
+    assert result["source"] == SOURCE_STATE
+    assert result["title"] == "提前停止"
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+任务队列的测试：逐条处理、取消后不再占用队列名额、重启后恢复未完成的任务
+"""
+
+import asyncio
+
+import pytest
+
+from xiaohongshu_jobs import CANCELLED, DONE, RUNNING, Job, JobQueue, JobStore, QueueFull
+
+async def echo(item, options):
+    await asyncio.sleep(0)
+    return {"input": item, "data": {"item": item}}
+
+async def wait_finished(job, timeout=1.0):
+    async def loop():
+        while not job.finished:
+            await job.wait(len(job.results), timeout)
+
+    await asyncio.wait_for(loop(), timeout)
+
+def test_submit_processes_every_item():
+    async def main():
+        queue = JobQueue(echo, workers=2, path="")
+        await queue.start()
+        try:
+            job = await queue.submit(["a", "b", "c"])
+            await wait_finished(job)
+            assert job.status == DONE
+            assert sorted(entry["input"] for entry in job.results) == ["a", "b", "c"]
+            assert queue.pending == 0
+        finally:
+            await queue.stop()
+
+    asyncio.run(main())
+
+def test_cancelled_job_releases_queue_slots():
+    async def main():
+        release = asyncio.Event()
+        started = []
+
+        async def blocked(item, options):
+            started.append(item)
+            await release.wait()
+            return {"input": item, "data": {"item": item}}
+
+        queue = JobQueue(blocked, workers=1, maxsize=3, path="")
+        await queue.start()
+        try:
+            first = await queue.submit(["a", "b", "c"])
+            await asyncio.sleep(0.01)
+            assert started == ["a"]
+            assert queue.pending == 2
+            with pytest.raises(QueueFull):
+                await queue.submit(["d", "e"])
+
+            await queue.cancel(first.id)
+            assert first.status == CANCELLED
+            # 取消任务剩下的两条不再计入，新任务可以占满队列
+            assert queue.pending == 0
+            second = await queue.submit(["d", "e", "f"])
+            assert queue.pending == 3
+            with pytest.raises(QueueFull):
+                await queue.submit(["g"])
+
+            release.set()
+            await wait_finished(second)
+            assert second.status == DONE
+            assert started == ["a", "d", "e", "f"]
+            assert queue.pending == 0
+            assert queue.stats()["pending"] == 0
+        finally:
+            await queue.stop()
+
+    asyncio.run(main())
+
+def test_restore_requeues_unfinished_items(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    job = Job(["a", "b", "c"], {}, status=RUNNING)
+    store.add(job)
+    store.add_result(job.id, {"index": 0, "input": "a", "data": {"item": "a"}})
+    store.close()
+
+    async def main():
+        queue = JobQueue(echo, workers=1, path=path)
+        await queue.start()
+        try:
+            restored = queue.get(job.id)
+            await wait_finished(restored)
+            assert restored.status == DONE
+            assert [entry["index"] for entry in restored.results] == [0, 1, 2]
+        finally:
+            await queue.stop()
+
+    asyncio.run(main())
+
+def test_restore_finishes_job_with_nothing_left(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    job = Job(["a", "b"], {}, status=RUNNING)
+    store.add(job)
+    # 两条结果都已写入，但退出前没来得及把状态改为 done
+    for index, item in enumerate(job.items):
+        store.add_result(job.id, {"index": index, "input": item, "data": {"item": item}})
+    store.close()
+
+    async def main():
+        queue = JobQueue(echo, workers=1, path=path)
+        await queue.start()
+        try:
+            restored = queue.get(job.id)
+            assert restored.status == DONE
+            assert restored.finished_at is not None
+            assert queue.pending == 0
+        finally:
+            await queue.stop()
+
+    asyncio.run(main())
+    store = JobStore(path)
+    try:
+        assert [saved.status for saved in store.load(3600)] == [DONE]
+    finally:
+        store.close()
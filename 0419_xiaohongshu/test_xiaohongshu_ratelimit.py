@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+限速模块的测试：AIMD 调整、同一轮限流只减速一次、Retry-After 的解析和等待、重试次数用尽后的错误
+"""
+
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from xiaohongshu_ratelimit import (
+    DECREASE_FACTOR, FATAL, OK, RATE_STEP, RETRY, THROTTLED,
+    HostLimiter, RateLimiter, UpstreamThrottled, parse_retry_after
+)
+
+class Throttled(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        self.retry_after = retry_after
+
+def classify(error):
+    if isinstance(error, Throttled):
+        return THROTTLED, error.retry_after
+    if isinstance(error, ConnectionError):
+        return RETRY, None
+    return FATAL, None
+
+def limiter(**options) -> HostLimiter:
+    defaults = dict(rate=100.0, burst=100.0, concurrency=4.0, min_rate=1.0, max_rate=1000.0, max_concurrency=64.0)
+    defaults.update(options)
+    return HostLimiter(**defaults)
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("-2") == 0.0
+    assert parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 28 <= parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+    earlier = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(earlier, usegmt=True)) == 0.0
+
+def test_additive_increase():
+    async def main():
+        host = limiter(rate=10.0, concurrency=4.0)
+        started = await host.acquire()
+        await host.release(started, OK)
+        assert host.rate == pytest.approx(10.0 + RATE_STEP / 10.0)
+        assert host.limit == pytest.approx(4.25)
+        assert host.in_flight == 0
+
+    asyncio.run(main())
+
+def test_increase_capped():
+    async def main():
+        host = limiter(rate=10.0, max_rate=10.0, concurrency=4.0, max_concurrency=4.0)
+        for _ in range(5):
+            await host.release(await host.acquire(), OK)
+        assert (host.rate, host.limit) == (10.0, 4.0)
+
+    asyncio.run(main())
+
+def test_multiplicative_decrease_once_per_round():
+    async def main():
+        host = limiter(rate=40.0, concurrency=8.0)
+        # 三个请求在减速前同时发出，都被限流时只减速一次
+        started = [await host.acquire() for _ in range(3)]
+        for start in started:
+            await host.release(start, THROTTLED)
+        assert host.rate == pytest.approx(40.0 * DECREASE_FACTOR)
+        assert host.limit == pytest.approx(8.0 * DECREASE_FACTOR)
+        assert host.throttled == 3
+
+        # 减速之后发出的请求再被限流，会继续减速
+        await asyncio.sleep(0.001)
+        await host.release(await host.acquire(), THROTTLED)
+        assert host.rate == pytest.approx(40.0 * DECREASE_FACTOR ** 2)
+
+    asyncio.run(main())
+
+def test_decrease_floors():
+    async def main():
+        host = limiter(rate=1.5, min_rate=1.0, concurrency=1.0)
+        await host.release(await host.acquire(), THROTTLED)
+        assert (host.rate, host.limit) == (1.0, 1.0)
+
+    asyncio.run(main())
+
+def test_retry_errors_do_not_change_rate():
+    async def main():
+        host = limiter(rate=10.0, concurrency=4.0)
+        await host.release(await host.acquire(), RETRY)
+        assert (host.rate, host.limit, host.errors) == (10.0, 4.0, 1)
+
+    asyncio.run(main())
+
+def test_retry_after_blocks_host():
+    async def main():
+        host = limiter()
+        await host.release(await host.acquire(), THROTTLED, retry_after=0.2)
+        assert host.stats()["blocked_for"] > 0.1
+        start = time.monotonic()
+        await host.acquire()
+        assert time.monotonic() - start >= 0.19
+
+    asyncio.run(main())
+
+def test_call_waits_retry_after_then_succeeds():
+    async def main():
+        limits = RateLimiter(rate=100.0, burst=100.0)
+        attempts = []
+
+        async def fetch():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise Throttled(retry_after=0.1)
+            return "ok"
+
+        assert await limits.call("example.com", fetch, classify, attempts=3, deadline=5) == "ok"
+        assert attempts[1] - attempts[0] >= 0.09
+        assert limits.retries == 1
+        stats = limits.stats()["hosts"]["example.com"]
+        assert (stats["throttled"], stats["successes"]) == (1, 1)
+
+    asyncio.run(main())
+
+def test_call_raises_upstream_throttled_when_out_of_attempts():
+    async def main():
+        limits = RateLimiter(rate=1000.0, burst=100.0)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            raise Throttled(retry_after=0.01)
+
+        with pytest.raises(UpstreamThrottled) as info:
+            await limits.call("example.com", fetch, classify, attempts=3, deadline=5)
+        assert info.value.retry_after == 0.01
+        assert isinstance(info.value.__cause__, Throttled)
+        assert len(calls) == 3
+
+    asyncio.run(main())
+
+def test_call_gives_up_when_retry_after_exceeds_deadline():
+    async def main():
+        limits = RateLimiter(rate=1000.0, burst=100.0)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            raise Throttled(retry_after=30)
+
+        with pytest.raises(UpstreamThrottled):
+            await limits.call("example.com", fetch, classify, attempts=5, deadline=1)
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+def test_call_fatal_error_not_retried():
+    async def main():
+        limits = RateLimiter(rate=1000.0, burst=100.0)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            raise ValueError("bad page")
+
+        with pytest.raises(ValueError):
+            await limits.call("example.com", fetch, classify, attempts=5, deadline=5)
+        assert len(calls) == 1
+        assert limits.retries == 0
+
+    asyncio.run(main())
+
+def test_call_retries_connection_errors():
+    async def main():
+        limits = RateLimiter(rate=1000.0, burst=100.0)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("reset")
+            return "ok"
+
+        assert await limits.call("example.com", fetch, classify, attempts=4, deadline=30) == "ok"
+        assert limits.retries == 2
+        assert limits.stats()["hosts"]["example.com"]["errors"] == 2
+
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+搜索模块的测试：中日韩文字的相邻两字切分、查询解析，以及与 FTS5 索引配合时的匹配结果和占位文字的处理
+"""
+
+import pytest
+
+from xiaohongshu_extract import DEFAULT_AUTHOR, DEFAULT_CONTENT, DEFAULT_TITLE
+from xiaohongshu_search import (
+    SearchIndex, index_text, index_tokens, make_snippet, match_expression,
+    parse_query, phrase_matches, run_tokens, split_runs
+)
+
+def test_split_runs():
+    assert split_runs("小红书Python教程2024") == ["小红书", "python", "教程", "2024"]
+    # 全角字母数字经 NFKC 规范化为半角
+    assert split_runs("ＡＢＣ１２３，你好！") == ["abc123", "你好"]
+    assert split_runs("snake_case") == ["snake", "case"]
+    assert split_runs("") == []
+    assert split_runs(None) == []
+
+def test_run_tokens_bigrams():
+    assert run_tokens("小红书") == ["小红", "红书"]
+    assert run_tokens("书") == ["书"]
+    assert run_tokens("python") == ["python"]
+    # 日文假名和韩文同样切成两字
+    assert run_tokens("カメラ") == ["カメ", "メラ"]
+    assert run_tokens("서울") == ["서울"]
+
+def test_index_tokens_add_final_char():
+    assert index_tokens("健身房") == ["健身", "身房", "房"]
+    assert index_tokens("猫") == ["猫"]
+    assert index_tokens("硬拉65kg") == ["硬拉", "拉", "65kg"]
+    assert index_text("小猫 cat") == "小猫 猫 cat"
+
+def test_parse_query():
+    assert parse_query("小红书 教程") == [(["小红", "红书"], False), (["教程"], False)]
+    # 单个中日韩文字用前缀匹配
+    assert parse_query("猫") == [(["猫"], True)]
+    assert parse_query("Python") == [(["python"], False)]
+    assert parse_query("，。") == []
+
+def test_match_expression():
+    assert match_expression(parse_query("小红书 猫")) == '"小红 红书" "猫"*'
+
+@pytest.mark.parametrize("query, expected", [
+    ("小猫", True),
+    ("猫", True),   # 单字出现在词尾
+    ("营", True),   # 单字出现在词首
+    ("救小", True),
+    ("小狗", False),
+    ("营救 小猫", True),
+    ("营救 小狗", False),
+    ("女人们", True),
+    ("大人", False)
+])
+def test_phrase_matches(query, expected):
+    text = "营救小猫是我们大女人们应该做的！"
+    assert phrase_matches(text, parse_query(query)) is expected
+
+def test_make_snippet():
+    text = "前面的内容" * 10 + "关键词" + "后面的内容" * 10
+    snippet = make_snippet(text, "关键词", size=20)
+    assert "关键词" in snippet
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert make_snippet("short", "missing", size=20) == "short"
+
+def test_index_search(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    try:
+        index.add("a", "https://www.xiaohongshu.com/explore/a", {
+            "title": "硬拉65kg在这一刻有了意义", "author": "健身达人", "content": "营救小猫是我们大女人们应该做的！"
+        })
+        index.add("b", "https://www.xiaohongshu.com/explore/b", {
+            "title": "周末去哪儿", "author": "旅行", "content": "小狗和小猫都很可爱"
+        })
+        assert {hit["url"][-1] for hit in index.search("小猫")} == {"a", "b"}
+        assert [hit["url"][-1] for hit in index.search("营救")] == ["a"]
+        assert [hit["url"][-1] for hit in index.search("狗")] == ["b"]
+        assert [hit["url"][-1] for hit in index.search("65KG")] == ["a"]
+        assert index.search("大象") == []
+    finally:
+        index.close()
+
+def test_placeholders_not_indexed(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    try:
+        index.add("a", "https://www.xiaohongshu.com/explore/a", {
+            "title": DEFAULT_TITLE, "author": DEFAULT_AUTHOR, "content": DEFAULT_CONTENT
+        })
+        index.add("b", "https://www.xiaohongshu.com/explore/b", {
+            "title": "找到宝藏咖啡店", "author": "未知作者的朋友", "content": DEFAULT_CONTENT
+        })
+        # 占位文字不参与检索，只命中真正包含这些词的笔记
+        assert [hit["url"][-1] for hit in index.search("未找到")] == []
+        assert [hit["url"][-1] for hit in index.search("作者")] == ["b"]
+        assert [hit["url"][-1] for hit in index.search("内容")] == []
+        assert [hit["url"][-1] for hit in index.search("咖啡")] == ["b"]
+    finally:
+        index.close()
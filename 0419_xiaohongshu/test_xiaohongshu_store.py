@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+页面存储的测试：压缩读写、过期判断，以及多线程读写时的计数
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from xiaohongshu_store import PageStore
+
+PAGE = "<html><body>" + "笔记正文" * 500 + "</body></html>"
+
+def test_put_get_round_trip(tmp_path):
+    store = PageStore(str(tmp_path / "pages.db"))
+    try:
+        store.put("note1", "https://www.xiaohongshu.com/explore/note1", PAGE, {"Content-Type": "text/html", "Set-Cookie": "a=b"})
+        html, meta = store.get("note1")
+        assert html == PAGE
+        assert meta["url"] == "https://www.xiaohongshu.com/explore/note1"
+        assert meta["status"] == 200
+        # 只保存白名单中的响应头
+        assert meta["headers"] == {"Content-Type": "text/html"}
+        stats = store.stats()
+        assert stats["pages"] == 1
+        assert stats["stored_bytes"] < stats["raw_bytes"]
+    finally:
+        store.close()
+
+def test_get_respects_max_age(tmp_path):
+    store = PageStore(str(tmp_path / "pages.db"))
+    try:
+        store.put("old", "u", PAGE, fetched_at=1.0)
+        assert store.get("old", max_age=60) is None
+        assert store.get("old") is not None
+        assert store.get("missing") is None
+        assert (store.hits, store.misses) == (1, 2)
+    finally:
+        store.close()
+
+def test_counters_exact_under_threads(tmp_path):
+    store = PageStore(str(tmp_path / "pages.db"))
+    try:
+        store.put("note1", "u", PAGE)
+
+        def read(i: int) -> None:
+            store.get("note1" if i % 2 else "missing")
+
+        with ThreadPoolExecutor(16) as pool:
+            list(pool.map(read, range(2000)))
+        stats = store.stats()
+        assert (stats["hits"], stats["misses"], stats["writes"]) == (1000, 1000, 1)
+    finally:
+        store.close()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记监控的测试：变化检测、验证码页和空页面不改动指纹，以及按主机限速
+"""
+
+import json
+import time
+
+import pytest
+import requests
+
+import xiaohongshu_watch
+from xiaohongshu_ratelimit import DECREASE_FACTOR, OK, THROTTLED
+from xiaohongshu_watch import CHANGED, ERROR, NEW, SAME_BODY, SAME_RESULT, HostPacer, Watchlist, check_note
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/64f0c0a1000000001e03a1b2"
+VERIFY_URL = "https://www.xiaohongshu.com/website-login/verify?redirectPath=%2Fexplore%2F64f0c0a1000000001e03a1b2"
+
+def note_page(desc: str) -> str:
+    state = {"note": {"noteDetailMap": {"64f0c0a1000000001e03a1b2": {"note": {"title": "标题", "desc": desc}}}}}
+    return f"<html><head><script>window.__INITIAL_STATE__={json.dumps(state, ensure_ascii=False)}</script></head></html>"
+
+class FakeResponse:
+    def __init__(self, text: str, status_code: int = 200, url: str = NOTE_URL, headers=None):
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers or {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+class FakeSession:
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses.pop(0)
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = FakeSession()
+    monkeypatch.setattr(xiaohongshu_watch, "get_bulk_session", lambda: fake)
+    return fake
+
+@pytest.fixture
+def watchlist(tmp_path):
+    watchlist = Watchlist(str(tmp_path / "watch.db"))
+    watchlist.add([NOTE_URL])
+    yield watchlist
+    watchlist.close()
+
+def check_and_record(watchlist: Watchlist) -> dict:
+    note = watchlist.due(now=time.time() + 10 ** 9)[0]
+    outcome = check_note(note)
+    watchlist.record(note, outcome)
+    return outcome
+
+def stored(watchlist: Watchlist) -> dict:
+    return watchlist.due(now=time.time() + 10 ** 9)[0]
+
+def test_new_then_changed(session, watchlist):
+    session.responses = [FakeResponse(note_page("第一版")), FakeResponse(note_page("第二版"))]
+    assert check_and_record(watchlist)["status"] == NEW
+    outcome = check_and_record(watchlist)
+    assert outcome["status"] == CHANGED
+    assert outcome["changes"] == {"content": {"old": "第一版", "new": "第二版"}}
+
+def test_unchanged_body_and_result(session, watchlist):
+    page = note_page("正文")
+    session.responses = [FakeResponse(page), FakeResponse(page), FakeResponse(page + "<!-- 动态参数 -->")]
+    assert check_and_record(watchlist)["status"] == NEW
+    assert check_and_record(watchlist)["status"] == SAME_BODY
+    assert check_and_record(watchlist)["status"] == SAME_RESULT
+
+@pytest.mark.parametrize("blocked", [
+    FakeResponse("<html><title>安全验证</title></html>", url=VERIFY_URL, headers={"ETag": "verify"}),
+    FakeResponse("<html><head><title>小红书</title></head><body>当前内容无法展示</body></html>", headers={"ETag": "empty"})
+])
+def test_blocked_page_keeps_baseline(session, watchlist, blocked):
+    session.responses = [FakeResponse(note_page("正文"), headers={"ETag": "v1"}), blocked, FakeResponse(note_page("正文"))]
+    assert check_and_record(watchlist)["status"] == NEW
+    before = stored(watchlist)
+
+    outcome = check_and_record(watchlist)
+    assert outcome["status"] == ERROR
+    assert set(outcome) == {"checked_at", "status", "error"}
+    after = stored(watchlist)
+    for name in ("etag", "body_hash", "result_hash", "result"):
+        assert after[name] == before[name]
+    assert after["changes"] == 0
+    assert after["last_error"]
+
+    # 风控解除后的正常页面与之前的结果相同，不算作变化
+    assert check_and_record(watchlist)["status"] in (SAME_BODY, SAME_RESULT)
+    assert session.requests[1][1] == {"If-None-Match": "v1"}
+
+def test_http_error_keeps_baseline(session, watchlist):
+    session.responses = [FakeResponse(note_page("正文")), FakeResponse("", status_code=503)]
+    check_and_record(watchlist)
+    before = stored(watchlist)
+    assert check_and_record(watchlist)["status"] == ERROR
+    assert stored(watchlist)["result_hash"] == before["result_hash"]
+
+def test_pacer_spaces_requests():
+    pacer = HostPacer(rate=20.0, burst=1.0, min_rate=1.0, max_rate=20.0)
+    start = time.monotonic()
+    for _ in range(3):
+        pacer.release("a.com", pacer.acquire("a.com"), OK)
+    # 令牌桶容量为 1，后两次请求各等待 1/20 秒
+    assert time.monotonic() - start >= 0.09
+    # 不同主机互不影响
+    start = time.monotonic()
+    pacer.acquire("b.com")
+    assert time.monotonic() - start < 0.05
+
+def test_pacer_decreases_once_per_round_and_honours_retry_after():
+    pacer = HostPacer(rate=40.0, burst=10.0, min_rate=1.0, max_rate=100.0)
+    started = [pacer.acquire("a.com") for _ in range(3)]
+    for begin in started:
+        pacer.release("a.com", begin, THROTTLED, retry_after=0.1)
+    assert pacer.stats()["a.com"]["rate"] == pytest.approx(40.0 * DECREASE_FACTOR)
+    assert pacer.stats()["a.com"]["blocked_for"] > 0.05
+    start = time.monotonic()
+    pacer.acquire("a.com")
+    assert time.monotonic() - start >= 0.09
+
+def test_check_note_reports_throttling_to_pacer(session, watchlist):
+    pacer = HostPacer(rate=40.0, burst=10.0, min_rate=1.0, max_rate=100.0)
+    session.responses = [FakeResponse("", status_code=461)]
+    note = stored(watchlist)
+    assert check_note(note, pacer=pacer)["status"] == ERROR
+    assert pacer.stats()["www.xiaohongshu.com"]["rate"] == pytest.approx(40.0 * DECREASE_FACTOR)
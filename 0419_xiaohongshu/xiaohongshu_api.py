@@ -1,21 +1,192 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import re
-import requests
-from bs4 import BeautifulSoup
+import math
+import time
+# 记录模块导入耗时，用于冷启动分析
+_IMPORT_STARTED = time.perf_counter()
+import asyncio
+import httpx
 from urllib.parse import urlparse
 import json
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, List
-import uvicorn
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field
+from typing import AbstractSet, Dict, Any, List, Optional, Tuple
+from xiaohongshu_cache import TTLCache, SingleFlight, cache_key, FRESH, STALE
+from xiaohongshu_extract import PageScanner, PageTooLarge, extract_note, is_captcha_url, parse_fields, select_fields
+from xiaohongshu_extract import MAX_PAGE_BYTES, SOURCE_DOM, THROTTLE_STATUS
+from xiaohongshu_jobs import JobQueue, QueueFull, JOB_MAX_ITEMS, JOB_MAX_WAIT, WORKER_PROCESSES
+from xiaohongshu_metrics import Registry, observe_request, observe_timings
+from xiaohongshu_profiling import StackSampler, is_admin, profile_call, MODES, CONTINUOUS_INTERVAL, TOP_N
+from xiaohongshu_resolve import ShortLinkResolver, is_short_link
+from xiaohongshu_search import SearchIndex, SEARCH_INDEX_PATH, SEARCH_LIMIT, SEARCH_MAX_LIMIT
+from xiaohongshu_store import PageStore, STORE_PATH, STORE_CACHE_TTL
+from xiaohongshu_ratelimit import RateLimiter, UpstreamThrottled, parse_retry_after, THROTTLED, RETRY, FATAL
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+# 请求头
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Cache-Control": "max-age=0",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+# 连接池与超时配置，可通过环境变量覆盖
+MAX_CONNECTIONS = int(os.getenv("XHS_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("XHS_MAX_KEEPALIVE_CONNECTIONS", "50"))
+KEEPALIVE_EXPIRY = float(os.getenv("XHS_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.getenv("XHS_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("XHS_READ_TIMEOUT", "15"))
+POOL_TIMEOUT = float(os.getenv("XHS_POOL_TIMEOUT", "10"))
+# 解析线程数，解析在线程池中执行，不阻塞事件循环
+PARSE_WORKERS = int(os.getenv("XHS_PARSE_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+# 结果缓存配置：容量、有效期、过期后仍可返回旧值的时间（秒）
+CACHE_SIZE = int(os.getenv("XHS_CACHE_SIZE", "5000"))
+CACHE_TTL = float(os.getenv("XHS_CACHE_TTL", "300"))
+CACHE_STALE_TTL = float(os.getenv("XHS_CACHE_STALE_TTL", "600"))
+# 流式抓取：边下载边查找初始状态，找到后停止读取，页面超过 MAX_PAGE_BYTES 时放弃
+STREAM_FETCH = os.getenv("XHS_STREAM_FETCH", "1") == "1"
+# 批量接口：单次最多条数、默认并发数、最大并发数
+BATCH_MAX_ITEMS = int(os.getenv("XHS_BATCH_MAX_ITEMS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("XHS_BATCH_CONCURRENCY", "20"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("XHS_BATCH_MAX_CONCURRENCY", "100"))
+
+# 启动时是否开启持续低频采样
+CONTINUOUS_PROFILING = os.getenv("XHS_PROFILE_CONTINUOUS", "0") == "1"
+# 预热：预先建立到该地址的连接数，地址设为空字符串时不预建连接
+WARMUP_URL = os.getenv("XHS_WARMUP_URL", "https://www.xiaohongshu.com/")
+WARMUP_CONNECTIONS = int(os.getenv("XHS_WARMUP_CONNECTIONS", "4"))
+WARMUP_TIMEOUT = float(os.getenv("XHS_WARMUP_TIMEOUT", "10"))
+# 预热时解析的示例页面，走 DOM 提取路径以导入解析器
+WARMUP_PAGE = (
+    '<html><head><title>预热 - 小红书</title></head><body>'
+    '<div class="author">作者：warmup</div><div class="content">预热页面</div>'
+    '<img src="https://sns-webpic-qc.xhscdn.com/warmup/image.jpg"></body></html>'
+)
+WARMUP_NOTE_URL = "https://www.xiaohongshu.com/explore/000000000000000000000000"
+
+# 按笔记ID缓存的提取结果
+result_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL)
+# 正在后台刷新的缓存键 -> 刷新任务
+_refreshing: Dict[str, asyncio.Task] = {}
+# 同一篇笔记同时到达的未命中请求只抓取一次
+inflight = SingleFlight()
+# 按上游主机限速，被限流时自动降速并重试
+rate_limiter = RateLimiter()
+# 分享短链接 -> 笔记链接，带有效期缓存
+resolver = ShortLinkResolver()
+
+# 指标：各阶段耗时、上游状态码、缓存和连接池状态，通过 /metrics 导出
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram(
+    "xhs_stage_seconds",
+    "提取流程各阶段耗时（秒）：url_extraction、fetch、parse 及其中的 title、author、images、content 等、serialization",
+    ("stage",)
+)
+REQUEST_SECONDS = metrics.histogram(
+    "xhs_request_seconds",
+    "接口总耗时（秒），包括返回错误和抛出异常的请求；status 为状态码，客户端断开时为 cancelled",
+    ("endpoint", "status")
+)
+UPSTREAM_RESPONSES = metrics.counter("xhs_upstream_responses_total", "上游响应数，status 为 error 表示连接失败或超时", ("host", "status"))
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    创建共享的异步 HTTP 客户端（长连接 + 连接池）
+    """
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            READ_TIMEOUT,
+            connect=CONNECT_TIMEOUT,
+            pool=POOL_TIMEOUT
+        )
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用启动时创建 HTTP 客户端和解析线程池，关闭时释放
+    """
+    app.state.http_client = create_http_client()
+    app.state.parse_executor = ThreadPoolExecutor(
+        max_workers=PARSE_WORKERS,
+        thread_name_prefix="xhs-parse"
+    )
+    app.state.sampler = StackSampler(interval=CONTINUOUS_INTERVAL).start() if CONTINUOUS_PROFILING else None
+    app.state.page_store = PageStore(STORE_PATH) if STORE_PATH else None
+    app.state.search_index = SearchIndex(SEARCH_INDEX_PATH) if SEARCH_INDEX_PATH else None
+    # 异步任务队列，工作协程与请求共用同一个事件循环、缓存和限速器
+    # 任务只保存在本进程中，多工作进程时请求可能落到别的进程，因此不启用
+    app.state.jobs = JobQueue(lambda item, options: run_job_item(app, item, options)) if WORKER_PROCESSES == 1 else None
+    if app.state.jobs:
+        await app.state.jobs.start()
+    app.state.startup = {"ready": False, "import_seconds": round(IMPORT_SECONDS, 6), "warmup_seconds": None, "warmup_errors": []}
+    # 预热在后台进行，期间 /health 已可访问，/ready 返回 503
+    warmup_task = asyncio.create_task(warm_up(app))
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        if app.state.jobs:
+            await app.state.jobs.stop()
+        if app.state.sampler:
+            app.state.sampler.stop()
+        if app.state.page_store:
+            # 排在已提交的保存任务之后关闭
+            await asyncio.get_running_loop().run_in_executor(app.state.parse_executor, app.state.page_store.close)
+        if app.state.search_index:
+            await asyncio.get_running_loop().run_in_executor(app.state.parse_executor, app.state.search_index.close)
+        await app.state.http_client.aclose()
+        app.state.parse_executor.shutdown(wait=False)
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    预热：在解析线程中解析一次示例页面（导入解析器），并预先建立到上游的连接
+
+    上游连接失败只记录错误，不影响就绪；服务仍可从缓存和页面存储返回结果。
+    """
+    start = time.perf_counter()
+    startup = app.state.startup
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(app.state.parse_executor, extract_note, WARMUP_PAGE, WARMUP_NOTE_URL)
+    except Exception as e:
+        startup["warmup_errors"].append(f"parse: {e}")
+    if WARMUP_URL and WARMUP_CONNECTIONS > 0:
+        client = app.state.http_client
+        results = await asyncio.gather(
+            *(client.head(WARMUP_URL, timeout=WARMUP_TIMEOUT) for _ in range(WARMUP_CONNECTIONS)),
+            return_exceptions=True
+        )
+        errors = {f"connect: {e.__class__.__name__}: {e}" for e in results if isinstance(e, Exception)}
+        startup["warmup_errors"].extend(sorted(errors))
+    startup["warmup_seconds"] = round(time.perf_counter() - start, 6)
+    startup["ready"] = True
+    print(f"预热完成，耗时 {startup['warmup_seconds']:.3f}s")
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title="小红书内容提取 API",
     description="提取小红书链接中的标题、作者、内容和图片",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 def extract_url(text: str) -> str:
@@ -26,147 +197,800 @@ def extract_url(text: str) -> str:
     urls = re.findall(url_pattern, text)
     return urls[0] if urls else text
 
+def extract_urls(text: str) -> List[str]:
+    """
+    从文本中提取所有URL
+    """
+    url_pattern = r"https?://[^\s<>\"]+|www\.[^\s<>\"]+?"
+    return re.findall(url_pattern, text)
+
+def parse_xiaohongshu(
+    html: str,
+    url: str,
+    timings: Dict[str, float] = None,
+    fields: Optional[AbstractSet[str]] = None
+) -> Dict[str, Any]:
+    """
+    从小红书页面 HTML 中解析信息，提供 timings 时记录各字段的提取耗时，提供 fields 时只提取其中的字段
+    """
+    return extract_note(html, url, timings=timings, fields=fields)
+
 def scrape_xiaohongshu(url: str) -> Dict[str, Any]:
     """
-    从小红书链接中提取信息
+    从小红书链接中提取信息（同步版本）
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-        "Cache-Control": "max-age=0",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1"
-    }
-    
+    import requests
     try:
         session = requests.Session()
-        response = session.get(url, headers=headers)
+        response = session.get(url, headers=HEADERS)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # 提取标题
-        title = None
-        title_selectors = [
-            'div#detail-title.title',
-            'div[data-v-610be4fa].title',
-            'div.title',
-            'meta[property="og:title"]',
-            'title'
-        ]
-        
-        for selector in title_selectors:
-            if selector.startswith('meta'):
-                element = soup.find('meta', property='og:title')
-                if element:
-                    title = element.get('content')
-                    break
+        return parse_xiaohongshu(response.text, url)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"提取内容时发生错误: {str(e)}")
+
+class CaptchaPage(Exception):
+    """
+    请求被重定向到了验证码页
+    """
+
+def classify_error(error: BaseException):
+    """
+    判断抓取错误是否可重试，返回 (结果分类, Retry-After 秒数)
+    """
+    if isinstance(error, CaptchaPage):
+        return THROTTLED, None
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status in THROTTLE_STATUS or status >= 500:
+            return THROTTLED, parse_retry_after(error.response.headers.get("Retry-After"))
+        return FATAL, None
+    if isinstance(error, httpx.TransportError):
+        return RETRY, None
+    return FATAL, None
+
+async def fetch_page(client: httpx.AsyncClient, url: str, limiter: RateLimiter = None) -> str:
+    """
+    使用共享客户端异步获取页面 HTML，提供 limiter 时按主机限速并重试
+    """
+    response = await fetch_response(client, url, limiter)
+    return response.text
+
+async def fetch_response(client: httpx.AsyncClient, url: str, limiter: RateLimiter = None) -> httpx.Response:
+    """
+    获取页面响应（含响应头），提供 limiter 时按主机限速并重试
+    """
+    host = urlparse(url).netloc
+
+    async def get() -> httpx.Response:
+        try:
+            response = await client.get(url)
+        except httpx.TransportError:
+            UPSTREAM_RESPONSES.inc(host, "error")
+            raise
+        UPSTREAM_RESPONSES.inc(host, str(response.status_code))
+        if is_captcha_url(response.url):
+            raise CaptchaPage(f"被重定向到验证码页: {response.url}")
+        response.raise_for_status()
+        return response
+
+    if limiter is None:
+        return await get()
+    return await limiter.call(host, get, classify_error)
+
+async def fetch_streamed(
+    client: httpx.AsyncClient,
+    url: str,
+    limiter: RateLimiter = None,
+    max_bytes: int = MAX_PAGE_BYTES,
+    stop_at_state: bool = True
+) -> Tuple[str, Dict[str, str], int, bool]:
+    """
+    流式获取页面，边下载边增量解码，读到完整的初始状态后立即停止
+
+    返回 (已读取的页面文本, 响应头, 状态码, 是否提前停止)；页面没有初始状态或
+    stop_at_state 为 False 时读到结束。内存占用不超过 max_bytes 对应的文本，超过时抛出 PageTooLarge。
+    """
+    host = urlparse(url).netloc
+
+    async def get() -> Tuple[str, Dict[str, str], int, bool]:
+        try:
+            async with client.stream("GET", url) as response:
+                UPSTREAM_RESPONSES.inc(host, str(response.status_code))
+                if is_captcha_url(response.url):
+                    raise CaptchaPage(f"被重定向到验证码页: {response.url}")
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                scanner = PageScanner(response.charset_encoding, max_bytes, stop_at_state)
+                scanner.check_length(response.headers.get("Content-Length"))
+                async for chunk in response.aiter_bytes():
+                    if scanner.feed(chunk):
+                        break
+                scanner.close()
+                return scanner.text(), dict(response.headers), response.status_code, scanner.complete
+        except httpx.TransportError:
+            UPSTREAM_RESPONSES.inc(host, "error")
+            raise
+
+    if limiter is None:
+        return await get()
+    return await limiter.call(host, get, classify_error)
+
+def _log_store_error(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"保存原始页面失败: {future.exception()}")
+
+def _log_index_error(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"写入搜索索引失败: {future.exception()}")
+
+async def scrape_xiaohongshu_async(
+    url: str,
+    client: httpx.AsyncClient,
+    executor: ThreadPoolExecutor = None,
+    store: PageStore = None,
+    fields: Optional[AbstractSet[str]] = None,
+    index: SearchIndex = None
+) -> Dict[str, Any]:
+    """
+    从小红书链接中提取信息（异步版本，解析在线程池中执行）
+
+    提供 store 时，抓取到的原始页面会在后台压缩保存，不增加本次请求的耗时；
+    提供 fields 时只提取其中的字段；提供 index 时完整的提取结果在后台写入搜索索引。
+    流式抓取在初始状态之后停止读取；初始状态中没有可用的笔记时，重新读取完整页面再走 DOM 提取，
+    不用截断的页面生成、缓存或保存结果。
+    """
+    try:
+        with STAGE_SECONDS.time("fetch"):
+            if STREAM_FETCH:
+                html, headers, status, truncated = await fetch_streamed(client, url, rate_limiter)
             else:
-                element = soup.select_one(selector)
-                if element:
-                    title = element.text.strip()
-                    break
-        
-        title = title if title else "未找到标题"
-        
-        # 提取作者信息
-        author = None
-        
-        # 1. 尝试完全匹配提供的HTML结构
-        name_links = soup.find_all('a', class_='name')
-        
-        for link in name_links:
-            username = link.find('span', class_='username')
-            if username:
-                author = username.text.strip()
-                break
-        
-        # 2. 如果没找到，尝试直接找所有username span
-        if not author:
-            all_username_spans = soup.find_all('span', class_='username')
-            for span in all_username_spans:
-                if span.text.strip():
-                    author = span.text.strip()
-                    break
-        
-        # 3. 尝试从页面内容中提取特定模式
-        if not author:
-            author_pattern = r'作者[：:]\s*([^\s<>"\']+)'
-            match = re.search(author_pattern, response.text)
-            if match:
-                author = match.group(1)
-        
-        author = author if author else "未知作者"
-        
-        # 提取图片
-        images = []
-        
-        # 使用正则表达式提取所有图片URL
-        img_pattern = r'https?://[^\s<>"\']+?(?:jpg|jpeg|png|webp)(?:[^\s<>"\'\);]*)'
-        found_urls = re.findall(img_pattern, response.text)
-        
-        # 清理和过滤URL
-        for url in found_urls:
-            # 清理URL，移除可能的后缀字符
-            url = re.sub(r'[;)]$', '', url)
-            # 只保留http/https链接，并确保URL包含完整的图片路径
-            if (url.startswith(('http://', 'https://')) and 
-                len(url.split('/')) > 3 and  # 确保URL包含路径部分
-                ('jpg' in url or 'jpeg' in url or 'png' in url or 'webp' in url)):  # 确保是图片URL
-                # 移除URL中的背景样式相关内容
-                url = url.split(');background')[0]
-                # 过滤掉头像和图标
-                if ('avatar' not in url.lower() and 
-                    'icon' not in url.lower() and 
-                    'logo' not in url.lower() and
-                    url not in images):
-                    images.append(url)
-        
-
-
-        # 提取文字内容
-        text_content = ""
-        content_selectors = [".content", ".note-content", ".desc", "article"]
-        for selector in content_selectors:
-            content = soup.select_one(selector)
-            if content:
-                text_content = content.get_text(strip=True)
-                break
-        
-        if not text_content:
-            text_content = "未找到文字内容"
-        
-        return {
-            "title": title,
-            "author": author,
-            "content": text_content,
-            "images": images[1:],
-            "url": url
-        }
-        
+                response = await fetch_response(client, url, rate_limiter)
+                html, headers, status, truncated = response.text, dict(response.headers), response.status_code, False
+                # 不再持有响应对象，释放原始字节
+                response = None
+        loop = asyncio.get_running_loop()
+        timings: Dict[str, float] = {}
+        with STAGE_SECONDS.time("parse"):
+            result = await loop.run_in_executor(executor, parse_xiaohongshu, html, url, timings, fields)
+        if truncated and result["source"] == SOURCE_DOM:
+            with STAGE_SECONDS.time("fetch"):
+                html, headers, status, _ = await fetch_streamed(client, url, rate_limiter, stop_at_state=False)
+            timings = {}
+            with STAGE_SECONDS.time("parse"):
+                result = await loop.run_in_executor(executor, parse_xiaohongshu, html, url, timings, fields)
+        observe_timings(STAGE_SECONDS, timings)
+        if store is not None:
+            loop.run_in_executor(
+                executor,
+                partial(store.put, cache_key(url), url, html, headers, status)
+            ).add_done_callback(_log_store_error)
+        if index is not None and fields is None:
+            loop.run_in_executor(
+                executor,
+                partial(index.add, cache_key(url), url, result)
+            ).add_done_callback(_log_index_error)
+        return result
+    except UpstreamThrottled as e:
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+        raise HTTPException(status_code=503, detail=f"上游限流，请稍后重试: {str(e)}", headers=headers)
+    except PageTooLarge as e:
+        raise HTTPException(status_code=502, detail=f"提取内容时发生错误: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"提取内容时发生错误: {str(e)}")
+
+async def scrape_profiled(
+    url: str,
+    app: FastAPI,
+    mode: str,
+    save: bool = False,
+    fields: Optional[AbstractSet[str]] = None
+) -> Dict[str, Any]:
+    """
+    分析单次提取：跳过缓存重新抓取，解析过程在分析器下执行，结果附带 profile 字段
+    """
+    try:
+        start = time.perf_counter()
+        html = await fetch_page(app.state.http_client, url, rate_limiter)
+        fetch_seconds = time.perf_counter() - start
+    except UpstreamThrottled as e:
+        raise HTTPException(status_code=503, detail=f"上游限流，请稍后重试: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"提取内容时发生错误: {str(e)}")
 
-# 只保留一个简单的API端点
+    loop = asyncio.get_running_loop()
+    result, report = await loop.run_in_executor(
+        app.state.parse_executor,
+        partial(profile_call, mode, parse_xiaohongshu, html, url, None, fields, save=save, name="xhs-parse")
+    )
+    report["fetch_seconds"] = round(fetch_seconds, 6)
+    report["html_bytes"] = len(html)
+    return {**result, "profile": report}
+
+def require_admin(token: str) -> None:
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="需要有效的管理员令牌（X-Admin-Token）")
+
+async def refresh_cache(key: str, url: str, app: FastAPI, fields: Optional[AbstractSet[str]] = None) -> None:
+    """
+    后台刷新过期的缓存条目，失败时保留旧值
+    """
+    try:
+        result = await scrape_xiaohongshu_async(
+            url,
+            app.state.http_client,
+            app.state.parse_executor,
+            app.state.page_store,
+            fields,
+            app.state.search_index
+        )
+        result_cache.set(key, result)
+    except Exception:
+        pass
+    finally:
+        _refreshing.pop(key, None)
+
+async def load_stored(key: str, url: str, app: FastAPI, fields: Optional[AbstractSet[str]] = None) -> Dict[str, Any]:
+    """
+    二级缓存：从原始页面存储中读取 STORE_CACHE_TTL 秒内抓取的页面并解析，没有时返回 None
+    """
+    store = app.state.page_store
+    if store is None:
+        return None
+    loop = asyncio.get_running_loop()
+    with STAGE_SECONDS.time("store"):
+        stored = await loop.run_in_executor(app.state.parse_executor, store.get, key, STORE_CACHE_TTL)
+    if stored is None:
+        return None
+    html, _ = stored
+    timings: Dict[str, float] = {}
+    with STAGE_SECONDS.time("parse"):
+        result = await loop.run_in_executor(app.state.parse_executor, parse_xiaohongshu, html, url, timings, fields)
+    observe_timings(STAGE_SECONDS, timings)
+    return result
+
+def fields_cache_key(key: str, fields: AbstractSet[str]) -> str:
+    """
+    只提取部分字段的结果单独缓存，键中带上排序后的字段名
+    """
+    return f"{key}#{','.join(sorted(fields))}"
+
+async def scrape_cached(url: str, app: FastAPI, fields: Optional[AbstractSet[str]] = None) -> Dict[str, Any]:
+    """
+    带缓存的提取：命中时跳过请求和解析，过期时先返回旧值再后台刷新；
+    结果缓存未命中时先查原始页面存储，再访问网络
+
+    提供 fields 时只提取其中的字段：已有完整结果时直接从中选取，否则按字段组合单独抓取和缓存。
+    """
+    key = cache_key(url)
+    if fields is not None:
+        cached, state = result_cache.get(key)
+        if state == FRESH:
+            return {**select_fields(cached, fields), "url": url}
+        key = fields_cache_key(key, fields)
+
+    cached, state = result_cache.get(key)
+    if state == STALE and key not in _refreshing:
+        _refreshing[key] = asyncio.create_task(refresh_cache(key, url, app, fields))
+    if state in (FRESH, STALE):
+        return {**cached, "url": url}
+
+    async def fetch() -> Dict[str, Any]:
+        result = await load_stored(cache_key(url), url, app, fields)
+        if result is None:
+            result = await scrape_xiaohongshu_async(
+                url,
+                app.state.http_client,
+                app.state.parse_executor,
+                app.state.page_store,
+                fields,
+                app.state.search_index
+            )
+        result_cache.set(key, result)
+        return result
+
+    result = await inflight.do(key, fetch)
+    return {**result, "url": url}
+
+async def resolve_url(url: str, app: FastAPI) -> str:
+    """
+    把分享短链接解析为笔记链接（每一跳都经过限速器），其他链接原样返回
+    """
+    return await resolver.resolve(
+        app.state.http_client,
+        url,
+        lambda host, fn: rate_limiter.call(host, fn, classify_error)
+    )
+
+def is_xiaohongshu_url(url: str) -> bool:
+    """
+    判断是否为小红书链接
+    """
+    return "xiaohongshu.com" in urlparse(url).netloc
+
+class BatchScrapeRequest(BaseModel):
+    """
+    批量提取请求体
+    """
+    urls: List[str] = Field(default_factory=list, description="小红书链接或包含链接的文本列表")
+    text: str = Field(None, description="包含多个链接的整段文本，例如多条分享文案")
+    concurrency: int = Field(None, ge=1, description="并发数，默认使用服务端配置")
+    fields: str = Field(None, description="只提取这些字段，逗号分隔：title、author、content、images；默认全部")
+
+async def scrape_batch(
+    urls: List[str],
+    app: FastAPI,
+    concurrency: int,
+    fields: Optional[AbstractSet[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    批量提取：去重后按并发上限抓取，单条失败不影响其他条目
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # 缓存键 -> 提取任务，同一篇笔记只抓取一次
+    tasks: Dict[str, asyncio.Future] = {}
+
+    async def run_one(url: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await scrape_cached(url, app, fields)
+
+    extracted_urls = [extract_url(item) for item in urls]
+    # 先并发解析全部短链接，同一篇笔记的短链接和长链接才能合并
+    resolved = await resolver.resolve_many(
+        app.state.http_client,
+        [url for url in extracted_urls if is_short_link(url)],
+        lambda host, fn: rate_limiter.call(host, fn, classify_error)
+    )
+
+    entries = []
+    for item, extracted_url in zip(urls, extracted_urls):
+        target = resolved.get(extracted_url, extracted_url)
+        if isinstance(target, Exception):
+            entries.append((item, extracted_url, None, f"短链接解析失败: {str(target)}"))
+            continue
+        extracted_url = target
+        if not is_xiaohongshu_url(extracted_url):
+            entries.append((item, extracted_url, None, "提供的URL不是小红书链接"))
+            continue
+        key = cache_key(extracted_url)
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(run_one(extracted_url))
+        entries.append((item, extracted_url, key, None))
+
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    results = []
+    for item, extracted_url, key, error in entries:
+        entry = {"input": item, "url": extracted_url}
+        if key is None:
+            entry["error"] = error
+        else:
+            task = tasks[key]
+            error = task.exception()
+            if error is None:
+                entry["data"] = {**task.result(), "url": extracted_url}
+            elif isinstance(error, HTTPException):
+                entry["error"] = error.detail
+            else:
+                entry["error"] = f"提取内容时发生错误: {str(error)}"
+        results.append(entry)
+    return results
+
+async def run_job_item(app: FastAPI, item: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    任务队列中的单条处理：解析短链接并提取，返回与批量接口相同格式的条目
+    """
+    url = extract_url(item)
+    entry = {"input": item, "url": url}
+    try:
+        if is_short_link(url):
+            url = await resolve_url(url, app)
+            entry["url"] = url
+    except Exception as e:
+        entry["error"] = f"短链接解析失败: {str(e)}"
+        return entry
+    if not is_xiaohongshu_url(url):
+        entry["error"] = "提供的URL不是小红书链接"
+        return entry
+    try:
+        entry["data"] = await scrape_cached(url, app, parse_fields(options.get("fields")))
+    except HTTPException as e:
+        entry["error"] = e.detail
+    except Exception as e:
+        entry["error"] = f"提取内容时发生错误: {str(e)}"
+    return entry
+
 @app.get("/scrape")
-async def scrape_endpoint(url: str = Query(..., description="小红书链接或包含链接的文本")):
+@observe_request(REQUEST_SECONDS, "/scrape")
+async def scrape_endpoint(
+    request: Request,
+    url: str = Query(..., description="小红书链接或包含链接的文本"),
+    profile: str = Query(None, description="分析本次解析：cprofile 或 sampling，需要管理员令牌"),
+    profile_save: bool = Query(False, description="同时把分析结果保存为文件"),
+    fields: str = Query(None, description="只提取这些字段，逗号分隔：title、author、content、images；默认全部"),
+    x_admin_token: str = Header(None)
+):
     """
     提取小红书内容的API端点
     """
-    extracted_url = extract_url(url)
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    # 分析请求需要管理员令牌，在解析短链接等任何上游请求之前检查
+    if profile:
+        require_admin(x_admin_token)
+        if profile not in MODES:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"profile 只能是 {', '.join(MODES)}"}
+            )
+    with STAGE_SECONDS.time("url_extraction"):
+        extracted_url = extract_url(url)
+
+    # 分享短链接先解析为笔记链接，解析过的短链接直接使用缓存
+    if is_short_link(extracted_url):
+        try:
+            with STAGE_SECONDS.time("resolve"):
+                extracted_url = await resolve_url(extracted_url, request.app)
+        except Exception as e:
+            return JSONResponse(
+                status_code=502,
+                content={"error": f"短链接解析失败: {str(e)}"}
+            )
+    valid = is_xiaohongshu_url(extracted_url)
     
     # 验证URL是否为小红书链接
-    if "xiaohongshu.com" not in urlparse(extracted_url).netloc:
+    if not valid:
         return JSONResponse(
             status_code=400,
             content={"error": "提供的URL不是小红书链接"}
         )
     
+    if profile:
+        # 解析短链接之后、开始抓取之前再检查一次
+        require_admin(x_admin_token)
+        return await scrape_profiled(extracted_url, request.app, profile, profile_save, selected)
+
     # 提取内容
-    result = scrape_xiaohongshu(extracted_url)
-    return result
+    result = await scrape_cached(extracted_url, request.app, selected)
+    with STAGE_SECONDS.time("serialization"):
+        response = JSONResponse(content=result)
+    return response
+
+@app.post("/scrape/batch")
+@observe_request(REQUEST_SECONDS, "/scrape/batch")
+async def batch_scrape_endpoint(request: Request, body: BatchScrapeRequest):
+    """
+    批量提取小红书内容的API端点，逐条返回结果或错误
+    """
+    urls = body.urls + (extract_urls(body.text) if body.text else [])
+    if not urls:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "未提供任何链接"}
+        )
+    if len(urls) > BATCH_MAX_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"单次最多提交 {BATCH_MAX_ITEMS} 条链接"}
+        )
+
+    try:
+        selected = parse_fields(body.fields)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+
+    concurrency = min(body.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    results = await scrape_batch(urls, request.app, concurrency, selected)
+    with STAGE_SECONDS.time("serialization"):
+        response = JSONResponse(content={
+            "total": len(results),
+            "succeeded": sum(1 for entry in results if "data" in entry),
+            "failed": sum(1 for entry in results if "error" in entry),
+            "results": results
+        })
+    return response
+
+JOBS_DISABLED = "任务队列只在单工作进程下可用，请以 -w 1 启动服务"
+
+class JobRequest(BaseModel):
+    """
+    异步任务请求体
+    """
+    urls: List[str] = Field(default_factory=list, description="小红书链接或包含链接的文本列表")
+    text: str = Field(None, description="包含多个链接的整段文本，例如多条分享文案")
+    fields: str = Field(None, description="只提取这些字段，逗号分隔：title、author、content、images；默认全部")
+
+@app.post("/jobs", status_code=202)
+async def submit_job_endpoint(request: Request, body: JobRequest):
+    """
+    提交异步任务，立即返回任务ID；队列已满时返回 429，多工作进程时返回 409
+    """
+    if request.app.state.jobs is None:
+        return JSONResponse(status_code=409, content={"error": JOBS_DISABLED})
+    urls = body.urls + (extract_urls(body.text) if body.text else [])
+    if not urls:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "未提供任何链接"}
+        )
+    if len(urls) > JOB_MAX_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"单个任务最多 {JOB_MAX_ITEMS} 条链接"}
+        )
+    try:
+        parse_fields(body.fields)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    try:
+        job = await request.app.state.jobs.submit(urls, {"fields": body.fields})
+    except QueueFull as e:
+        return JSONResponse(
+            status_code=429,
+            content={"error": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return {"job_id": job.id, "status": job.status, "total": len(job.items)}
+
+@app.get("/jobs/stats")
+async def job_stats_endpoint(request: Request):
+    """
+    查看任务队列状态
+    """
+    if request.app.state.jobs is None:
+        return JSONResponse(status_code=409, content={"error": JOBS_DISABLED})
+    return request.app.state.jobs.stats()
+
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(
+    request: Request,
+    job_id: str,
+    since: int = Query(0, ge=0, description="只返回第 since 条之后完成的结果，传入上次返回的 next"),
+    wait: float = Query(0, ge=0, description="长轮询：没有新结果时最多等待的秒数")
+):
+    """
+    查询任务状态和部分结果
+    """
+    if request.app.state.jobs is None:
+        return JSONResponse(status_code=409, content={"error": JOBS_DISABLED})
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "任务不存在或已过期"})
+    await job.wait(since, min(wait, JOB_MAX_WAIT))
+    return job.to_dict(since)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job_endpoint(request: Request, job_id: str):
+    """
+    取消任务，已完成的结果保留
+    """
+    if request.app.state.jobs is None:
+        return JSONResponse(status_code=409, content={"error": JOBS_DISABLED})
+    job = await request.app.state.jobs.cancel(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "任务不存在或已过期"})
+    return job.to_dict()
+
+@app.get("/health")
+async def health_endpoint():
+    """
+    存活探针：进程能处理请求即返回 200
+    """
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready_endpoint(request: Request):
+    """
+    就绪探针：预热完成前返回 503，同时返回导入和预热耗时
+    """
+    startup = request.app.state.startup
+    return JSONResponse(status_code=200 if startup["ready"] else 503, content=startup)
+
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    """
+    查看结果缓存的命中统计
+    """
+    return result_cache.stats()
+
+@app.get("/resolve/stats")
+async def resolve_stats_endpoint():
+    """
+    查看短链接解析缓存的命中统计，requests 为实际发出的跳转请求数
+    """
+    return resolver.stats()
+
+@app.get("/store/stats")
+async def store_stats_endpoint(request: Request):
+    """
+    查看原始页面存储的大小、压缩率和二级缓存命中统计
+    """
+    store = request.app.state.page_store
+    if store is None:
+        return JSONResponse(status_code=409, content={"error": "原始页面存储未启用"})
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app.state.parse_executor, store.stats)
+
+@app.get("/search")
+@observe_request(REQUEST_SECONDS, "/search")
+async def search_endpoint(
+    request: Request,
+    q: str = Query(..., min_length=1, description="关键词，多个关键词用空格分隔，全部出现才算命中"),
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0)
+):
+    """
+    在已提取的笔记中检索标题、作者和正文，按相关度排序
+    """
+    index = request.app.state.search_index
+    if index is None:
+        return JSONResponse(status_code=409, content={"error": "搜索索引未启用"})
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(request.app.state.parse_executor, index.search, q, limit, offset)
+    took = time.perf_counter() - start
+    return {"query": q, "took_ms": round(took * 1000, 3), "count": len(results), "results": results}
+
+@app.get("/search/stats")
+async def search_stats_endpoint(request: Request):
+    """
+    查看搜索索引的文档数和大小
+    """
+    index = request.app.state.search_index
+    if index is None:
+        return JSONResponse(status_code=409, content={"error": "搜索索引未启用"})
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app.state.parse_executor, index.stats)
+
+@app.get("/inflight/stats")
+async def inflight_stats_endpoint():
+    """
+    查看并发重复请求的合并统计，coalesced 为省下的上游抓取次数
+    """
+    return inflight.stats()
+
+@app.get("/ratelimit/stats")
+async def ratelimit_stats_endpoint():
+    """
+    查看各上游主机当前的速率、并发上限和限流次数
+    """
+    return rate_limiter.stats()
+
+def _pool_connections() -> Dict[tuple, int]:
+    """
+    httpx 连接池中空闲/使用中的连接数（读取 httpcore 内部状态，版本不兼容时不输出）
+    """
+    pool = app.state.http_client._transport._pool
+    idle = sum(1 for connection in pool.connections if connection.is_idle())
+    return {("idle",): idle, ("active",): len(pool.connections) - idle}
+
+metrics.gauge("xhs_http_pool_connections", "上游连接池中的连接数", _pool_connections, ("state",))
+metrics.gauge(
+    "xhs_startup_seconds",
+    "启动耗时（秒）：import 为模块导入，warmup 为后台预热",
+    lambda: {("import",): IMPORT_SECONDS, ("warmup",): app.state.startup["warmup_seconds"]},
+    ("phase",)
+)
+metrics.gauge("xhs_ready", "预热是否完成", lambda: {(): int(app.state.startup["ready"])})
+metrics.gauge(
+    "xhs_parse_queue_depth",
+    "等待解析线程的任务数",
+    lambda: {(): app.state.parse_executor._work_queue.qsize()}
+)
+metrics.gauge("xhs_job_queue_depth", "任务队列中等待处理的条目数", lambda: {(): app.state.jobs.pending})
+metrics.gauge(
+    "xhs_jobs",
+    "各状态的任务数",
+    lambda: {(status,): count for status, count in app.state.jobs.stats()["jobs"].items()},
+    ("status",)
+)
+metrics.gauge("xhs_cache_entries", "结果缓存条目数", lambda: {(): len(result_cache)})
+metrics.gauge(
+    "xhs_cache_lookups_total",
+    "结果缓存查询次数",
+    lambda: {
+        ("hit",): result_cache.hits,
+        ("stale",): result_cache.stale_hits,
+        ("miss",): result_cache.misses
+    },
+    ("result",),
+    type="counter"
+)
+metrics.gauge(
+    "xhs_store_lookups_total",
+    "原始页面存储（二级缓存）查询次数",
+    lambda: {("hit",): app.state.page_store.hits, ("miss",): app.state.page_store.misses},
+    ("result",),
+    type="counter"
+)
+metrics.gauge(
+    "xhs_short_link_resolutions_total",
+    "短链接解析次数：lookup 为总次数，cache_hit 为命中缓存，request 为实际发出的跳转请求",
+    lambda: {
+        ("lookup",): resolver.lookups,
+        ("cache_hit",): resolver.cache.hits,
+        ("request",): resolver.requests
+    },
+    ("kind",),
+    type="counter"
+)
+metrics.gauge("xhs_search_documents", "搜索索引中的笔记数", lambda: {(): app.state.search_index.documents})
+metrics.gauge("xhs_inflight_requests", "正在抓取的笔记数（合并后）", lambda: {(): len(inflight)})
+metrics.gauge(
+    "xhs_coalesced_requests_total",
+    "被合并到进行中请求的重复请求数",
+    lambda: {(): inflight.coalesced},
+    type="counter"
+)
+metrics.gauge(
+    "xhs_upstream_rate",
+    "各上游主机当前的限速（次/秒）",
+    lambda: {(host,): stats["rate"] for host, stats in rate_limiter.stats()["hosts"].items()},
+    ("host",)
+)
+metrics.gauge(
+    "xhs_upstream_concurrency_limit",
+    "各上游主机当前的并发上限",
+    lambda: {(host,): stats["concurrency_limit"] for host, stats in rate_limiter.stats()["hosts"].items()},
+    ("host",)
+)
+
+@app.post("/admin/profile/continuous")
+async def continuous_profile_endpoint(
+    request: Request,
+    enabled: bool = Query(..., description="开启或关闭持续采样"),
+    interval: float = Query(CONTINUOUS_INTERVAL, gt=0, description="采样间隔（秒）"),
+    x_admin_token: str = Header(None)
+):
+    """
+    开启或关闭持续低频采样，开启时清空之前累计的调用栈
+    """
+    require_admin(x_admin_token)
+    sampler = request.app.state.sampler
+    if sampler:
+        sampler.stop()
+        request.app.state.sampler = None
+    if enabled:
+        request.app.state.sampler = StackSampler(interval=interval).start()
+    return {"enabled": enabled, "interval": interval if enabled else None}
+
+@app.get("/admin/profile/stacks")
+async def profile_stacks_endpoint(
+    request: Request,
+    top: int = Query(TOP_N, ge=1),
+    format: str = Query("json", description="json 或 collapsed（折叠栈，可用于生成火焰图）"),
+    x_admin_token: str = Header(None)
+):
+    """
+    查看持续采样累计的热点函数和调用栈
+    """
+    require_admin(x_admin_token)
+    sampler = request.app.state.sampler
+    if sampler is None:
+        return JSONResponse(status_code=409, content={"error": "持续采样未开启"})
+    if format == "collapsed":
+        return PlainTextResponse(sampler.collapsed())
+    return {"running": sampler.running, "since": sampler.started_at, **sampler.report(top)}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    以 Prometheus 文本格式导出指标
+    """
+    return Response(content=metrics.render(), media_type=Registry.CONTENT_TYPE)
 
-# 启动服务器
+# 启动服务器，生产模式见 xiaohongshu_server.py
 if __name__ == "__main__":
-    uvicorn.run("xiaohongshu_api:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    from xiaohongshu_server import main
+    main()
\ No newline at end of file
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from urllib.parse import urlparse
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# 缓存状态
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+# 笔记ID为24位十六进制字符串，常见路径：
+#   /explore/<id>、/discovery/item/<id>、/user/profile/<uid>/<id>
+NOTE_ID_PATTERN = re.compile(r"/(?:explore|discovery/item|item|user/profile/[0-9a-zA-Z]+)/([0-9a-fA-F]{24})(?=[/?#]|$)")
+
+def extract_note_id(url: str) -> Optional[str]:
+    """
+    从小红书链接中提取笔记ID，提取不到时返回 None
+    """
+    match = NOTE_ID_PATTERN.search(urlparse(url).path)
+    return match.group(1).lower() if match else None
+
+def cache_key(url: str) -> str:
+    """
+    生成缓存键：优先使用笔记ID，忽略分享链接中的追踪参数
+    """
+    note_id = extract_note_id(url)
+    if note_id:
+        return note_id
+    parsed = urlparse(url)
+    return f"{parsed.netloc}{parsed.path}".rstrip("/")
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存，支持过期后在一段时间内返回旧值（stale-while-revalidate）
+    """
+
+    def __init__(self, maxsize: int = 5000, ttl: float = 300, stale_ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # key -> (value, stored_at)
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[Any, str]:
+        """
+        查询缓存，返回 (值, 状态)，状态为 FRESH、STALE 或 MISS
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age <= self.ttl:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, FRESH
+        if age <= self.ttl + self.stale_ttl:
+            self._data.move_to_end(key)
+            self.stale_hits += 1
+            return value, STALE
+
+        # 超过旧值保留时间，直接丢弃
+        del self._data[key]
+        self.misses += 1
+        return None, MISS
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目
+        """
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        返回命中率等统计信息
+        """
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
+
+class SingleFlight:
+    """
+    合并同一键上同时进行的请求：第一个请求执行，其余请求等待它的结果或错误
+    """
+
+    def __init__(self):
+        # 键 -> 正在执行的任务
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行 fn()，同一键已有进行中的任务时直接等待该任务
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        # 某个调用方断开时不取消共享的任务
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有调用方都已断开时，避免“异常未被获取”的警告
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.calls + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / requests, 4) if requests else 0.0
+        }
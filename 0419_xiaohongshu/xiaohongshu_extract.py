@@ -0,0 +1,712 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import time
+import codecs
+from importlib.util import find_spec
+from typing import AbstractSet, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# bs4 和 lxml 导入较慢，且大部分页面走初始状态路径用不到，首次构建解析树时才导入
+HAS_LXML = find_spec("lxml") is not None
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# 默认值
+DEFAULT_TITLE = "未找到标题"
+DEFAULT_AUTHOR = "未知作者"
+DEFAULT_CONTENT = "未找到文字内容"
+
+# 解析器后端：auto（优先 lxml）、lxml、html.parser
+PARSER_BACKEND = os.getenv("XHS_PARSER", "auto")
+
+# 页面内嵌的初始状态数据
+STATE_MARKER = "window.__INITIAL_STATE__="
+STATE_END = "</script>"
+# 流式读取页面时的大小上限（字节），超过时放弃
+MAX_PAGE_BYTES = int(os.getenv("XHS_MAX_PAGE_BYTES", str(8 * 1024 * 1024)))
+# 初始状态中的 undefined 不是合法 JSON，需要替换为 null
+UNDEFINED_PATTERN = re.compile(r'(?<=[:,\[])\s*undefined(?=\s*[,}\]])')
+
+# 提取路径
+SOURCE_STATE = "state"
+SOURCE_DOM = "dom"
+
+# 小红书风控时返回 461 或跳转到验证码页
+THROTTLE_STATUS = (429, 461)
+CAPTCHA_MARKERS = ("captcha", "website-login/verify")
+
+# 可按需提取的字段；url 和 source 总是返回
+FIELDS = ("title", "author", "content", "images")
+ALWAYS_FIELDS = ("url", "source")
+
+# 图片URL匹配
+IMG_PATTERN = re.compile(r'https?://[^\s<>"\']+?(?:jpg|jpeg|png|webp)(?:[^\s<>"\'\);]*)')
+JSON_IMG_PATTERN = re.compile(r'https?://.*?(?:jpg|jpeg|png|webp)')
+AUTHOR_PATTERN = re.compile(r'作者[：:]\s*([^\s<>"\']+)')
+# img 标签上可能存放图片地址的属性
+IMG_ATTRS = ("src", "data-src", "data-lazy", "data-original")
+# 不计入文本内容的标签
+SKIP_TEXT_TAGS = {"script", "style", "template"}
+# 内容单独匹配图片地址的标签，不按普通文本节点处理
+RAW_TEXT_TAGS = ("script", "style")
+# 需要过滤的头像、图标等
+IMAGE_EXCLUDES = ("avatar", "icon", "logo")
+
+class _LxmlTree:
+    """
+    lxml 解析树适配器
+    """
+
+    def __init__(self, html: str):
+        import lxml.html
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+        self.root = lxml.html.fromstring(html.encode("utf-8"), parser=parser)
+
+    def iter(self) -> Iterator[Any]:
+        for element in self.root.iter():
+            if isinstance(element.tag, str):
+                yield element
+
+    @staticmethod
+    def tag(element) -> str:
+        return element.tag
+
+    @staticmethod
+    def attrs(element) -> Dict[str, str]:
+        return element.attrib
+
+    @staticmethod
+    def classes(element) -> List[str]:
+        return element.get("class", "").split()
+
+    @staticmethod
+    def parent(element):
+        return element.getparent()
+
+    @staticmethod
+    def script_text(element) -> str:
+        return element.text or ""
+
+    @staticmethod
+    def text_nodes(element) -> Iterator[str]:
+        # 元素自身的文本和紧跟其后的文本，每段文本只属于一个元素
+        if element.text and element.tag not in RAW_TEXT_TAGS:
+            yield element.text
+        if element.tail:
+            yield element.tail
+
+    def close(self) -> None:
+        self.root = None
+
+    @classmethod
+    def strings(cls, element) -> Iterator[str]:
+        if element.text:
+            yield element.text
+        for child in element:
+            if isinstance(child.tag, str) and child.tag not in SKIP_TEXT_TAGS:
+                yield from cls.strings(child)
+            if child.tail:
+                yield child.tail
+
+class _SoupTree:
+    """
+    BeautifulSoup（html.parser）解析树适配器
+    """
+
+    def __init__(self, html: str):
+        from bs4 import BeautifulSoup
+        self.root = BeautifulSoup(html, "html.parser")
+
+    def iter(self) -> Iterator[Any]:
+        return iter(self.root.find_all(True))
+
+    @staticmethod
+    def tag(element) -> str:
+        return element.name
+
+    @staticmethod
+    def attrs(element) -> Dict[str, Any]:
+        return element.attrs
+
+    @staticmethod
+    def classes(element) -> List[str]:
+        return element.get("class") or []
+
+    @staticmethod
+    def parent(element):
+        return element.parent
+
+    @staticmethod
+    def script_text(element) -> str:
+        return element.string or ""
+
+    @staticmethod
+    def text_nodes(element) -> Iterator[str]:
+        # 元素的直接子文本节点（NavigableString 是 str 的子类）
+        if element.name in RAW_TEXT_TAGS:
+            return iter(())
+        return (child for child in element.children if isinstance(child, str))
+
+    @staticmethod
+    def strings(element) -> Iterator[str]:
+        return element.strings
+
+    def close(self) -> None:
+        # BeautifulSoup 节点之间有循环引用，要等垃圾回收才释放，这里主动拆除
+        self.root.decompose()
+        self.root = None
+
+_TREES = {
+    "lxml": _LxmlTree,
+    "html.parser": _SoupTree
+}
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """
+    确定使用的解析器后端，lxml 不可用时回退到 html.parser
+    """
+    backend = backend or PARSER_BACKEND
+    if backend == "auto":
+        backend = "lxml" if HAS_LXML else "html.parser"
+    if backend == "lxml" and not HAS_LXML:
+        backend = "html.parser"
+    if backend not in _TREES:
+        raise ValueError(f"不支持的解析器: {backend}")
+    return backend
+
+def build_tree(html: str, backend: Optional[str] = None):
+    """
+    构建解析树，lxml 解析失败（例如空文档）时回退到 html.parser
+    """
+    backend = resolve_backend(backend)
+    if backend == "lxml":
+        try:
+            return _LxmlTree(html)
+        except Exception:
+            pass
+    return _SoupTree(html)
+
+def clean_image_url(url: str) -> Optional[str]:
+    """
+    规范化图片URL，不是有效图片地址时返回 None
+    """
+    url = url.strip()
+    if url.startswith('//'):
+        url = 'https:' + url
+    elif url.startswith('/'):
+        url = 'https://www.xiaohongshu.com' + url
+    # 清理URL，移除可能的后缀字符和背景样式相关内容
+    url = re.sub(r'[;)]$', '', url)
+    url = url.split(');background')[0]
+    # 只保留http/https链接，并确保URL包含路径部分
+    if not url.startswith(('http://', 'https://')) or len(url.split('/')) <= 3:
+        return None
+    # 过滤掉头像和图标
+    lowered = url.lower()
+    if any(word in lowered for word in IMAGE_EXCLUDES):
+        return None
+    return url
+
+# 小红书图片CDN域名，同一张图片会以不同尺寸、格式出现
+CDN_HOSTS = ("xhscdn.com", "ci.xiaohongshu.com")
+# imageView2/imageMogr2 处理参数中的宽度
+WIDTH_PATTERN = re.compile(r'/(?:w|thumbnail)/(\d+)')
+# 图片样式后缀（!nd_dft_wlteh_webp_3 等）的清晰度排序：原图 > 默认 > 预览
+STYLE_RANKS = (("nd_dft", 2), ("nd_prv", 1))
+
+def canonical_image_key(url: str) -> Tuple[str, Tuple[int, int]]:
+    """
+    计算图片的规范键和清晰度评分，同一张图片的不同 CDN 变体得到相同的键
+    """
+    parts = urlsplit(url)
+    if not parts.netloc.endswith(CDN_HOSTS):
+        return url.split('#')[0], (0, 0)
+
+    # 路径最后一段是图片ID，去掉 !样式 后缀和扩展名；前面的时间戳、签名随请求变化
+    last = parts.path.rstrip('/').rsplit('/', 1)[-1]
+    image_id, _, style = last.partition('!')
+    image_id = image_id.rsplit('.', 1)[0]
+    if not image_id:
+        return url.split('#')[0], (0, 0)
+
+    style_rank = 3
+    if style:
+        style_rank = 0
+        for prefix, rank in STYLE_RANKS:
+            if style.startswith(prefix):
+                style_rank = rank
+                break
+    match = WIDTH_PATTERN.search(parts.query)
+    # 未指定宽度时视为原始尺寸
+    width = int(match.group(1)) if match else 1 << 30
+    return image_id, (style_rank, width)
+
+class ImageSet:
+    """
+    按插入顺序去重的图片集合，同一张图片只保留清晰度最高的变体
+    """
+
+    def __init__(self, urls: Iterable[str] = ()):
+        # 规范键 -> (评分, URL)，dict 保持首次插入的位置
+        self._items: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        for url in urls:
+            self.add(url)
+
+    def add(self, url: str) -> None:
+        key, score = canonical_image_key(url)
+        current = self._items.get(key)
+        if current is None or score > current[0]:
+            self._items[key] = (score, url)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[str]:
+        return (url for _, url in self._items.values())
+
+    def to_list(self) -> List[str]:
+        return list(self)
+
+def is_captcha_url(url: str) -> bool:
+    """
+    请求是否被重定向到了验证码页
+    """
+    path = urlsplit(str(url)).path
+    return any(marker in path for marker in CAPTCHA_MARKERS)
+
+def has_note(result: Dict[str, Any]) -> bool:
+    """
+    提取结果中是否有笔记：正文是占位默认值且没有图片时视为没有提取到笔记（验证码页、已删除的笔记等）
+
+    标题会回退到页面的 <title>，不能用来判断。
+    """
+    return result.get("content") not in (None, DEFAULT_CONTENT) or bool(result.get("images"))
+
+def parse_fields(value: Optional[str]) -> Optional[frozenset]:
+    """
+    解析逗号分隔的字段列表，为空时返回 None（表示全部字段），包含未知字段时抛出 ValueError
+    """
+    if not value:
+        return None
+    fields = frozenset(name.strip() for name in value.split(",") if name.strip())
+    unknown = fields - set(FIELDS) - set(ALWAYS_FIELDS)
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(sorted(unknown))}，可选: {', '.join(FIELDS)}")
+    fields &= set(FIELDS)
+    return None if fields >= set(FIELDS) else fields
+
+def select_fields(result: Dict[str, Any], fields: Optional[AbstractSet[str]]) -> Dict[str, Any]:
+    """
+    只保留请求的字段，fields 为 None 时原样返回
+    """
+    if fields is None:
+        return result
+    return {name: value for name, value in result.items() if name in fields or name in ALWAYS_FIELDS}
+
+def _lap(timings: Optional[Dict[str, float]], stage: str, start: float) -> float:
+    """
+    把从 start 到现在的耗时累加到 timings[stage]，返回当前时间作为下一阶段的起点
+    """
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + now - start
+    return now
+
+def _walk_json_images(obj: Any, found: List[str]) -> None:
+    """
+    递归搜索 JSON 数据中的图片URL
+    """
+    if isinstance(obj, str):
+        if JSON_IMG_PATTERN.match(obj):
+            found.append(obj)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            _walk_json_images(value, found)
+    elif isinstance(obj, list):
+        for item in obj:
+            _walk_json_images(item, found)
+
+class PageTooLarge(Exception):
+    """
+    页面超过大小上限
+    """
+
+class PageScanner:
+    """
+    逐块接收页面字节并增量解码，读到完整的初始状态脚本后即可停止读取
+
+    feed 在初始状态脚本结束时返回 True，调用方据此停止下载；没有初始状态的页面会读到结束，
+    累计超过 max_bytes 时抛出 PageTooLarge。只保留已解码的文本块，不保留原始字节。
+    stop_at_state 为 False 时不查找初始状态，始终读到结束（初始状态不可用、需要完整页面时）。
+    """
+
+    def __init__(self, encoding: Optional[str] = None, max_bytes: int = MAX_PAGE_BYTES, stop_at_state: bool = True):
+        try:
+            decoder = codecs.getincrementaldecoder(encoding or "utf-8")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")
+        self._decoder = decoder(errors="replace")
+        self.max_bytes = max_bytes
+        self.stop_at_state = stop_at_state
+        self.bytes_read = 0
+        self.complete = False
+        self._chunks: List[str] = []
+        self._length = 0
+        # 上一块末尾保留的字符，用于匹配跨块的标记
+        self._carry = ""
+        self._state_found = False
+
+    def check_length(self, content_length: Optional[str]) -> None:
+        """
+        响应头声明的长度已超过上限时，不读取正文直接放弃
+        """
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise PageTooLarge(f"页面大小 {content_length} 字节超过上限 {self.max_bytes} 字节")
+
+    def feed(self, data: bytes) -> bool:
+        if self.complete:
+            return True
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise PageTooLarge(f"页面超过大小上限 {self.max_bytes} 字节")
+        text = self._decoder.decode(data)
+        if not text:
+            return False
+        self._chunks.append(text)
+        self._length += len(text)
+        if not self.stop_at_state:
+            return False
+
+        window = self._carry + text
+        if not self._state_found:
+            index = window.find(STATE_MARKER)
+            if index == -1:
+                self._carry = window[-(len(STATE_MARKER) - 1):]
+                return False
+            self._state_found = True
+            window = window[index + len(STATE_MARKER):]
+        if STATE_END in window:
+            self.complete = True
+            return True
+        self._carry = window[-(len(STATE_END) - 1):]
+        return False
+
+    def close(self) -> None:
+        """
+        正文读完，刷新解码器中剩余的字节
+        """
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._chunks.append(tail)
+            self._length += len(tail)
+
+    def text(self) -> str:
+        """
+        已读取的页面文本；提前停止时是包含完整初始状态的前缀
+        """
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+def find_state_blob(html: str) -> Optional[str]:
+    """
+    用字符串查找定位 window.__INITIAL_STATE__ 数据，找不到时返回 None
+    """
+    start = html.find(STATE_MARKER)
+    if start == -1:
+        return None
+    start += len(STATE_MARKER)
+    end = html.find(STATE_END, start)
+    if end == -1:
+        return None
+    blob = html[start:end].strip().rstrip(";")
+    return blob or None
+
+def _pick_note(state: Dict[str, Any], url: str) -> Optional[Dict[str, Any]]:
+    """
+    从初始状态中找到笔记数据，兼容 PC 端和移动端两种结构
+    """
+    note_state = state.get("note") or {}
+    detail_map = note_state.get("noteDetailMap") or {}
+    if detail_map:
+        # 优先使用链接中的笔记ID，其次是当前笔记ID
+        keys = [key for key in detail_map if key and key in url]
+        current = note_state.get("currentNoteId") or note_state.get("firstNoteId")
+        if current:
+            keys.append(current)
+        keys.extend(detail_map)
+        for key in keys:
+            note = (detail_map.get(key) or {}).get("note")
+            if note:
+                return note
+
+    # 移动端：noteData.data.noteData
+    note = ((state.get("noteData") or {}).get("data") or {}).get("noteData")
+    if note:
+        return note
+    return None
+
+def _note_image_urls(note: Dict[str, Any]) -> List[str]:
+    """
+    从笔记数据中取出每张图片的地址
+    """
+    urls = []
+    for image in note.get("imageList") or []:
+        if not isinstance(image, dict):
+            continue
+        url = image.get("urlDefault") or image.get("url")
+        if not url:
+            for info in image.get("infoList") or []:
+                if info.get("url"):
+                    url = info["url"]
+                    break
+        if url:
+            urls.append(url)
+    return urls
+
+def extract_from_state(
+    html: str,
+    url: str,
+    timings: Optional[Dict[str, float]] = None,
+    fields: Optional[AbstractSet[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    从页面内嵌的初始状态 JSON 直接得到结果，不解析 DOM；数据缺失时返回 None
+
+    提供 fields 时只提取其中的字段。
+    """
+    wanted = FIELDS if fields is None else fields
+    t = time.perf_counter()
+    blob = find_state_blob(html)
+    if blob is None:
+        _lap(timings, "state", t)
+        return None
+    try:
+        state = _json_loads(UNDEFINED_PATTERN.sub("null", blob))
+    except ValueError:
+        _lap(timings, "state", t)
+        return None
+    if not isinstance(state, dict):
+        _lap(timings, "state", t)
+        return None
+
+    note = _pick_note(state, url)
+    t = _lap(timings, "state", t)
+    if not note:
+        return None
+
+    result: Dict[str, Any] = {}
+    if "title" in wanted:
+        result["title"] = note.get("title") or DEFAULT_TITLE
+        t = _lap(timings, "title", t)
+    if "author" in wanted:
+        user = note.get("user") or {}
+        result["author"] = user.get("nickname") or user.get("nickName") or user.get("name") or DEFAULT_AUTHOR
+        t = _lap(timings, "author", t)
+    if "content" in wanted:
+        result["content"] = note.get("desc") or DEFAULT_CONTENT
+        t = _lap(timings, "content", t)
+    if "images" in wanted:
+        images = ImageSet()
+        for candidate in _note_image_urls(note):
+            image_url = clean_image_url(candidate)
+            if image_url:
+                images.add(image_url)
+        result["images"] = images.to_list()
+        _lap(timings, "images", t)
+
+    result["url"] = url
+    result["source"] = SOURCE_STATE
+    return result
+
+def extract_note(
+    html: str,
+    url: str,
+    backend: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    fields: Optional[AbstractSet[str]] = None
+) -> Dict[str, Any]:
+    """
+    提取笔记信息：优先使用内嵌的初始状态 JSON，缺失时再解析 DOM
+
+    提供 timings 时，各阶段耗时（秒）会累加到其中；提供 fields 时只提取并返回其中的字段。
+    """
+    result = extract_from_state(html, url, timings, fields)
+    if result is not None:
+        return result
+    return extract_from_dom(html, url, backend, timings, fields)
+
+def extract_from_dom(
+    html: str,
+    url: str,
+    backend: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    fields: Optional[AbstractSet[str]] = None
+) -> Dict[str, Any]:
+    """
+    一次遍历解析树，同时提取标题、作者、正文和图片
+
+    标题、作者、正文、图片的候选元素在同一次遍历（walk 阶段）中收集，
+    各字段阶段只计算从候选中确定最终值的耗时。未请求的字段不收集候选，
+    不需要图片时跳过最耗时的属性、样式、文本和 script 图片匹配。
+    """
+    wanted = FIELDS if fields is None else fields
+    want_title = "title" in wanted
+    want_author = "author" in wanted
+    want_content = "content" in wanted
+    want_images = "images" in wanted
+    t = time.perf_counter()
+    tree = build_tree(html, backend)
+    t = _lap(timings, "tree", t)
+
+    # 各字段按选择器优先级记录第一个匹配的元素，数值越小优先级越高
+    # 标题：div#detail-title.title > div[data-v-610be4fa].title > div.title > og:title > title
+    titles: Dict[int, Any] = {}
+    # 正文：.content > .note-content > .desc > article
+    contents: Dict[int, Any] = {}
+    # 作者：a.name 内的 span.username > 任意非空 span.username
+    author_in_link = None
+    author_any = None
+    candidates: List[str] = []
+
+    for element in tree.iter():
+        tag = tree.tag(element)
+        attrs = tree.attrs(element)
+        classes = tree.classes(element)
+
+        # 标题
+        if not want_title:
+            pass
+        elif "title" in classes and tag == "div":
+            if attrs.get("id") == "detail-title":
+                titles.setdefault(0, element)
+            elif "data-v-610be4fa" in attrs:
+                titles.setdefault(1, element)
+            titles.setdefault(2, element)
+        elif tag == "meta" and attrs.get("property") == "og:title":
+            titles.setdefault(3, element)
+        elif tag == "title":
+            titles.setdefault(4, element)
+
+        # 正文
+        if want_content:
+            if classes:
+                if "content" in classes:
+                    contents.setdefault(0, element)
+                if "note-content" in classes:
+                    contents.setdefault(1, element)
+                if "desc" in classes:
+                    contents.setdefault(2, element)
+            if tag == "article":
+                contents.setdefault(3, element)
+
+        # 作者
+        if want_author and tag == "span" and "username" in classes and author_in_link is None:
+            text = "".join(tree.strings(element)).strip()
+            parent = tree.parent(element)
+            while parent is not None:
+                if tree.tag(parent) == "a" and "name" in tree.classes(parent):
+                    author_in_link = text
+                    break
+                parent = tree.parent(parent)
+            if author_any is None and text:
+                author_any = text
+
+        if not want_images:
+            continue
+
+        # 图片：img 标签属性与 data-xhs-img 属性
+        if tag == "img":
+            for name in IMG_ATTRS:
+                value = attrs.get(name)
+                if value and value.strip():
+                    candidates.append(value)
+        value = attrs.get("data-xhs-img")
+        if value:
+            candidates.append(value)
+        # 其他属性中出现的图片地址（例如 style 背景图、og:image）
+        for name, value in attrs.items():
+            if isinstance(value, str) and name not in IMG_ATTRS and "http" in value:
+                candidates.extend(IMG_PATTERN.findall(value))
+        # <style> 中的背景图和文本节点中直接写出的图片地址
+        if tag == "style":
+            text = tree.script_text(element)
+            if "http" in text:
+                candidates.extend(IMG_PATTERN.findall(text))
+        for text in tree.text_nodes(element):
+            if "http" in text:
+                candidates.extend(IMG_PATTERN.findall(text))
+
+        # script 中的图片地址
+        if tag == "script":
+            text = tree.script_text(element)
+            if not text:
+                continue
+            if attrs.get("type") == "application/json":
+                try:
+                    _walk_json_images(json.loads(text), candidates)
+                except ValueError:
+                    pass
+            candidates.extend(IMG_PATTERN.findall(text))
+
+    t = _lap(timings, "walk", t)
+    result: Dict[str, Any] = {}
+
+    # 标题
+    if want_title:
+        title = None
+        if titles:
+            element = titles[min(titles)]
+            if tree.tag(element) == "meta":
+                title = tree.attrs(element).get("content")
+            else:
+                title = "".join(tree.strings(element)).strip()
+        result["title"] = title if title else DEFAULT_TITLE
+        t = _lap(timings, "title", t)
+
+    # 作者
+    if want_author:
+        author = author_in_link or author_any
+        if not author and "作者" in html:
+            match = AUTHOR_PATTERN.search(html)
+            if match:
+                author = match.group(1)
+        result["author"] = author if author else DEFAULT_AUTHOR
+        t = _lap(timings, "author", t)
+
+    # 正文
+    if want_content:
+        text_content = ""
+        if contents:
+            element = contents[min(contents)]
+            text_content = "".join(s.strip() for s in tree.strings(element))
+        result["content"] = text_content if text_content else DEFAULT_CONTENT
+        t = _lap(timings, "content", t)
+
+    # 之后只用到字符串，立即释放解析树
+    element = None
+    titles.clear()
+    contents.clear()
+    tree.close()
+
+    # 图片去重
+    if want_images:
+        images = ImageSet()
+        for candidate in candidates:
+            image_url = clean_image_url(candidate)
+            if image_url:
+                images.add(image_url)
+        result["images"] = images.to_list()
+        _lap(timings, "images", t)
+
+    result["url"] = url
+    result["source"] = SOURCE_DOM
+    return result
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import asyncio
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    # 同步版本只在命令行批量模式中使用，服务启动时不导入 requests
+    import requests
+
+from xiaohongshu_cache import TTLCache, SingleFlight, FRESH, extract_note_id
+
+# 分享短链接域名
+SHORT_LINK_HOSTS = ("xhslink.com",)
+# 短链接 -> 目标链接 的缓存：容量、有效期（秒）
+RESOLVE_CACHE_SIZE = int(os.getenv("XHS_RESOLVE_CACHE_SIZE", "20000"))
+RESOLVE_TTL = float(os.getenv("XHS_RESOLVE_TTL", "86400"))
+# 最多跟随的跳转次数、单次请求超时（秒）
+MAX_REDIRECTS = int(os.getenv("XHS_RESOLVE_MAX_REDIRECTS", "5"))
+RESOLVE_TIMEOUT = float(os.getenv("XHS_RESOLVE_TIMEOUT", "5"))
+# 不支持 HEAD 时改用 GET（只读响应头，不下载正文）
+HEAD_UNSUPPORTED = (405, 501)
+
+class ShortLinkError(Exception):
+    """
+    短链接无法解析到笔记链接
+    """
+
+def is_short_link(url: str) -> bool:
+    """
+    判断是否为小红书分享短链接
+    """
+    netloc = urlparse(url).netloc.lower()
+    return any(netloc == host or netloc.endswith("." + host) for host in SHORT_LINK_HOSTS)
+
+def _next_location(url: str, status: int, headers: Any) -> Optional[str]:
+    if status in (301, 302, 303, 307, 308) and headers.get("location"):
+        return urljoin(url, headers["location"])
+    return None
+
+class ShortLinkResolver:
+    """
+    用 HEAD 请求逐跳跟随短链接跳转，直到链接中出现笔记ID
+
+    结果按短链接缓存 RESOLVE_TTL 秒，再次解析同一短链接不访问网络；
+    同时解析同一短链接的请求只发出一组请求。
+    """
+
+    def __init__(self, maxsize: int = RESOLVE_CACHE_SIZE, ttl: float = RESOLVE_TTL, max_redirects: int = MAX_REDIRECTS):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, stale_ttl=0)
+        self.max_redirects = max_redirects
+        self.inflight = SingleFlight()
+        self.lookups = 0
+        self.requests = 0
+
+    async def resolve(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        call: Callable[[str, Callable[[], Awaitable[Any]]], Awaitable[Any]] = None
+    ) -> str:
+        """
+        解析短链接，返回带笔记ID的目标链接；不是短链接时原样返回
+
+        call(host, fn) 用于把每一跳放到限速器中执行，不提供时直接请求。
+        """
+        if not is_short_link(url):
+            return url
+        self.lookups += 1
+        target, state = self.cache.get(url)
+        if state == FRESH:
+            return target
+        target = await self.inflight.do(url, lambda: self._follow(client, url, call))
+        self.cache.set(url, target)
+        return target
+
+    async def resolve_many(self, client: httpx.AsyncClient, urls: Iterable[str], call=None) -> Dict[str, Any]:
+        """
+        并发解析多个链接，返回 链接 -> 目标链接或异常
+        """
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.resolve(client, url, call) for url in urls), return_exceptions=True)
+        return dict(zip(urls, results))
+
+    async def _hop(self, client: httpx.AsyncClient, url: str) -> Optional[str]:
+        self.requests += 1
+        response = await client.head(url, follow_redirects=False, timeout=RESOLVE_TIMEOUT)
+        if response.status_code in HEAD_UNSUPPORTED:
+            async with client.stream("GET", url, follow_redirects=False, timeout=RESOLVE_TIMEOUT) as response:
+                pass
+        location = _next_location(url, response.status_code, response.headers)
+        if location is None:
+            response.raise_for_status()
+        return location
+
+    async def _follow(self, client: httpx.AsyncClient, url: str, call=None) -> str:
+        current = url
+        for _ in range(self.max_redirects):
+            if call is None:
+                location = await self._hop(client, current)
+            else:
+                location = await call(urlparse(current).netloc, lambda: self._hop(client, current))
+            if location is None:
+                break
+            current = location
+            # 出现笔记ID后就停止，之后的站内跳转不影响笔记ID
+            if extract_note_id(current):
+                return current
+        if extract_note_id(current):
+            return current
+        raise ShortLinkError(f"短链接没有跳转到笔记: {url} -> {current}")
+
+    def stats(self) -> Dict[str, Any]:
+        cache = self.cache.stats()
+        return {
+            "entries": cache["size"],
+            "ttl": cache["ttl"],
+            "lookups": self.lookups,
+            "cache_hits": cache["hits"],
+            "coalesced": self.inflight.coalesced,
+            "requests": self.requests
+        }
+
+def resolve_short_link_sync(session: "requests.Session", url: str, max_redirects: int = MAX_REDIRECTS) -> str:
+    """
+    同步版本：用 HEAD 请求跟随短链接跳转，供命令行批量模式使用
+    """
+    if not is_short_link(url):
+        return url
+    current = url
+    for _ in range(max_redirects):
+        response = session.head(current, allow_redirects=False, timeout=RESOLVE_TIMEOUT)
+        if response.status_code in HEAD_UNSUPPORTED:
+            response = session.get(current, allow_redirects=False, stream=True, timeout=RESOLVE_TIMEOUT)
+            response.close()
+        location = _next_location(current, response.status_code, response.headers)
+        if location is None:
+            response.raise_for_status()
+            break
+        current = location
+        if extract_note_id(current):
+            return current
+    if extract_note_id(current):
+        return current
+    raise ShortLinkError(f"短链接没有跳转到笔记: {url} -> {current}")
+
+def resolve_short_links_sync(session: "requests.Session", urls: Iterable[str], workers: int = 16) -> Dict[str, Any]:
+    """
+    用线程池并发解析多个链接，返回 链接 -> 目标链接或异常；不是短链接的原样返回
+    """
+    urls = list(dict.fromkeys(urls))
+    short = [url for url in urls if is_short_link(url)]
+    results: Dict[str, Any] = {url: url for url in urls if not is_short_link(url)}
+
+    def resolve(url: str) -> Any:
+        try:
+            return resolve_short_link_sync(session, url)
+        except Exception as e:
+            return e
+
+    if short:
+        with ThreadPoolExecutor(max_workers=min(workers, len(short)), thread_name_prefix="xhs-resolve") as executor:
+            results.update(zip(short, executor.map(resolve, short)))
+    return results
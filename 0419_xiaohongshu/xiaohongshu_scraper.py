@@ -4,11 +4,52 @@
 
 import re
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import argparse
+import hashlib
+import html
+import mimetypes
 import json
+import sys
 import time
+import threading
 import os
+from xiaohongshu_cache import cache_key
+from xiaohongshu_extract import PageScanner, extract_note, MAX_PAGE_BYTES, SOURCE_DOM
+from xiaohongshu_store import PageStore
+from xiaohongshu_search import SearchIndex
+from xiaohongshu_resolve import is_short_link, resolve_short_links_sync
+
+# 请求头
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+}
+
+# 图片下载：保存目录、并发数、分块大小（字节）、超时（秒）
+IMAGE_DIR = os.getenv("XHS_IMAGE_DIR", "images")
+DOWNLOAD_WORKERS = int(os.getenv("XHS_DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("XHS_DOWNLOAD_CHUNK_SIZE", str(64 * 1024)))
+DOWNLOAD_TIMEOUT = float(os.getenv("XHS_DOWNLOAD_TIMEOUT", "30"))
+# 图片链接 -> 本地文件名 的索引，已下载过的链接不再请求
+IMAGE_INDEX_FILE = "index.json"
+# 未下载完的文件放在此子目录，按链接哈希命名，下次续传
+PARTIAL_DIR = ".partial"
+# 206 响应的 Content-Range：bytes 起始-结束/总长度
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+# 部分 Python 版本的 mimetypes 不认识 webp 等格式
+IMAGE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/heic": ".heic",
+    "image/avif": ".avif",
+}
 
 def extract_url(text):
     """
@@ -18,187 +59,58 @@ def extract_url(text):
     urls = re.findall(url_pattern, text)
     return urls[0] if urls else text
 
-def scrape_xiaohongshu(url):
+def extract_urls(text):
     """
-    从小红书链接中提取信息
+    从文本中提取所有URL
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-    }
-    
-    try:
-        session = requests.Session()
-        response = session.get(url, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # 打印HTML内容以便调试
-        print("页面内容预览：")
-        print(response.text[:500])
-        
-        # 提取标题
-        title = None
-        title_selectors = [
-            'div#detail-title.title',
-            'div[data-v-610be4fa].title',
-            'div.title',
-            'meta[property="og:title"]',
-            'title'
-        ]
-        
-        for selector in title_selectors:
-            if selector.startswith('meta'):
-                element = soup.find('meta', property='og:title')
-                if element:
-                    title = element.get('content')
-                    break
-            else:
-                element = soup.select_one(selector)
-                if element:
-                    title = element.text.strip()
-                    break
-        
-        title = title if title else "未找到标题"
-        print(f"找到的标题: {title}")  # 调试信息
+    url_pattern = r"https?://[^\s<>\"]+|www\.[^\s<>\"]+?"
+    return re.findall(url_pattern, text)
 
-        # 提取作者信息
-        author = None
+def fetch_page_streamed(session, url, timeout=None, max_bytes=MAX_PAGE_BYTES, chunk_size=64 * 1024, stop_at_state=True):
+    """
+    流式获取页面，边下载边增量解码，读到完整的初始状态后立即停止并关闭连接
 
-        try:
-            # 方法1：直接找到 username span
-            author_span = soup.find('span', {
-                'class': 'username',
-                'data-v-701599c8': ''
-            })
-            if author_span:
-                author = author_span.text.strip()
-                print(f"方法1找到作者: {author}")
-
-            # 方法2：通过父元素链接找到 username span
-            if not author:
-                author_link = soup.find('a', {
-                    'class': 'name',
-                    'data-v-701599c8': ''
-                })
-                if author_link:
-                    author_span = author_link.find('span', class_='username')
-                    if author_span:
-                        author = author_span.text.strip()
-                        print(f"方法2找到作者: {author}")
-
-            # 如果还是没找到，使用更宽松的查找
-            if not author:
-                username_spans = soup.find_all('span', class_='username')
-                for span in username_spans:
-                    if span.text.strip():
-                        author = span.text.strip()
-                        print(f"备用方法找到作者: {author}")
-                        break
-
-            author = author if author else "未知作者"
-            print(f"最终找到的作者: {author}")
-
-        except Exception as e:
-            print(f"提取作者时出错: {e}")
-            author = "未知作者" 
-                    
-        
+    返回 (已读取的页面文本, 响应, 是否提前停止)；stop_at_state 为 False 时读到结束。
+    页面超过 max_bytes 时抛出 PageTooLarge。
+    """
+    with session.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        # 响应头未声明字符集时 requests 按 ISO-8859-1 解码，这里改为 UTF-8
+        declared = "charset" in response.headers.get("Content-Type", "").lower()
+        scanner = PageScanner(response.encoding if declared else "utf-8", max_bytes, stop_at_state)
+        scanner.check_length(response.headers.get("Content-Length"))
+        for chunk in response.iter_content(chunk_size):
+            if scanner.feed(chunk):
+                break
+        scanner.close()
+        return scanner.text(), response, scanner.complete
 
-        # 提取图片 - 更新的图片提取逻辑
-        images = []
-        
-        # 1. 尝试获取所有图片标签
-        all_images = soup.find_all('img')
-        
-        for img in all_images:
-            # 获取所有可能的图片URL属性
-            src = img.get('src')
-            data_src = img.get('data-src')
-            data_lazy = img.get('data-lazy')
-            data_original = img.get('data-original')
-            
-            # 检查所有可能的图片URL
-            possible_urls = [src, data_src, data_lazy, data_original]
-            
-            for url in possible_urls:
-                if url and url.strip():
-                    # 确保URL是完整的
-                    if url.startswith('//'):
-                        url = 'https:' + url
-                    elif url.startswith('/'):
-                        url = 'https://www.xiaohongshu.com' + url
-                    
-                    # 过滤掉小图标和无关图片
-                    if ('avatar' not in url.lower() and 
-                        'icon' not in url.lower() and 
-                        'logo' not in url.lower() and
-                        url not in images):
-                        images.append(url)
-        
-        # 2. 尝试从页面源码中提取图片URL
-        img_pattern = r'https?://[^\s<>"\']+?(?:jpg|jpeg|png|webp)(?:[^\s<>"\']*)'
-        found_urls = re.findall(img_pattern, response.text)
-        
-        for url in found_urls:
-            if ('avatar' not in url.lower() and 
-                'icon' not in url.lower() and 
-                'logo' not in url.lower() and
-                url not in images):
-                images.append(url)
-        
-        # 3. 尝试从特定的数据属性中提取
-        for element in soup.find_all(attrs={'data-xhs-img': True}):
-            url = element.get('data-xhs-img')
-            if url and url not in images:
-                if url.startswith('//'):
-                    url = 'https:' + url
-                images.append(url)
-
-        # 4. 尝试从 script 标签中提取图片URL
-        for script in soup.find_all('script', type='application/json'):
-            try:
-                data = json.loads(script.string)
-                if isinstance(data, dict):
-                    # 递归搜索字典中的图片URL
-                    def extract_urls(obj):
-                        if isinstance(obj, str):
-                            if re.match(r'https?://.*?(?:jpg|jpeg|png|webp)', obj):
-                                if obj not in images:
-                                    images.append(obj)
-                        elif isinstance(obj, dict):
-                            for value in obj.values():
-                                extract_urls(value)
-                        elif isinstance(obj, list):
-                            for item in obj:
-                                extract_urls(item)
-                    
-                    extract_urls(data)
-            except:
-                continue
+def fetch_and_extract(session, url, timeout=None):
+    """
+    流式获取页面并提取，返回 (提取结果, 页面文本, 响应)
 
+    初始状态中没有可用的笔记时，提前停止得到的页面不完整，重新读取完整页面后再走 DOM 提取。
+    """
+    html, response, truncated = fetch_page_streamed(session, url, timeout)
+    data = extract_note(html, url)
+    if truncated and data["source"] == SOURCE_DOM:
+        html, response, _ = fetch_page_streamed(session, url, timeout, stop_at_state=False)
+        data = extract_note(html, url)
+    return data, html, response
 
-        # 提取文字内容
-        text_content = ""
-        content_selectors = [".content", ".note-content", ".desc", "article"]
-        for selector in content_selectors:
-            content = soup.select_one(selector)
-            if content:
-                text_content = content.get_text(strip=True)
-                break
-        
-        if not text_content:
-            text_content = "未找到文字内容"
-        
-        return {
-            "title": title,
-            "author": author,
-            "content": text_content,
-            "images": images,
-            "url": url
-        }
+def scrape_xiaohongshu(url):
+    """
+    从小红书链接中提取信息
+    """
+    try:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        data, _, _ = fetch_and_extract(session, url)
+        print(f"提取路径: {data['source']}")  # 调试信息
+        print(f"找到的标题: {data['title']}")
+        print(f"最终找到的作者: {data['author']}")
+        print(f"找到的图片数量: {len(data['images'])}")
+        return data
         
     except Exception as e:
         print(f"错误: {str(e)}")
@@ -207,9 +119,172 @@ def scrape_xiaohongshu(url):
         print("堆栈跟踪:", traceback.format_exc())
         return None
 
-def save_to_html(data, filename="xiaohongshu_result.html"):
+def create_download_session(workers=DOWNLOAD_WORKERS):
+    """
+    创建图片下载用的 requests 会话，连接池大小与并发数一致
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"])
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+        "Referer": "https://www.xiaohongshu.com/",
+    })
+    return session
+
+def image_extension(content_type, url):
     """
-    将数据保存为HTML文件
+    根据响应类型（其次是链接后缀）确定图片文件扩展名
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in IMAGE_EXTENSIONS:
+        return IMAGE_EXTENSIONS[content_type]
+    match = re.search(r'\.(jpe?g|png|webp|gif)$', urlparse(url).path, re.I)
+    if match:
+        return "." + match.group(1).lower().replace("jpeg", "jpg")
+    return mimetypes.guess_extension(content_type) or ".img"
+
+def download_image(session, url, image_dir=IMAGE_DIR, resume=True):
+    """
+    流式下载单张图片并按内容哈希保存，返回文件名
+
+    未完成的文件保存在 .partial 目录中，下次用 Range 请求续传；
+    内容相同的图片只保存一份。续传响应的起始位置与部分文件对不上时丢弃部分文件、
+    不带 Range 重新下载；写完后按 Content-Range 或 Content-Length 核对大小，不完整时不保存。
+    """
+    partial_dir = os.path.join(image_dir, PARTIAL_DIR)
+    os.makedirs(partial_dir, exist_ok=True)
+    part_path = os.path.join(partial_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".part")
+
+    offset = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    restart = False
+    with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 416 and offset:
+            # 服务端不接受续传位置
+            restart = True
+        else:
+            response.raise_for_status()
+            expected = None
+            if response.status_code == 206:
+                match = CONTENT_RANGE_PATTERN.match(response.headers.get("Content-Range", ""))
+                if not match or int(match.group(1)) != offset:
+                    if not offset:
+                        raise IOError(f"没有请求续传，服务端却返回了部分内容: {response.headers.get('Content-Range')}")
+                    # 返回的范围接不上已下载的部分
+                    restart = True
+                elif match.group(3) != "*":
+                    expected = int(match.group(3))
+            elif "Content-Encoding" not in response.headers and response.headers.get("Content-Length", "").isdigit():
+                expected = int(response.headers["Content-Length"])
+
+        if not restart:
+            resumed = response.status_code == 206
+            digest = hashlib.sha256()
+            if resumed:
+                # 续传时先把已下载部分计入哈希
+                with open(part_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+
+            with open(part_path, "ab" if resumed else "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+            extension = image_extension(response.headers.get("Content-Type"), url)
+
+    if restart:
+        # 丢弃旧的部分文件后从头下载
+        os.remove(part_path)
+        return download_image(session, url, image_dir, resume=False)
+
+    size = os.path.getsize(part_path)
+    if expected is not None and size != expected:
+        if size > expected:
+            os.remove(part_path)
+        raise IOError(f"图片不完整：已下载 {size} 字节，应为 {expected} 字节")
+
+    filename = digest.hexdigest() + extension
+    path = os.path.join(image_dir, filename)
+    if os.path.exists(path):
+        os.remove(part_path)
+    else:
+        os.replace(part_path, path)
+    return filename
+
+def load_image_index(image_dir=IMAGE_DIR):
+    index_path = os.path.join(image_dir, IMAGE_INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_image_index(index, image_dir=IMAGE_DIR):
+    index_path = os.path.join(image_dir, IMAGE_INDEX_FILE)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, index_path)
+
+def download_images(image_urls, image_dir=IMAGE_DIR, workers=DOWNLOAD_WORKERS, session=None):
+    """
+    并发下载笔记图片，返回 图片链接 -> 本地文件路径 的映射
+
+    已记录在索引中且文件仍存在的链接直接复用；下载失败的图片不在返回值中，
+    页面里继续使用原链接。
+    """
+    os.makedirs(image_dir, exist_ok=True)
+    index = load_image_index(image_dir)
+    local_images = {}
+    pending = []
+    for url in dict.fromkeys(image_urls):
+        filename = index.get(url)
+        if filename and os.path.exists(os.path.join(image_dir, filename)):
+            local_images[url] = os.path.join(image_dir, filename)
+        else:
+            pending.append(url)
+
+    if pending:
+        own_session = session is None
+        session = session or create_download_session(workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xhs-download") as executor:
+                futures = {
+                    executor.submit(download_image, session, url, image_dir): url
+                    for url in pending
+                }
+                for future in as_completed(futures):
+                    url = futures[future]
+                    try:
+                        filename = future.result()
+                    except Exception as e:
+                        print(f"下载图片失败 {url}: {e}")
+                        continue
+                    index[url] = filename
+                    local_images[url] = os.path.join(image_dir, filename)
+        finally:
+            if own_session:
+                session.close()
+        save_image_index(index, image_dir)
+
+    reused = len(dict.fromkeys(image_urls)) - len(pending)
+    print(f"图片已保存到 {image_dir}：{len(local_images)}/{len(image_urls)} 张，其中复用 {reused} 张")
+    return local_images
+
+def save_to_html(data, filename="xiaohongshu_result.html", local_images=None):
+    """
+    将数据保存为HTML文件，提供 local_images 时图片指向本地副本
     """
     try:
         html_template = """
@@ -296,11 +371,15 @@ def save_to_html(data, filename="xiaohongshu_result.html"):
         
         # 生成图片HTML
         image_items = []
+        html_dir = os.path.dirname(os.path.abspath(filename))
         for i, img_url in enumerate(data['images'], 1):
+            img_src = img_url
+            if local_images and img_url in local_images:
+                img_src = os.path.relpath(os.path.abspath(local_images[img_url]), html_dir).replace(os.sep, "/")
             image_item = f"""
             <div class="image-item">
-                <a href="{img_url}" target="_blank">
-                    <img src="{img_url}" alt="图片 {i}">
+                <a href="{img_src}" target="_blank">
+                    <img src="{img_src}" alt="图片 {i}">
                 </a>
                 <a href="{img_url}" target="_blank">查看原图</a>
             </div>
@@ -324,6 +403,8 @@ def save_to_html(data, filename="xiaohongshu_result.html"):
         
         # 同时保存JSON格式
         json_filename = filename.rsplit('.', 1)[0] + '.json'
+        if local_images:
+            data = {**data, "local_images": local_images}
         with open(json_filename, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=4)
         print(f"原始数据已保存到 {json_filename}")
@@ -336,14 +417,248 @@ def save_to_html(data, filename="xiaohongshu_result.html"):
     except Exception as e:
         print(f"保存文件时发生错误: {e}")
 
-def main():
+# 批量模式：默认并发数、请求超时（秒）、索引页每页条数
+BULK_WORKERS = int(os.getenv("XHS_BULK_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+BULK_TIMEOUT = float(os.getenv("XHS_BULK_TIMEOUT", "15"))
+INDEX_PAGE_SIZE = int(os.getenv("XHS_INDEX_PAGE_SIZE", "50"))
+
+# 批量模式下每个线程池/进程共用的会话和原始页面存储
+_bulk_session = None
+_bulk_store = None
+# 线程池中的任务会同时首次调用下面两个函数，创建时加锁，保证每个进程只有一个会话和一个存储连接
+_bulk_lock = threading.Lock()
+
+def get_bulk_session():
+    global _bulk_session
+    if _bulk_session is None:
+        with _bulk_lock:
+            if _bulk_session is None:
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=BULK_WORKERS)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(HEADERS)
+                _bulk_session = session
+    return _bulk_session
+
+def get_bulk_store(path):
+    global _bulk_store
+    store = _bulk_store
+    if store is None or store.path != path:
+        with _bulk_lock:
+            if _bulk_store is None or _bulk_store.path != path:
+                _bulk_store = PageStore(path)
+            store = _bulk_store
+    return store
+
+def scrape_link(url, store_path=None):
+    """
+    批量模式的单条任务：返回包含 data 或 error 的记录，不打印调试信息
+
+    提供 store_path 时同时把原始页面保存到页面存储中，之后可离线重新提取。
+    定义在模块顶层，以便在进程池中使用。
+    """
+    record = {"url": url, "key": cache_key(url), "scraped_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    try:
+        data, html, response = fetch_and_extract(get_bulk_session(), url, BULK_TIMEOUT)
+        if store_path:
+            try:
+                get_bulk_store(store_path).put(record["key"], url, html, dict(response.headers), response.status_code)
+            except Exception as e:
+                print(f"保存原始页面失败 {url}: {e}")
+        record["data"] = data
+    except Exception as e:
+        record["error"] = f"{e.__class__.__name__}: {e}"
+    return record
+
+def read_links(source):
+    """
+    从文件或标准输入（"-"）读取链接，每行可以是链接或包含多个链接的分享文案
+    """
+    f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        for line in f:
+            yield from extract_urls(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def iter_records(output):
+    """
+    逐行读取 JSONL 结果文件，跳过写了一半的行
+    """
+    if not os.path.exists(output):
+        return
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def load_done_keys(output):
+    """
+    已成功提取的笔记键，续跑时跳过；失败的条目会重试
+    """
+    return {record["key"] for record in iter_records(output) if "data" in record}
+
+def scrape_bulk(links, output, workers=BULK_WORKERS, use_processes=False, store_path=None, search_path=None):
+    """
+    用线程池或进程池批量提取，每完成一条立即追加到 JSONL 文件
+
+    提供 search_path 时成功的结果同时写入该搜索索引。返回 (成功数, 失败数, 跳过数)。
+    """
+    done = load_done_keys(output)
+    pending = {}
+    skipped = 0
+    failed = 0
+    # 先并发解析分享短链接，解析后才能按笔记ID去重
+    links = list(links)
+    resolved = {}
+    if any(is_short_link(url) for url in links):
+        resolved = resolve_short_links_sync(get_bulk_session(), links, workers)
+    for url in links:
+        target = resolved.get(url, url)
+        if isinstance(target, Exception):
+            failed += 1
+            print(f"短链接解析失败 {url}: {target}")
+            continue
+        url = target
+        key = cache_key(url)
+        if key in done or key in pending:
+            skipped += 1
+            continue
+        pending[key] = url
+
+    succeeded = 0
+    # 索引只在主线程中写入
+    index = SearchIndex(search_path) if search_path else None
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as executor, open(output, "a", encoding="utf-8") as f:
+        futures = [executor.submit(scrape_link, url, store_path) for url in pending.values()]
+        for i, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            if "data" in record:
+                succeeded += 1
+                if index is not None:
+                    index.add(record["key"], record["url"], record["data"])
+            else:
+                failed += 1
+                print(f"提取失败 {record['url']}: {record['error']}")
+            if i % 100 == 0:
+                print(f"进度: {i}/{len(futures)}")
+    if index is not None:
+        index.optimize()
+        index.close()
+    return succeeded, failed, skipped
+
+def render_index(output, filename="xiaohongshu_index.html", page_size=INDEX_PAGE_SIZE):
+    """
+    根据 JSONL 结果生成分页的 HTML 索引，同一篇笔记取最后一次成功的结果
+
+    第一页写入 filename，其余页写入 <name>_2.html、<name>_3.html ...
+    """
+    notes = {}
+    for record in iter_records(output):
+        if "data" in record:
+            notes.pop(record["key"], None)
+            notes[record["key"]] = record["data"]
+    notes = list(notes.values())
+
+    base = filename.rsplit('.', 1)[0]
+    pages = max(1, -(-len(notes) // page_size))
+    page_name = lambda n: os.path.basename(filename if n == 1 else f"{base}_{n}.html")
+
+    for page in range(1, pages + 1):
+        items = []
+        for data in notes[(page - 1) * page_size:page * page_size]:
+            thumbnail = f'<img src="{html.escape(data["images"][0])}" alt="">' if data.get("images") else ""
+            items.append(f"""
+            <div class="note">
+                {thumbnail}
+                <div>
+                    <a href="{html.escape(data['url'])}" target="_blank">{html.escape(data['title'])}</a>
+                    <div class="author">作者：{html.escape(data['author'])} · 图片 {len(data.get('images') or [])} 张</div>
+                    <div class="content">{html.escape(data['content'][:120])}</div>
+                </div>
+            </div>""")
+
+        nav = []
+        if page > 1:
+            nav.append(f'<a href="{page_name(page - 1)}">上一页</a>')
+        nav.append(f"第 {page}/{pages} 页，共 {len(notes)} 篇")
+        if page < pages:
+            nav.append(f'<a href="{page_name(page + 1)}">下一页</a>')
+
+        html_content = f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>小红书笔记索引 - 第 {page} 页</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; max-width: 900px; margin: 0 auto; padding: 20px; background-color: #f5f5f5; }}
+        .note {{ display: flex; gap: 15px; background-color: white; padding: 15px; margin-bottom: 10px; border-radius: 10px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }}
+        .note img {{ width: 100px; height: 100px; object-fit: cover; border-radius: 5px; }}
+        .note a {{ color: #333; font-weight: bold; text-decoration: none; }}
+        .author {{ color: #666; font-size: 0.9em; margin: 5px 0; }}
+        .content {{ color: #444; font-size: 0.9em; }}
+        .nav {{ margin: 20px 0; color: #666; }}
+        .nav a {{ margin: 0 10px; }}
+    </style>
+</head>
+<body>
+    <div class="nav">{" ".join(nav)}</div>
+    {"".join(items)}
+    <div class="nav">{" ".join(nav)}</div>
+</body>
+</html>
+"""
+        path = os.path.join(os.path.dirname(filename), page_name(page))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html_content)
+
+    print(f"索引已生成: {filename}（{len(notes)} 篇，{pages} 页）")
+    return pages
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="提取小红书笔记；不带参数时交互式处理单条链接")
+    parser.add_argument("-i", "--input", help="批量模式：链接文件，每行一条链接或分享文案，- 表示标准输入")
+    parser.add_argument("-o", "--output", default="xiaohongshu_results.jsonl", help="批量结果 JSONL 文件，已成功的链接续跑时跳过")
+    parser.add_argument("-w", "--workers", type=int, default=BULK_WORKERS, help="并发数")
+    parser.add_argument("--processes", action="store_true", help="使用进程池（解析为 CPU 密集型时更快）")
+    parser.add_argument("--index", default="xiaohongshu_index.html", help="批量结束后生成的 HTML 索引文件")
+    parser.add_argument("--page-size", type=int, default=INDEX_PAGE_SIZE, help="索引每页条数")
+    parser.add_argument("--store", help="同时把原始页面压缩保存到该页面存储（SQLite）文件")
+    parser.add_argument("--search-index", help="同时把成功的结果写入该搜索索引文件，之后可用 xiaohongshu_search.py 检索")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.input:
+        start = time.time()
+        succeeded, failed, skipped = scrape_bulk(
+            read_links(args.input),
+            args.output,
+            workers=args.workers,
+            use_processes=args.processes,
+            store_path=args.store,
+            search_path=args.search_index
+        )
+        print(f"完成：成功 {succeeded}，失败 {failed}，跳过 {skipped}，耗时 {time.time() - start:.1f}s")
+        render_index(args.output, args.index, args.page_size)
+        return
+
     user_input = input("请输入小红书链接或包含链接的文本: ")
     url = extract_url(user_input)
     print(f"处理URL: {url}")
     
     data = scrape_xiaohongshu(url)
     if data:
-        save_to_html(data)
+        local_images = download_images(data['images'])
+        save_to_html(data, local_images=local_images)
     else:
         print("获取数据失败")
 
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+小红书提取 API 启动入口
+
+开发模式为单进程并监视代码变更自动重载；生产模式不监视文件，按 CPU 核数启动多个工作进程，
+安装了 uvloop / httptools 时使用它们作为事件循环和 HTTP 解析器。
+
+用法：
+    python xiaohongshu_server.py
+    python xiaohongshu_server.py --prod
+    python xiaohongshu_server.py --prod -w 8 --port 8080
+
+工作进程启动后在后台预热，预热完成前 /ready 返回 503，可作为就绪探针；/health 为存活探针。
+
+异步任务接口 /jobs 的任务只保存在接收它的进程中，多工作进程时不可用（返回 409）；
+设置了 XHS_JOB_DB 时要求单工作进程，否则拒绝启动。
+上游限速（XHS_RATE 等）是所有工作进程合计的值，每个进程按进程数平分。
+"""
+
+import os
+import argparse
+from importlib.util import find_spec
+from typing import Any, Dict
+from xiaohongshu_jobs import JOB_DB
+
+APP = "xiaohongshu_api:app"
+HOST = os.getenv("XHS_HOST", "0.0.0.0")
+PORT = int(os.getenv("XHS_PORT", "8000"))
+# 生产模式的工作进程数，默认等于 CPU 核数
+WORKERS = int(os.getenv("XHS_WORKERS", str(os.cpu_count() or 1)))
+
+def server_options(prod: bool, workers: int = WORKERS, host: str = HOST, port: int = PORT, access_log: bool = False) -> Dict[str, Any]:
+    """
+    生成 uvicorn.run 的参数
+    """
+    if not prod:
+        return {"host": host, "port": port, "reload": True}
+    return {
+        "host": host,
+        "port": port,
+        "workers": max(1, workers),
+        "reload": False,
+        "loop": "uvloop" if find_spec("uvloop") else "asyncio",
+        "http": "httptools" if find_spec("httptools") else "h11",
+        "access_log": access_log
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="启动小红书内容提取 API")
+    parser.add_argument("--prod", action="store_true", help="生产模式：多进程、不自动重载")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS, help="生产模式的工作进程数，默认等于 CPU 核数")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--access-log", action="store_true", help="生产模式下也输出访问日志")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    workers = max(1, args.workers) if args.prod else 1
+    if workers > 1 and JOB_DB:
+        raise SystemExit("XHS_JOB_DB 持久化的任务只能由一个进程处理，请加 -w 1 启动，或不设置 XHS_JOB_DB")
+    # 工作进程从环境变量读取进程数，用于停用任务队列
+    os.environ["XHS_WORKER_PROCESSES"] = str(workers)
+    import uvicorn
+    options = server_options(args.prod, args.workers, args.host, args.port, args.access_log)
+    if args.prod:
+        print(f"生产模式：{options['workers']} 个工作进程，事件循环 {options['loop']}，HTTP 解析 {options['http']}")
+        if workers > 1:
+            print("多工作进程：异步任务接口 /jobs 不可用")
+    uvicorn.run(APP, **options)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+原始页面存储：把抓取到的页面压缩后保存在 SQLite 中
+
+用途：
+  - 改进提取逻辑后，离线对全部已存页面重新提取，不再重新抓取
+  - 作为结果缓存之后的第二级缓存，服务重启后仍然有效
+
+默认不启用，设置 XHS_PAGE_STORE 为文件路径后 API 才保存页面。作为二级缓存时，
+页面在 XHS_STORE_CACHE_TTL 秒内可用（默认与结果缓存的 XHS_CACHE_TTL 相同），
+更早的页面仍保留用于离线重新提取，但不再返回给请求。
+
+用法：
+    python xiaohongshu_store.py stats --db xiaohongshu_pages.db
+    python xiaohongshu_store.py reextract --db xiaohongshu_pages.db -o reextracted.jsonl -w 8
+"""
+
+import os
+import json
+import time
+import gzip
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from xiaohongshu_extract import extract_note
+
+try:
+    import zstandard
+    _zstd_compressor = zstandard.ZstdCompressor(level=int(os.getenv("XHS_STORE_ZSTD_LEVEL", "6")))
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# 存储文件路径，默认为空即不启用
+STORE_PATH = os.getenv("XHS_PAGE_STORE", "")
+# 作为二级缓存时，页面在多长时间内（秒）视为可用，默认与结果缓存有效期相同
+STORE_CACHE_TTL = float(os.getenv("XHS_STORE_CACHE_TTL", os.getenv("XHS_CACHE_TTL", "300")))
+# gzip 压缩级别
+GZIP_LEVEL = int(os.getenv("XHS_STORE_GZIP_LEVEL", "6"))
+# 只保存这些响应头
+SAVED_HEADERS = ("content-type", "etag", "last-modified", "date", "cache-control")
+
+# 压缩格式，记录在每一行中，读取时据此解压
+CODEC_ZSTD = "zstd"
+CODEC_GZIP = "gzip"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    body BLOB NOT NULL
+)
+"""
+
+def compress(text: str) -> Tuple[str, bytes]:
+    """
+    压缩页面内容，安装了 zstandard 时使用 zstd，否则使用 gzip
+    """
+    data = text.encode("utf-8")
+    if HAS_ZSTD:
+        return CODEC_ZSTD, _zstd_compressor.compress(data)
+    return CODEC_GZIP, gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+def decompress(codec: str, body: bytes) -> str:
+    if codec == CODEC_ZSTD:
+        if not HAS_ZSTD:
+            raise RuntimeError("页面使用 zstd 压缩，需要安装 zstandard")
+        return _zstd_decompressor.decompress(body).decode("utf-8")
+    return gzip.decompress(body).decode("utf-8")
+
+class PageStore:
+    """
+    SQLite 页面存储，每篇笔记只保留最新一次抓取；可在多个线程中共用
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def put(
+        self,
+        key: str,
+        url: str,
+        html: str,
+        headers: Optional[Dict[str, str]] = None,
+        status: int = 200,
+        fetched_at: Optional[float] = None
+    ) -> None:
+        """
+        压缩并保存页面，已有同键页面时覆盖
+        """
+        codec, body = compress(html)
+        saved = {name: value for name, value in (headers or {}).items() if name.lower() in SAVED_HEADERS}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, url, fetched_at, status, headers, codec, size, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, fetched_at or time.time(), status, json.dumps(saved), codec, len(html), body)
+            )
+            self._conn.commit()
+            self.writes += 1
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        读取页面，返回 (HTML, 元数据)；不存在或超过 max_age 秒时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, fetched_at, status, headers, codec, body FROM pages WHERE key = ?",
+                (key,)
+            ).fetchone()
+            # 解析线程池和批量工作线程会同时读取，计数也在锁内更新
+            if row is None or (max_age is not None and time.time() - row[1] > max_age):
+                self.misses += 1
+                return None
+            self.hits += 1
+        url, fetched_at, status, headers, codec, body = row
+        meta = {"url": url, "fetched_at": fetched_at, "status": status, "headers": json.loads(headers)}
+        return decompress(codec, body), meta
+
+    def iter_raw(self, batch_size: int = 500) -> Iterator[Tuple[str, str, float, str, bytes]]:
+        """
+        按键顺序分批读出 (key, url, fetched_at, codec, 压缩内容)，不解压，内存占用与批大小成正比
+        """
+        last_key = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, url, fetched_at, codec, body FROM pages WHERE key > ? ORDER BY key LIMIT ?",
+                    (last_key, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_key = rows[-1][0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, raw, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM pages"
+            ).fetchone()
+            hits, misses, writes = self.hits, self.misses, self.writes
+        return {
+            "path": self.path,
+            "pages": count,
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "compression_ratio": round(raw / stored, 2) if stored else 0.0,
+            "hits": hits,
+            "misses": misses,
+            "writes": writes
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def _reextract_one(key: str, url: str, fetched_at: float, codec: str, body: bytes) -> Dict[str, Any]:
+    """
+    在工作进程中解压并提取一页，定义在模块顶层以便在进程池中使用
+    """
+    record = {"key": key, "url": url, "fetched_at": fetched_at}
+    try:
+        record["data"] = extract_note(decompress(codec, body), url)
+    except Exception as e:
+        record["error"] = f"{e.__class__.__name__}: {e}"
+    return record
+
+def reextract(path: str, output: str, workers: int = None) -> Tuple[int, int]:
+    """
+    用进程池对存储中的全部页面重新提取，结果逐条写入 JSONL，不访问网络
+
+    同时在途的任务数限制为 workers 的若干倍，整个存储不会一次读入内存。
+    返回 (成功数, 失败数)。
+    """
+    store = PageStore(path)
+    workers = workers or os.cpu_count() or 1
+    window = workers * 16
+    succeeded = failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor, open(output, "w", encoding="utf-8") as f:
+            pending = set()
+
+            def drain(block_until_below: int) -> None:
+                nonlocal pending, succeeded, failed
+                while len(pending) >= block_until_below:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record = future.result()
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        if "data" in record:
+                            succeeded += 1
+                        else:
+                            failed += 1
+
+            for row in store.iter_raw():
+                pending.add(executor.submit(_reextract_one, *row))
+                drain(window)
+            drain(1)
+    finally:
+        store.close()
+    return succeeded, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="小红书原始页面存储工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    stats_parser = sub.add_parser("stats", help="查看存储统计")
+    stats_parser.add_argument("--db", default=STORE_PATH or None, required=not STORE_PATH, help="存储文件，默认取 XHS_PAGE_STORE")
+    reextract_parser = sub.add_parser("reextract", help="用当前提取逻辑离线重新提取全部页面")
+    reextract_parser.add_argument("--db", default=STORE_PATH or None, required=not STORE_PATH, help="存储文件，默认取 XHS_PAGE_STORE")
+    reextract_parser.add_argument("-o", "--output", default="xiaohongshu_reextracted.jsonl")
+    reextract_parser.add_argument("-w", "--workers", type=int, default=None, help="进程数，默认等于 CPU 核数")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        store = PageStore(args.db)
+        print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+        store.close()
+    elif args.command == "reextract":
+        start = time.time()
+        succeeded, failed = reextract(args.db, args.output, args.workers)
+        print(f"重新提取完成：成功 {succeeded}，失败 {failed}，耗时 {time.time() - start:.1f}s，结果写入 {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记监控：定期重新检查关注的笔记，只输出发生变化的笔记及变化的字段
+
+每篇笔记保存指纹（原始页面哈希、提取结果哈希、ETag / Last-Modified）：
+  - 带 If-None-Match / If-Modified-Since 发出条件请求，返回 304 时不下载也不解析
+  - 页面哈希未变时跳过解析
+  - 页面变了但提取结果哈希未变（例如只是页面中的动态参数变化）时不输出
+
+检查间隔按笔记自身的变化频率调整：发生变化时缩短，未变化时逐步延长，
+经常修改的笔记会更早、更频繁地被检查。
+
+请求按主机限速，规则与 API 的上游限速相同（XHS_RATE 等配置）：成功时逐步加速，
+被限流（429/461、5xx、验证码页）时减速并遵守 Retry-After。跳转到验证码页或页面中提取不到笔记时
+记为 error，不更新指纹和保存的结果，避免把风控页面当成笔记的变化。
+
+用法：
+    python xiaohongshu_watch.py add -i links.txt
+    python xiaohongshu_watch.py run --once -o changes.jsonl
+    python xiaohongshu_watch.py run -o changes.jsonl -w 8 --store xiaohongshu_pages.db
+    python xiaohongshu_watch.py stats
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from xiaohongshu_cache import cache_key
+from xiaohongshu_extract import FIELDS, THROTTLE_STATUS, extract_note, has_note, is_captcha_url
+from xiaohongshu_ratelimit import (
+    BURST, DECREASE_FACTOR, MAX_RATE, MIN_RATE, RATE, RATE_STEP, OK, RETRY, THROTTLED, parse_retry_after
+)
+from xiaohongshu_resolve import resolve_short_links_sync
+from xiaohongshu_scraper import BULK_TIMEOUT, BULK_WORKERS, get_bulk_session, get_bulk_store, read_links
+
+# 监控数据库路径
+WATCH_DB = os.getenv("XHS_WATCH_DB", "xiaohongshu_watch.db")
+# 检查间隔（秒）：新笔记的初始值、下限、上限
+WATCH_INTERVAL = float(os.getenv("XHS_WATCH_INTERVAL", "3600"))
+WATCH_MIN_INTERVAL = float(os.getenv("XHS_WATCH_MIN_INTERVAL", "600"))
+WATCH_MAX_INTERVAL = float(os.getenv("XHS_WATCH_MAX_INTERVAL", str(7 * 86400)))
+# 未变化时间隔乘以该系数，发生变化时除以该系数的平方
+WATCH_BACKOFF = float(os.getenv("XHS_WATCH_BACKOFF", "1.5"))
+# 每轮最多检查的笔记数；持续运行时两轮之间最长等待时间（秒）
+WATCH_BATCH = int(os.getenv("XHS_WATCH_BATCH", "500"))
+WATCH_MAX_SLEEP = float(os.getenv("XHS_WATCH_MAX_SLEEP", "60"))
+
+# 检查结果
+NOT_MODIFIED = "not_modified"   # 304，未下载页面
+SAME_BODY = "same_body"         # 页面哈希未变，未解析
+SAME_RESULT = "same_result"     # 页面变了，提取结果未变
+CHANGED = "changed"
+NEW = "new"                     # 第一次成功检查
+ERROR = "error"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT,
+    result_hash TEXT,
+    result TEXT,
+    interval REAL NOT NULL,
+    next_check REAL NOT NULL,
+    checks INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    last_checked REAL,
+    last_changed REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS notes_next_check ON notes (next_check);
+"""
+
+class BlockedPage(Exception):
+    """
+    被重定向到验证码页，或页面中提取不到笔记
+    """
+
+class _HostState:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+
+class HostPacer:
+    """
+    线程安全的按主机令牌桶，AIMD 规则与 API 的 HostLimiter 相同
+
+    成功时速率线性增加，被限流时乘性减小（同一轮限流只减小一次），Retry-After 暂停该主机的所有请求。
+    并发数由线程池大小决定，这里只控制速率。
+    """
+
+    def __init__(self, rate: float = RATE, burst: float = BURST, min_rate: float = MIN_RATE, max_rate: float = MAX_RATE):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.rate, self.burst)
+        return state
+
+    def acquire(self, host: str) -> float:
+        """
+        等待该主机的令牌，返回请求开始时间
+        """
+        while True:
+            with self._lock:
+                state = self._state(host)
+                now = time.monotonic()
+                if now < state.blocked_until:
+                    wait = state.blocked_until - now
+                else:
+                    state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+                    state.updated = now
+                    if state.tokens >= 1:
+                        state.tokens -= 1
+                        return now
+                    wait = (1 - state.tokens) / state.rate
+            time.sleep(wait)
+
+    def release(self, host: str, started: float, outcome: str, retry_after: Optional[float] = None) -> None:
+        """
+        根据请求结果调整该主机的速率
+        """
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            if outcome == OK:
+                state.rate = min(self.max_rate, state.rate + RATE_STEP / state.rate)
+            elif outcome == THROTTLED:
+                if started >= state.last_decrease:
+                    state.rate = max(self.min_rate, state.rate * DECREASE_FACTOR)
+                    state.tokens = min(state.tokens, 0.0)
+                    state.last_decrease = now
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until, now + retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                host: {"rate": round(state.rate, 3), "blocked_for": round(max(state.blocked_until - now, 0.0), 3)}
+                for host, state in self._hosts.items()
+            }
+
+def body_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+def result_hash(result: Dict[str, Any]) -> str:
+    """
+    提取结果的指纹，只计算内容字段，不受链接参数和提取路径影响
+    """
+    payload = {name: result.get(name) for name in FIELDS}
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+def diff_results(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    比较两次提取结果：文本字段给出新旧值，图片给出新增和删除的地址
+    """
+    changes: Dict[str, Any] = {}
+    for name in FIELDS:
+        before, after = old.get(name), new.get(name)
+        if before == after:
+            continue
+        if name == "images":
+            before, after = before or [], after or []
+            before_set, after_set = set(before), set(after)
+            changes[name] = {
+                "added": [url for url in after if url not in before_set],
+                "removed": [url for url in before if url not in after_set]
+            }
+        else:
+            changes[name] = {"old": before, "new": after}
+    return changes
+
+def next_interval(interval: float, changed: bool) -> float:
+    """
+    变化时间隔缩短为 1/BACKOFF²，未变化时延长 BACKOFF 倍，限制在上下限之间
+    """
+    interval = interval / (WATCH_BACKOFF ** 2) if changed else interval * WATCH_BACKOFF
+    return min(WATCH_MAX_INTERVAL, max(WATCH_MIN_INTERVAL, interval))
+
+class Watchlist:
+    """
+    SQLite 中的监控列表与指纹，只在调用线程中读写
+    """
+
+    def __init__(self, path: str = WATCH_DB):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def add(self, urls: Iterable[str], interval: float = WATCH_INTERVAL) -> int:
+        """
+        加入监控，已在列表中的笔记不重复添加；新笔记立即到期。返回新增数
+        """
+        now = time.time()
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO notes (key, url, interval, next_check) VALUES (?, ?, ?, ?)",
+            ((cache_key(url), url, interval, now) for url in urls)
+        )
+        self._conn.commit()
+        return self._conn.total_changes - before
+
+    def due(self, limit: int = WATCH_BATCH, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        已到期的笔记，最早到期的排在前面
+        """
+        rows = self._conn.execute(
+            "SELECT * FROM notes WHERE next_check <= ? ORDER BY next_check LIMIT ?",
+            (now or time.time(), limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def next_due(self) -> Optional[float]:
+        return self._conn.execute("SELECT MIN(next_check) FROM notes").fetchone()[0]
+
+    def record(self, note: Dict[str, Any], outcome: Dict[str, Any]) -> None:
+        """
+        保存一次检查的结果并安排下一次检查
+        """
+        now = outcome["checked_at"]
+        status = outcome["status"]
+        changed = status in (CHANGED, NEW)
+        if status == ERROR:
+            # 出错时保持间隔不变，不计入变化频率
+            interval = note["interval"]
+        else:
+            interval = next_interval(note["interval"], status == CHANGED)
+        self._conn.execute(
+            """
+            UPDATE notes SET
+                etag = COALESCE(?, etag),
+                last_modified = COALESCE(?, last_modified),
+                body_hash = COALESCE(?, body_hash),
+                result_hash = COALESCE(?, result_hash),
+                result = COALESCE(?, result),
+                interval = ?,
+                next_check = ?,
+                checks = checks + 1,
+                changes = changes + ?,
+                last_checked = ?,
+                last_changed = CASE WHEN ? THEN ? ELSE last_changed END,
+                last_error = ?
+            WHERE key = ?
+            """,
+            (
+                outcome.get("etag"),
+                outcome.get("last_modified"),
+                outcome.get("body_hash"),
+                outcome.get("result_hash"),
+                json.dumps(outcome["data"], ensure_ascii=False) if "data" in outcome else None,
+                interval,
+                now + interval,
+                int(status == CHANGED),
+                now,
+                changed,
+                now,
+                outcome.get("error"),
+                note["key"]
+            )
+        )
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(checks), 0), COALESCE(SUM(changes), 0), "
+            "COALESCE(AVG(interval), 0), SUM(next_check <= ?), SUM(last_error IS NOT NULL) FROM notes",
+            (time.time(),)
+        ).fetchone()
+        count, checks, changes, interval, due, errors = row
+        return {
+            "path": self.path,
+            "notes": count,
+            "due": due or 0,
+            "checks": checks,
+            "changes": changes,
+            "average_interval": round(interval, 1),
+            "errors": errors or 0
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+def check_note(note: Dict[str, Any], store_path: Optional[str] = None, pacer: Optional[HostPacer] = None) -> Dict[str, Any]:
+    """
+    检查一篇笔记：条件请求 -> 页面哈希 -> 解析 -> 结果哈希，逐级判断是否变化
+
+    在线程池中执行，不读写监控数据库。提供 pacer 时按主机限速。出错时只返回错误，
+    不带任何指纹，保存的指纹和结果保持不变。
+    """
+    checked_at = time.time()
+    outcome: Dict[str, Any] = {"checked_at": checked_at}
+    url = note["url"]
+    headers = {}
+    if note.get("etag"):
+        headers["If-None-Match"] = note["etag"]
+    if note.get("last_modified"):
+        headers["If-Modified-Since"] = note["last_modified"]
+    try:
+        response = fetch_paced(url, headers, pacer)
+        if is_captcha_url(response.url):
+            raise BlockedPage(f"被重定向到验证码页: {response.url}")
+        if response.status_code == 304:
+            outcome["status"] = NOT_MODIFIED
+            return outcome
+        response.raise_for_status()
+        outcome["etag"] = response.headers.get("ETag")
+        outcome["last_modified"] = response.headers.get("Last-Modified")
+
+        digest = body_hash(response.content)
+        if digest == note.get("body_hash"):
+            outcome["status"] = SAME_BODY
+            return outcome
+        outcome["body_hash"] = digest
+
+        result = extract_note(response.text, url)
+        if not has_note(result):
+            raise BlockedPage("页面中没有提取到笔记")
+        if store_path:
+            try:
+                get_bulk_store(store_path).put(note["key"], url, response.text, dict(response.headers), response.status_code)
+            except Exception as e:
+                print(f"保存原始页面失败 {url}: {e}")
+
+        fingerprint = result_hash(result)
+        if fingerprint == note.get("result_hash"):
+            outcome["status"] = SAME_RESULT
+            return outcome
+        outcome["result_hash"] = fingerprint
+        outcome["data"] = result
+        if note.get("result"):
+            outcome["status"] = CHANGED
+            outcome["changes"] = diff_results(json.loads(note["result"]), result)
+        else:
+            outcome["status"] = NEW
+    except Exception as e:
+        # 丢弃已经得到的 ETag 和页面哈希，避免把出错的页面记成基线
+        outcome = {"checked_at": checked_at, "status": ERROR, "error": f"{e.__class__.__name__}: {e}"}
+    return outcome
+
+def fetch_paced(url: str, headers: Dict[str, str], pacer: Optional[HostPacer] = None):
+    """
+    发出请求，提供 pacer 时先等待该主机的令牌，并按响应调整速率
+    """
+    if pacer is None:
+        return get_bulk_session().get(url, headers=headers, timeout=BULK_TIMEOUT)
+    host = urlsplit(url).netloc
+    started = pacer.acquire(host)
+    try:
+        response = get_bulk_session().get(url, headers=headers, timeout=BULK_TIMEOUT)
+    except Exception:
+        pacer.release(host, started, RETRY)
+        raise
+    if response.status_code in THROTTLE_STATUS or response.status_code >= 500 or is_captcha_url(response.url):
+        pacer.release(host, started, THROTTLED, parse_retry_after(response.headers.get("Retry-After")))
+    else:
+        pacer.release(host, started, OK)
+    return response
+
+def run_round(
+    watchlist: Watchlist,
+    output: str,
+    workers: int = BULK_WORKERS,
+    limit: int = WATCH_BATCH,
+    store_path: Optional[str] = None,
+    pacer: Optional[HostPacer] = None
+) -> Dict[str, int]:
+    """
+    检查一轮到期的笔记，新笔记和发生变化的笔记追加到 JSONL 文件，返回各结果的数量
+    """
+    notes = watchlist.due(limit)
+    counts = {status: 0 for status in (NOT_MODIFIED, SAME_BODY, SAME_RESULT, CHANGED, NEW, ERROR)}
+    if not notes:
+        return counts
+    with ThreadPoolExecutor(max_workers=min(workers, len(notes))) as executor, \
+            open(output, "a", encoding="utf-8") as f:
+        futures = {executor.submit(check_note, note, store_path, pacer): note for note in notes}
+        for future in as_completed(futures):
+            note = futures[future]
+            outcome = future.result()
+            watchlist.record(note, outcome)
+            counts[outcome["status"]] += 1
+            if outcome["status"] in (CHANGED, NEW):
+                record = {
+                    "key": note["key"],
+                    "url": note["url"],
+                    "event": outcome["status"],
+                    "checked_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(outcome["checked_at"])),
+                    "data": outcome["data"]
+                }
+                if "changes" in outcome:
+                    record["changes"] = outcome["changes"]
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+            elif outcome["status"] == ERROR:
+                print(f"检查失败 {note['url']}: {outcome['error']}")
+    return counts
+
+def run(
+    path: str,
+    output: str,
+    workers: int = BULK_WORKERS,
+    limit: int = WATCH_BATCH,
+    store_path: Optional[str] = None,
+    once: bool = False,
+    stop: Optional[threading.Event] = None
+) -> None:
+    """
+    按计划持续检查；once 为 True 时检查完当前到期的笔记后退出
+    """
+    watchlist = Watchlist(path)
+    stop = stop or threading.Event()
+    # 各轮共用，速率调整跨轮保留
+    pacer = HostPacer()
+    try:
+        while not stop.is_set():
+            start = time.time()
+            counts = run_round(watchlist, output, workers, limit, store_path, pacer)
+            checked = sum(counts.values())
+            if checked:
+                summary = "，".join(f"{status} {count}" for status, count in counts.items() if count)
+                print(f"检查 {checked} 篇，耗时 {time.time() - start:.1f}s：{summary}")
+            if checked == limit:
+                # 还有到期的笔记，立即进行下一轮
+                continue
+            if once:
+                break
+            next_due = watchlist.next_due()
+            delay = WATCH_MAX_SLEEP if next_due is None else next_due - time.time()
+            stop.wait(min(max(delay, 0.0), WATCH_MAX_SLEEP))
+    finally:
+        watchlist.close()
+
+def add_links(path: str, links: Iterable[str], workers: int = BULK_WORKERS) -> Tuple[int, int]:
+    """
+    解析短链接后加入监控，返回 (新增数, 失败数)
+    """
+    links = list(links)
+    resolved = resolve_short_links_sync(get_bulk_session(), links, workers)
+    urls = []
+    failed = 0
+    for url in links:
+        target = resolved.get(url, url)
+        if isinstance(target, Exception):
+            failed += 1
+            print(f"短链接解析失败 {url}: {target}")
+            continue
+        urls.append(target)
+    watchlist = Watchlist(path)
+    try:
+        return watchlist.add(urls), failed
+    finally:
+        watchlist.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="小红书笔记监控：只输出发生变化的笔记")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add_parser = sub.add_parser("add", help="把链接加入监控")
+    add_parser.add_argument("-i", "--input", required=True, help="链接文件，每行一条链接或分享文案，- 表示标准输入")
+    add_parser.add_argument("--db", default=WATCH_DB)
+    run_parser = sub.add_parser("run", help="按计划检查到期的笔记")
+    run_parser.add_argument("--db", default=WATCH_DB)
+    run_parser.add_argument("-o", "--output", default="xiaohongshu_changes.jsonl", help="变化记录 JSONL 文件")
+    run_parser.add_argument("-w", "--workers", type=int, default=BULK_WORKERS, help="并发数")
+    run_parser.add_argument("--batch", type=int, default=WATCH_BATCH, help="每轮最多检查的笔记数")
+    run_parser.add_argument("--store", help="同时把变化的原始页面保存到该页面存储（SQLite）文件")
+    run_parser.add_argument("--once", action="store_true", help="检查完当前到期的笔记后退出")
+    stats_parser = sub.add_parser("stats", help="查看监控统计")
+    stats_parser.add_argument("--db", default=WATCH_DB)
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        added, failed = add_links(args.db, read_links(args.input))
+        print(f"新增 {added} 篇笔记，短链接解析失败 {failed}")
+    elif args.command == "run":
+        try:
+            run(args.db, args.output, args.workers, args.batch, args.store, args.once)
+        except KeyboardInterrupt:
+            print("已停止")
+    elif args.command == "stats":
+        watchlist = Watchlist(args.db)
+        print(json.dumps(watchlist.stats(), ensure_ascii=False, indent=2))
+        watchlist.close()
+
+if __name__ == "__main__":
+    main()
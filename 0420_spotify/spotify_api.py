@@ -1,23 +1,124 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import re
+import math
+import json
+import time
+# 记录模块导入耗时，用于冷启动分析
+_IMPORT_STARTED = time.perf_counter()
+import asyncio
+from functools import partial
+from contextlib import asynccontextmanager
 from urllib.parse import urlparse
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, List
-import uvicorn
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from typing import AbstractSet, Dict, Any, List, AsyncIterator, Optional
+from pydantic import BaseModel, Field
 from datetime import datetime
-import requests
-import ssl
+from spotify_client import SpotifyClient, EpisodeBatcher, SingleFlight, get_spotify_client
+from spotify_client import TOKEN_SECONDS, UPSTREAM_RESPONSES
+from spotify_jobs import JobQueue, QueueFull, JOB_MAX_ITEMS, JOB_MAX_WAIT, WORKER_PROCESSES
+from spotify_metrics import Registry, observe_request, observe_timings
+from spotify_profiling import StackSampler, is_admin, profile_call, MODES, CONTINUOUS_INTERVAL, TOP_N
+from spotify_ratelimit import UpstreamThrottled
+from spotify_search import SearchIndex, SEARCH_INDEX_PATH, SEARCH_LIMIT, SEARCH_MAX_LIMIT
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+# 批量接口单次最多条数
+BATCH_MAX_ITEMS = 1000
+# 启动时是否开启持续低频采样
+CONTINUOUS_PROFILING = os.getenv("SPOTIFY_PROFILE_CONTINUOUS", "0") == "1"
+# 可按需返回的字段；url 总是返回
+EPISODE_FIELDS = (
+    "podcast_name", "episode_title", "description", "upload_date", "duration",
+    "timestamps", "content", "image", "additional_info"
+)
+ALWAYS_FIELDS = ("url",)
+# 预热时预先建立到 API 主机的连接数
+WARMUP_CONNECTIONS = int(os.getenv("SPOTIFY_WARMUP_CONNECTIONS", "4"))
+
+# 指标：各阶段耗时、上游状态码、令牌与连接池状态，通过 /metrics 导出
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram(
+    "spotify_stage_seconds",
+    "提取流程各阶段耗时（秒）：url_extraction、fetch、parse（其中 timestamps 单独统计）、serialization",
+    ("stage",)
+)
+REQUEST_SECONDS = metrics.histogram(
+    "spotify_request_seconds",
+    "接口总耗时（秒），包括返回错误和抛出异常的请求；status 为状态码，客户端断开时为 cancelled",
+    ("endpoint", "status")
+)
+metrics.register(TOKEN_SECONDS)
+metrics.register(UPSTREAM_RESPONSES)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用启动时创建共享的 Spotify 客户端，并在后台预取令牌、预建连接，关闭时释放
+    """
+    client = get_spotify_client()
+    app.state.spotify = client
+    app.state.episode_batcher = EpisodeBatcher(client)
+    app.state.inflight = SingleFlight()
+    app.state.search_index = SearchIndex(SEARCH_INDEX_PATH) if SEARCH_INDEX_PATH else None
+    app.state.sampler = StackSampler(interval=CONTINUOUS_INTERVAL).start() if CONTINUOUS_PROFILING else None
+    # 异步任务队列，工作协程与请求共用批量合并器和限速器
+    # 任务只保存在本进程中，多工作进程时请求可能落到别的进程，因此不启用
+    app.state.jobs = JobQueue(lambda item, options: run_job_item(app, item, options)) if WORKER_PROCESSES == 1 else None
+    if app.state.jobs:
+        await app.state.jobs.start()
+    app.state.startup = {"ready": False, "import_seconds": round(IMPORT_SECONDS, 6), "warmup_seconds": None, "warmup_errors": []}
+    # 预热在后台进行，期间 /health 已可访问，/ready 返回 503
+    warmup_task = asyncio.create_task(warm_up(app))
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        if app.state.jobs:
+            await app.state.jobs.stop()
+        if app.state.sampler:
+            app.state.sampler.stop()
+        await client.close()
+        if app.state.search_index:
+            await asyncio.to_thread(app.state.search_index.close)
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    预热：获取访问令牌（并启动后台刷新），预先建立到 API 主机的连接
+
+    令牌获取失败时后台任务会继续重试，拿到令牌后 /ready 才返回 200。
+    """
+    start = time.perf_counter()
+    client = app.state.spotify
+    startup = app.state.startup
+    await client.start()
+    results = await asyncio.gather(
+        *(asyncio.to_thread(client.prime_connection) for _ in range(WARMUP_CONNECTIONS)),
+        return_exceptions=True
+    )
+    errors = {f"connect: {e.__class__.__name__}: {e}" for e in results if isinstance(e, Exception)}
+    startup["warmup_errors"].extend(sorted(errors))
+    startup["warmup_seconds"] = round(time.perf_counter() - start, 6)
+    startup["ready"] = True
+    print(f"预热完成，耗时 {startup['warmup_seconds']:.3f}s")
+
+def is_ready(app: FastAPI) -> bool:
+    """
+    预热完成且持有未过期的令牌
+    """
+    expires_in = app.state.spotify.token_expires_in()
+    return app.state.startup["ready"] and expires_in is not None and expires_in > 0
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title="Spotify 播客内容提取 API",
     description="使用官方API提取 Spotify 播客链接中的信息，包括标题、描述、时长等",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 def extract_url(text: str) -> str:
@@ -61,95 +162,651 @@ def extract_timestamps(description: str) -> List[Dict[str, str]]:
     
     return timestamps
 
-def scrape_spotify_podcast(url: str) -> Dict[str, Any]:
+def extract_episode_id(url: str) -> str:
+    """
+    从URL中提取episode ID
+    """
+    return url.split('/')[-1].split('?')[0]
+
+def extract_show_id(url: str) -> str:
+    """
+    从节目URL中提取show ID
+    """
+    return url.split('/')[-1].split('?')[0]
+
+def parse_fields(value: Optional[str]) -> Optional[frozenset]:
+    """
+    解析逗号分隔的字段列表，为空时返回 None（表示全部字段），包含未知字段时抛出 ValueError
+    """
+    if not value:
+        return None
+    fields = frozenset(name.strip() for name in value.split(",") if name.strip())
+    unknown = fields - set(EPISODE_FIELDS) - set(ALWAYS_FIELDS)
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(sorted(unknown))}，可选: {', '.join(EPISODE_FIELDS)}")
+    fields &= set(EPISODE_FIELDS)
+    return None if fields >= set(EPISODE_FIELDS) else fields
+
+def select_fields(result: Dict[str, Any], fields: Optional[AbstractSet[str]]) -> Dict[str, Any]:
+    """
+    只保留请求的字段，fields 为 None 时原样返回
+    """
+    if fields is None:
+        return result
+    return {name: value for name, value in result.items() if name in fields or name in ALWAYS_FIELDS}
+
+def format_episode(
+    episode: Dict[str, Any],
+    url: str,
+    timings: Dict[str, float] = None,
+    fields: Optional[AbstractSet[str]] = None
+) -> Dict[str, Any]:
+    """
+    把 Spotify API 返回的播客集数据整理成接口返回格式，提供 timings 时记录时间戳提取耗时
+
+    提供 fields 时只返回其中的字段，未请求 timestamps 时不提取时间戳。
+    """
+    # 获取时间戳
+    timestamps = None
+    if fields is None or "timestamps" in fields:
+        start = time.perf_counter()
+        timestamps = extract_timestamps(episode['description'])
+        if timings is not None:
+            timings["timestamps"] = time.perf_counter() - start
+    
+    # 格式化返回数据
+    return select_fields({
+        "podcast_name": episode['show']['name'],
+        "episode_title": episode['name'],
+        "description": episode['description'],
+        "upload_date": episode['release_date'],
+        "duration": format_duration(episode['duration_ms']),
+        "timestamps": timestamps,
+        "content": "需要 Spotify Premium 订阅才能访问完整转录文本",
+        "url": url,
+        "image": episode['images'][0]['url'] if episode['images'] else None,
+        "additional_info": {
+            "language": episode['language'],
+            "explicit": episode['explicit'],
+            "show_url": episode['show']['external_urls']['spotify']
+        }
+    }, fields)
+
+def scrape_spotify_podcast(url: str, client: SpotifyClient = None) -> Dict[str, Any]:
     """
     使用 Spotify API 获取播客信息
     """
     try:
-        # 设置 Spotify API 客户端
-        client_credentials_manager = SpotifyClientCredentials(
-            client_id='f77fd4ab760e46fdbf09a64249e6924e',
-            client_secret='2551dfbdb1a54c41b7c40901f6847f39'
-        )
-        sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
-        
-        # 从URL中提取episode ID
-        episode_id = url.split('/')[-1].split('?')[0]
+        # 使用进程内共享的 Spotify API 客户端
+        client = client or get_spotify_client()
         
         # 获取播客集信息
-        episode = sp.episode(episode_id)
-        
-        # 获取时间戳
-        timestamps = extract_timestamps(episode['description'])
-        
-        # 格式化返回数据
-        return {
-            "podcast_name": episode['show']['name'],
-            "episode_title": episode['name'],
-            "description": episode['description'],
-            "upload_date": episode['release_date'],
-            "duration": format_duration(episode['duration_ms']),
-            "timestamps": timestamps,
-            "content": "需要 Spotify Premium 订阅才能访问完整转录文本",
-            "url": url,
-            "image": episode['images'][0]['url'] if episode['images'] else None,
-            "additional_info": {
-                "language": episode['language'],
-                "explicit": episode['explicit'],
-                "show_url": episode['show']['external_urls']['spotify']
-            }
-        }
+        episode = client.episode(extract_episode_id(url))
+        return format_episode(episode, url)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取播客信息时发生错误: {str(e)}")
 
+def is_spotify_url(url: str) -> bool:
+    """
+    判断是否为Spotify链接
+    """
+    return "spotify.com" in urlparse(url).netloc
+
+def _log_index_error(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"写入搜索索引失败: {future.exception()}")
+
+def index_in_background(index: Optional[SearchIndex], records: List[Dict[str, Any]]) -> None:
+    """
+    在默认线程池中把完整的整理结果写入搜索索引，不等待写入完成
+    """
+    if index is None or not records:
+        return
+    asyncio.get_running_loop().run_in_executor(
+        None,
+        index.add_many,
+        [(extract_episode_id(record["url"]), record["url"], record) for record in records]
+    ).add_done_callback(_log_index_error)
+
+async def scrape_spotify_podcast_async(
+    url: str,
+    batcher: EpisodeBatcher,
+    inflight: SingleFlight = None,
+    fields: Optional[AbstractSet[str]] = None,
+    index: SearchIndex = None
+) -> Dict[str, Any]:
+    """
+    获取播客信息（异步版本），并发的单集查询会被合并为一次批量请求；
+    提供 inflight 时，同一播客集同时进行的请求只查询和整理一次；提供 fields 时只返回其中的字段；
+    提供 index 时完整的整理结果在后台写入搜索索引
+    """
+    episode_id = extract_episode_id(url)
+    # 不同字段组合的整理结果不同，分别合并
+    key = episode_id if fields is None else f"{episode_id}#{','.join(sorted(fields))}"
+
+    async def fetch() -> Dict[str, Any]:
+        with STAGE_SECONDS.time("fetch"):
+            episode = await batcher.get(episode_id)
+        timings: Dict[str, float] = {}
+        with STAGE_SECONDS.time("parse"):
+            result = format_episode(episode, url, timings, fields)
+        observe_timings(STAGE_SECONDS, timings)
+        if fields is None:
+            index_in_background(index, [result])
+        return result
+
+    try:
+        if inflight is None:
+            return await fetch()
+        result = await inflight.do(key, fetch)
+        return {**result, "url": url}
+    except UpstreamThrottled as e:
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+        raise HTTPException(status_code=503, detail=f"Spotify 限流，请稍后重试: {str(e)}", headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取播客信息时发生错误: {str(e)}")
+
+async def scrape_profiled(
+    url: str,
+    batcher: EpisodeBatcher,
+    mode: str,
+    save: bool = False,
+    fields: Optional[AbstractSet[str]] = None
+) -> Dict[str, Any]:
+    """
+    分析单次提取：绕过请求合并重新查询，整理（含时间戳提取）过程在分析器下执行，结果附带 profile 字段
+    """
+    try:
+        start = time.perf_counter()
+        episode = await batcher.get(extract_episode_id(url))
+        fetch_seconds = time.perf_counter() - start
+    except UpstreamThrottled as e:
+        raise HTTPException(status_code=503, detail=f"Spotify 限流，请稍后重试: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取播客信息时发生错误: {str(e)}")
+
+    result, report = await asyncio.to_thread(
+        partial(profile_call, mode, format_episode, episode, url, None, fields, save=save, name="spotify-format")
+    )
+    report["fetch_seconds"] = round(fetch_seconds, 6)
+    report["description_chars"] = len(episode.get("description") or "")
+    return {**result, "profile": report}
+
+def require_admin(token: str) -> None:
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="需要有效的管理员令牌（X-Admin-Token）")
+
+async def crawl_show_episodes(
+    show_id: str,
+    client: SpotifyClient,
+    fields: Optional[AbstractSet[str]] = None,
+    index: SearchIndex = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    逐页获取节目的全部播客集并逐条产出，处理当前页时预取下一页；提供 index 时每页完整结果写入搜索索引
+    """
+    show = await client.call(client.show, show_id)
+    page = show.pop("episodes", None) or {"items": [], "next": True}
+    # 简化的播客集数据中没有 show 字段，补上 format_episode 需要的部分
+    show_info = {
+        "name": show["name"],
+        "external_urls": show["external_urls"]
+    }
+    offset = 0
+
+    while True:
+        items = page.get("items") or []
+        offset += len(items)
+        next_page = None
+        if page.get("next") and (items or offset == 0):
+            next_page = asyncio.create_task(client.call(client.show_episodes, show_id, offset))
+
+        try:
+            records = []
+            for episode in items:
+                if not episode:
+                    continue
+                episode["show"] = show_info
+                record = format_episode(episode, episode["external_urls"]["spotify"], fields=fields)
+                records.append(record)
+                yield record
+            if fields is None:
+                index_in_background(index, records)
+        except BaseException:
+            if next_page:
+                next_page.cancel()
+            raise
+
+        if next_page is None:
+            break
+        page = await next_page
+
+async def stream_show_episodes(
+    show_id: str,
+    client: SpotifyClient,
+    fields: Optional[AbstractSet[str]] = None,
+    index: SearchIndex = None
+) -> AsyncIterator[str]:
+    """
+    以 NDJSON 格式输出节目的播客集，出错时输出一行 error 后结束
+    """
+    try:
+        async for record in crawl_show_episodes(show_id, client, fields, index):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+    except Exception as e:
+        yield json.dumps({"error": f"获取节目信息时发生错误: {str(e)}"}, ensure_ascii=False) + "\n"
+
+class BatchScrapeRequest(BaseModel):
+    """
+    批量提取请求体
+    """
+    urls: List[str] = Field(..., description="Spotify播客链接列表")
+    fields: str = Field(None, description="只返回这些字段，逗号分隔，例如 episode_title,duration；默认全部")
+
+async def run_job_item(app: FastAPI, item: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    任务队列中的单条处理，返回与批量接口相同格式的条目
+    """
+    url = extract_url(item)
+    entry = {"input": item, "url": url}
+    if not is_spotify_url(url):
+        entry["error"] = "提供的URL不是Spotify链接"
+        return entry
+    try:
+        entry["data"] = await scrape_spotify_podcast_async(
+            url,
+            app.state.episode_batcher,
+            app.state.inflight,
+            parse_fields(options.get("fields")),
+            app.state.search_index
+        )
+    except HTTPException as e:
+        entry["error"] = e.detail
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
 @app.get("/scrape")
-async def scrape_endpoint(url: str = Query(..., description="Spotify播客链接")):
+@observe_request(REQUEST_SECONDS, "/scrape")
+async def scrape_endpoint(
+    request: Request,
+    url: str = Query(..., description="Spotify播客链接"),
+    profile: str = Query(None, description="分析本次整理过程：cprofile 或 sampling，需要管理员令牌"),
+    profile_save: bool = Query(False, description="同时把分析结果保存为文件"),
+    fields: str = Query(None, description="只返回这些字段，逗号分隔，例如 episode_title,duration；默认全部"),
+    x_admin_token: str = Header(None)
+):
     """
     提取Spotify播客内容的API端点
     """
-    extracted_url = extract_url(url)
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    with STAGE_SECONDS.time("url_extraction"):
+        extracted_url = extract_url(url)
+        valid = is_spotify_url(extracted_url)
     
     # 验证URL是否为Spotify链接
-    if "spotify.com" not in urlparse(extracted_url).netloc:
+    if not valid:
         return JSONResponse(
             status_code=400,
             content={"error": "提供的URL不是Spotify链接"}
         )
     
+    if profile:
+        require_admin(x_admin_token)
+        if profile not in MODES:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"profile 只能是 {', '.join(MODES)}"}
+            )
+        return await scrape_profiled(extracted_url, request.app.state.episode_batcher, profile, profile_save, selected)
+
     # 提取内容
-    result = scrape_spotify_podcast(extracted_url)
-    return result
+    result = await scrape_spotify_podcast_async(
+        extracted_url,
+        request.app.state.episode_batcher,
+        request.app.state.inflight,
+        selected,
+        request.app.state.search_index
+    )
+    with STAGE_SECONDS.time("serialization"):
+        response = JSONResponse(content=result)
+    return response
 
-# 启动服务器
-if __name__ == "__main__":
-    import uvicorn
-    import ssl
-    
-    # 添加测试函数
-    def test_api():
-        try:
-            response = requests.get(
-                "https://localhost:8000/scrape?url=https://open.spotify.com/episode/6kIWYhK6y34ua0YBaSm1ru",
-                verify=False
-            )
-            print("Status Code:", response.status_code)
-            print("Response:", response.json())
-        except Exception as e:
-            print("Error:", str(e))
+@app.get("/show/episodes")
+async def show_episodes_endpoint(
+    request: Request,
+    url: str = Query(..., description="Spotify节目链接"),
+    fields: str = Query(None, description="只返回这些字段，逗号分隔；默认全部")
+):
+    """
+    以 NDJSON 流式返回节目下所有播客集，每行格式与 /scrape 相同
+    """
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    extracted_url = extract_url(url)
     
-    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-    ssl_context.load_cert_chain('cert.pem', 'key.pem')
-    # 明确设置支持的协议版本
-    ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
-    ssl_context.maximum_version = ssl.TLSVersion.TLSv1_3
+    # 验证URL是否为Spotify节目链接
+    if not is_spotify_url(extracted_url) or "/show/" not in urlparse(extracted_url).path:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "提供的URL不是Spotify节目链接"}
+        )
     
-    # 启动服务器
-    uvicorn.run(
-        "spotify_api:app",  # 使用字符串形式指定应用
-        host="0.0.0.0",
-        port=8000,
-        ssl_keyfile="key.pem",
-        ssl_certfile="cert.pem",
-        reload=True
-    ) 
\ No newline at end of file
+    show_id = extract_show_id(extracted_url)
+    return StreamingResponse(
+        stream_show_episodes(show_id, request.app.state.spotify, selected, request.app.state.search_index),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/scrape/batch")
+@observe_request(REQUEST_SECONDS, "/scrape/batch")
+async def batch_scrape_endpoint(request: Request, body: BatchScrapeRequest):
+    """
+    批量提取Spotify播客内容的API端点，每 50 集合并为一次请求，逐条返回结果或错误
+    """
+    if len(body.urls) > BATCH_MAX_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"单次最多提交 {BATCH_MAX_ITEMS} 条链接"}
+        )
+
+    try:
+        selected = parse_fields(body.fields)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+
+    batcher = request.app.state.episode_batcher
+    inflight = request.app.state.inflight
+    index = request.app.state.search_index
+    extracted_urls = [extract_url(item) for item in body.urls]
+    outcomes = await asyncio.gather(
+        *(scrape_spotify_podcast_async(url, batcher, inflight, selected, index) for url in extracted_urls if is_spotify_url(url)),
+        return_exceptions=True
+    )
+    outcomes = iter(outcomes)
+
+    results = []
+    for item, extracted_url in zip(body.urls, extracted_urls):
+        entry = {"input": item, "url": extracted_url}
+        if not is_spotify_url(extracted_url):
+            entry["error"] = "提供的URL不是Spotify链接"
+        else:
+            outcome = next(outcomes)
+            if isinstance(outcome, HTTPException):
+                entry["error"] = outcome.detail
+            elif isinstance(outcome, Exception):
+                entry["error"] = str(outcome)
+            else:
+                entry["data"] = outcome
+        results.append(entry)
+
+    with STAGE_SECONDS.time("serialization"):
+        response = JSONResponse(content={
+            "total": len(results),
+            "succeeded": sum(1 for entry in results if "data" in entry),
+            "failed": sum(1 for entry in results if "error" in entry),
+            "results": results
+        })
+    return response
+
+JOBS_DISABLED = "任务队列只在单工作进程下可用，请以 -w 1 启动服务"
+
+class JobRequest(BaseModel):
+    """
+    异步任务请求体
+    """
+    urls: List[str] = Field(..., description="Spotify播客链接列表")
+    fields: str = Field(None, description="只返回这些字段，逗号分隔，例如 episode_title,duration；默认全部")
+
+@app.post("/jobs", status_code=202)
+async def submit_job_endpoint(request: Request, body: JobRequest):
+    """
+    提交异步任务，立即返回任务ID；队列已满时返回 429，多工作进程时返回 409
+    """
+    if request.app.state.jobs is None:
+        return JSONResponse(status_code=409, content={"error": JOBS_DISABLED})
+    if not body.urls:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "未提供任何链接"}
+        )
+    if len(body.urls) > JOB_MAX_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"单个任务最多 {JOB_MAX_ITEMS} 条链接"}
+        )
+    try:
+        parse_fields(body.fields)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    try:
+        job = await request.app.state.jobs.submit(body.urls, {"fields": body.fields})
+    except QueueFull as e:
+        return JSONResponse(
+            status_code=429,
+            content={"error": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return {"job_id": job.id, "status": job.status, "total": len(job.items)}
+
+@app.get("/jobs/stats")
+async def job_stats_endpoint(request: Request):
+    """
+    查看任务队列状态
+    """
+    if request.app.state.jobs is None:
+        return JSONResponse(status_code=409, content={"error": JOBS_DISABLED})
+    return request.app.state.jobs.stats()
+
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(
+    request: Request,
+    job_id: str,
+    since: int = Query(0, ge=0, description="只返回第 since 条之后完成的结果，传入上次返回的 next"),
+    wait: float = Query(0, ge=0, description="长轮询：没有新结果时最多等待的秒数")
+):
+    """
+    查询任务状态和部分结果
+    """
+    if request.app.state.jobs is None:
+        return JSONResponse(status_code=409, content={"error": JOBS_DISABLED})
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "任务不存在或已过期"})
+    await job.wait(since, min(wait, JOB_MAX_WAIT))
+    return job.to_dict(since)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job_endpoint(request: Request, job_id: str):
+    """
+    取消任务，已完成的结果保留
+    """
+    if request.app.state.jobs is None:
+        return JSONResponse(status_code=409, content={"error": JOBS_DISABLED})
+    job = await request.app.state.jobs.cancel(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "任务不存在或已过期"})
+    return job.to_dict()
+
+@app.get("/health")
+async def health_endpoint():
+    """
+    存活探针：进程能处理请求即返回 200
+    """
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready_endpoint(request: Request):
+    """
+    就绪探针：预热完成且令牌有效时返回 200，否则返回 503；同时返回导入和预热耗时
+    """
+    ready = is_ready(request.app)
+    content = {**request.app.state.startup, "ready": ready, "token_expires_in": request.app.state.spotify.token_expires_in()}
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+@app.get("/search")
+@observe_request(REQUEST_SECONDS, "/search")
+async def search_endpoint(
+    request: Request,
+    q: str = Query(..., min_length=1, description="关键词，多个关键词用空格分隔，全部出现才算命中"),
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0)
+):
+    """
+    在已获取的播客集中检索标题、节目名和描述，按相关度排序，并列出匹配的章节时间戳
+    """
+    index = request.app.state.search_index
+    if index is None:
+        return JSONResponse(status_code=409, content={"error": "搜索索引未启用"})
+    start = time.perf_counter()
+    results = await asyncio.to_thread(index.search, q, limit, offset)
+    took = time.perf_counter() - start
+    return {"query": q, "took_ms": round(took * 1000, 3), "count": len(results), "results": results}
+
+@app.get("/search/stats")
+async def search_stats_endpoint(request: Request):
+    """
+    查看搜索索引的播客集数和大小
+    """
+    index = request.app.state.search_index
+    if index is None:
+        return JSONResponse(status_code=409, content={"error": "搜索索引未启用"})
+    return await asyncio.to_thread(index.stats)
+
+@app.get("/inflight/stats")
+async def inflight_stats_endpoint(request: Request):
+    """
+    查看并发重复请求的合并统计，coalesced 为省下的上游查询次数
+    """
+    return request.app.state.inflight.stats()
+
+@app.get("/ratelimit/stats")
+async def ratelimit_stats_endpoint(request: Request):
+    """
+    查看 Spotify API 当前的速率、并发上限和限流次数
+    """
+    return request.app.state.spotify.rate_limiter.stats()
+
+metrics.gauge(
+    "spotify_token_expires_in_seconds",
+    "当前访问令牌的剩余有效时间（秒）",
+    lambda: {(): app.state.spotify.token_expires_in()}
+)
+metrics.gauge(
+    "spotify_token_refreshes_total",
+    "令牌刷新次数",
+    lambda: {(): app.state.spotify.token_refreshes},
+    type="counter"
+)
+metrics.gauge(
+    "spotify_startup_seconds",
+    "启动耗时（秒）：import 为模块导入，warmup 为后台预热",
+    lambda: {("import",): IMPORT_SECONDS, ("warmup",): app.state.startup["warmup_seconds"]},
+    ("phase",)
+)
+metrics.gauge("spotify_ready", "预热完成且令牌有效", lambda: {(): int(is_ready(app))})
+metrics.gauge("spotify_http_pool_idle_connections", "连接池中的空闲连接数", lambda: {(): app.state.spotify.idle_connections()})
+metrics.gauge(
+    "spotify_batcher_requests_total",
+    "单集查询数与合并后实际发出的 episodes 请求数",
+    lambda: {
+        ("lookups",): app.state.episode_batcher.requests,
+        ("batches",): app.state.episode_batcher.batches
+    },
+    ("kind",),
+    type="counter"
+)
+metrics.gauge("spotify_job_queue_depth", "任务队列中等待处理的条目数", lambda: {(): app.state.jobs.pending})
+metrics.gauge(
+    "spotify_jobs",
+    "各状态的任务数",
+    lambda: {(status,): count for status, count in app.state.jobs.stats()["jobs"].items()},
+    ("status",)
+)
+metrics.gauge("spotify_search_documents", "搜索索引中的播客集数", lambda: {(): app.state.search_index.documents})
+metrics.gauge("spotify_inflight_requests", "正在查询的播客集数（合并后）", lambda: {(): len(app.state.inflight)})
+metrics.gauge(
+    "spotify_coalesced_requests_total",
+    "被合并到进行中请求的重复请求数",
+    lambda: {(): app.state.inflight.coalesced},
+    type="counter"
+)
+metrics.gauge(
+    "spotify_upstream_rate",
+    "Spotify API 当前的限速（次/秒）",
+    lambda: {(host,): stats["rate"] for host, stats in app.state.spotify.rate_limiter.stats()["hosts"].items()},
+    ("host",)
+)
+metrics.gauge(
+    "spotify_upstream_concurrency_limit",
+    "Spotify API 当前的并发上限",
+    lambda: {(host,): stats["concurrency_limit"] for host, stats in app.state.spotify.rate_limiter.stats()["hosts"].items()},
+    ("host",)
+)
+
+@app.post("/admin/profile/continuous")
+async def continuous_profile_endpoint(
+    request: Request,
+    enabled: bool = Query(..., description="开启或关闭持续采样"),
+    interval: float = Query(CONTINUOUS_INTERVAL, gt=0, description="采样间隔（秒）"),
+    x_admin_token: str = Header(None)
+):
+    """
+    开启或关闭持续低频采样，开启时清空之前累计的调用栈
+    """
+    require_admin(x_admin_token)
+    sampler = request.app.state.sampler
+    if sampler:
+        sampler.stop()
+        request.app.state.sampler = None
+    if enabled:
+        request.app.state.sampler = StackSampler(interval=interval).start()
+    return {"enabled": enabled, "interval": interval if enabled else None}
+
+@app.get("/admin/profile/stacks")
+async def profile_stacks_endpoint(
+    request: Request,
+    top: int = Query(TOP_N, ge=1),
+    format: str = Query("json", description="json 或 collapsed（折叠栈，可用于生成火焰图）"),
+    x_admin_token: str = Header(None)
+):
+    """
+    查看持续采样累计的热点函数和调用栈
+    """
+    require_admin(x_admin_token)
+    sampler = request.app.state.sampler
+    if sampler is None:
+        return JSONResponse(status_code=409, content={"error": "持续采样未开启"})
+    if format == "collapsed":
+        return PlainTextResponse(sampler.collapsed())
+    return {"running": sampler.running, "since": sampler.started_at, **sampler.report(top)}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    以 Prometheus 文本格式导出指标
+    """
+    return Response(content=metrics.render(), media_type=Registry.CONTENT_TYPE)
+
+# 启动服务器，生产模式见 spotify_server.py
+if __name__ == "__main__":
+    from spotify_server import main
+    main()
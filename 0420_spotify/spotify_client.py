@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# spotipy 和 requests 导入较慢，创建客户端时才导入，不拖慢服务启动
+if TYPE_CHECKING:
+    import requests
+from spotify_metrics import Counter, Histogram
+from spotify_ratelimit import RateLimiter, parse_retry_after, THROTTLED, RETRY, FATAL
+
+logger = logging.getLogger(__name__)
+
+# 凭据从环境变量读取（与 spotipy 使用相同的变量名），未设置时服务拒绝启动
+CLIENT_ID = os.getenv("SPOTIPY_CLIENT_ID", "")
+CLIENT_SECRET = os.getenv("SPOTIPY_CLIENT_SECRET", "")
+
+# 连接池大小、请求超时（秒）
+POOL_SIZE = int(os.getenv("SPOTIFY_POOL_SIZE", "50"))
+REQUEST_TIMEOUT = float(os.getenv("SPOTIFY_TIMEOUT", "10"))
+# 在令牌过期前多少秒刷新；刷新失败后的重试间隔
+TOKEN_REFRESH_MARGIN = float(os.getenv("SPOTIFY_TOKEN_REFRESH_MARGIN", "300"))
+TOKEN_RETRY_INTERVAL = float(os.getenv("SPOTIFY_TOKEN_RETRY_INTERVAL", "30"))
+# 查询播客集时使用的市场（例如 US），为空时不传
+MARKET = os.getenv("SPOTIFY_MARKET") or None
+# API 和令牌接口所在主机，限速和指标按主机统计
+API_HOST = "api.spotify.com"
+AUTH_HOST = "accounts.spotify.com"
+# 覆盖 API 前缀和令牌接口地址（例如压测时指向本地模拟服务），为空时使用 Spotify 官方地址
+API_URL = os.getenv("SPOTIFY_API_URL", "")
+AUTH_URL = os.getenv("SPOTIFY_AUTH_URL", "")
+# 合并请求：单次最多 50 个（Spotify 接口上限），最长等待时间（秒）
+BATCH_MAX_SIZE = min(int(os.getenv("SPOTIFY_BATCH_MAX_SIZE", "50")), 50)
+BATCH_MAX_WAIT = float(os.getenv("SPOTIFY_BATCH_MAX_WAIT", "0.005"))
+
+# 令牌换取耗时与上游响应状态，由 spotify_api 注册到 /metrics
+TOKEN_SECONDS = Histogram("spotify_token_exchange_seconds", "换取 Spotify 访问令牌的耗时（秒）")
+UPSTREAM_RESPONSES = Counter(
+    "spotify_upstream_responses_total",
+    "Spotify 接口响应数，status 为 error 表示连接失败或超时",
+    ("host", "status")
+)
+
+class MissingCredentials(RuntimeError):
+    """
+    没有配置 Spotify 应用凭据
+    """
+
+def check_credentials(client_id: str = CLIENT_ID, client_secret: str = CLIENT_SECRET) -> None:
+    """
+    凭据缺失时抛出 MissingCredentials，说明需要设置的环境变量
+    """
+    missing = [name for name, value in (("SPOTIPY_CLIENT_ID", client_id), ("SPOTIPY_CLIENT_SECRET", client_secret)) if not value]
+    if missing:
+        raise MissingCredentials(f"未设置 Spotify 凭据，请设置环境变量 {'、'.join(missing)}")
+
+def classify_error(error: BaseException):
+    """
+    判断 Spotify 请求错误是否可重试，返回 (结果分类, Retry-After 秒数)
+    """
+    import requests
+    import spotipy
+    if isinstance(error, spotipy.SpotifyException):
+        if error.http_status == 429 or error.http_status >= 500:
+            headers = error.headers or {}
+            return THROTTLED, parse_retry_after(headers.get("Retry-After"))
+        return FATAL, None
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return RETRY, None
+    return FATAL, None
+
+def create_session() -> "requests.Session":
+    """
+    创建带连接池的 requests 会话，令牌请求和 API 请求共用
+
+    这里只重试连接失败；429 和 5xx 交给 RateLimiter 统一降速和重试。
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=False,
+        status=0,
+        backoff_factor=0.3,
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class SpotifyClient:
+    """
+    进程内共享的 Spotify 客户端：复用连接，令牌保存在内存中并在过期前后台刷新
+    """
+
+    def __init__(self, client_id: str = CLIENT_ID, client_secret: str = CLIENT_SECRET):
+        check_credentials(client_id, client_secret)
+        import spotipy
+        from spotipy.cache_handler import MemoryCacheHandler
+        from spotipy.oauth2 import SpotifyClientCredentials
+        self.session = create_session()
+        self.cache_handler = MemoryCacheHandler()
+        self.auth_manager = SpotifyClientCredentials(
+            client_id=client_id,
+            client_secret=client_secret,
+            requests_session=self.session,
+            requests_timeout=REQUEST_TIMEOUT,
+            cache_handler=self.cache_handler
+        )
+        self.sp = spotipy.Spotify(
+            auth_manager=self.auth_manager,
+            requests_session=self.session,
+            requests_timeout=REQUEST_TIMEOUT
+        )
+        if AUTH_URL:
+            self.auth_manager.OAUTH_TOKEN_URL = AUTH_URL
+        if API_URL:
+            self.sp.prefix = API_URL
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.token_refreshes = 0
+        self.rate_limiter = RateLimiter()
+
+    def refresh_token(self) -> Dict[str, Any]:
+        """
+        立即换取新令牌并写入内存缓存
+        """
+        try:
+            with TOKEN_SECONDS.time():
+                self.auth_manager.get_access_token(as_dict=False, check_cache=False)
+        except Exception:
+            UPSTREAM_RESPONSES.inc(AUTH_HOST, "error")
+            raise
+        UPSTREAM_RESPONSES.inc(AUTH_HOST, "200")
+        self.token_refreshes += 1
+        return self.cache_handler.get_cached_token()
+
+    def token_expires_in(self) -> Optional[float]:
+        """
+        当前令牌剩余有效时间（秒），没有令牌时返回 None
+        """
+        token_info = self.cache_handler.get_cached_token()
+        if not token_info:
+            return None
+        return token_info["expires_at"] - time.time()
+
+    async def start(self) -> None:
+        """
+        启动时预先获取令牌，并启动后台刷新任务
+        """
+        try:
+            await asyncio.to_thread(self.refresh_token)
+        except Exception as e:
+            logger.warning("获取 Spotify 令牌失败，将在后台重试: %s", e)
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            expires_in = self.token_expires_in()
+            if expires_in is None:
+                delay = 0
+            else:
+                delay = max(expires_in - TOKEN_REFRESH_MARGIN, 0)
+            await asyncio.sleep(delay)
+            try:
+                await asyncio.to_thread(self.refresh_token)
+            except Exception as e:
+                logger.warning("刷新 Spotify 令牌失败: %s", e)
+                await asyncio.sleep(TOKEN_RETRY_INTERVAL)
+
+    async def close(self) -> None:
+        """
+        停止后台刷新并关闭连接
+        """
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        self.session.close()
+
+    async def call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """
+        在线程中执行一次 API 调用，按主机限速，被限流或连接失败时退避重试
+        """
+        import requests
+        import spotipy
+
+        def run() -> Any:
+            try:
+                result = method(*args)
+            except spotipy.SpotifyException as e:
+                UPSTREAM_RESPONSES.inc(API_HOST, str(e.http_status))
+                raise
+            except requests.RequestException:
+                UPSTREAM_RESPONSES.inc(API_HOST, "error")
+                raise
+            UPSTREAM_RESPONSES.inc(API_HOST, "200")
+            return result
+
+        return await self.rate_limiter.call(
+            API_HOST,
+            lambda: asyncio.to_thread(run),
+            classify_error
+        )
+
+    def prime_connection(self) -> None:
+        """
+        向 API 主机发一次不带令牌的 HEAD 请求，预先建立一条连接放入连接池
+        """
+        self.session.head(API_URL or f"https://{API_HOST}/", timeout=REQUEST_TIMEOUT)
+
+    def idle_connections(self) -> int:
+        """
+        连接池中可复用的空闲连接数（读取 urllib3 内部状态）
+        """
+        pools = self.session.get_adapter("https://").poolmanager.pools
+        idle = 0
+        for key in pools.keys():
+            queue = pools[key].pool
+            if queue is not None:
+                # 队列预先用 None 占位，只统计真实连接
+                idle += sum(1 for connection in list(queue.queue) if connection is not None)
+        return idle
+
+    def episode(self, episode_id: str) -> Dict[str, Any]:
+        return self.sp.episode(episode_id, market=MARKET)
+
+    def episodes(self, episode_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        一次请求获取多个播客集，找不到的位置为 None
+        """
+        return self.sp.episodes(episode_ids, market=MARKET)["episodes"]
+
+    def show(self, show_id: str) -> Dict[str, Any]:
+        """
+        获取节目信息，返回值中包含第一页播客集
+        """
+        return self.sp.show(show_id, market=MARKET)
+
+    def show_episodes(self, show_id: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """
+        分页获取节目的播客集
+        """
+        return self.sp.show_episodes(show_id, limit=limit, offset=offset, market=MARKET)
+
+class EpisodeBatcher:
+    """
+    合并短时间内到达的单集查询，用一次 episodes 请求取回后再分发给各调用方
+    """
+
+    def __init__(self, client: SpotifyClient, max_size: int = BATCH_MAX_SIZE, max_wait: float = BATCH_MAX_WAIT):
+        self.client = client
+        self.max_size = max_size
+        self.max_wait = max_wait
+        # episode ID -> 等待结果的调用方
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.batches = 0
+
+    async def get(self, episode_id: str) -> Dict[str, Any]:
+        """
+        查询单个播客集，与同一时间窗口内的其他查询合并执行
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(episode_id, []).append(future)
+        self.requests += 1
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        episode_ids = list(batch)
+        self.batches += 1
+        episodes = None
+        error: Optional[Exception] = None
+        try:
+            episodes = await self.client.call(self.client.episodes, episode_ids)
+            for episode_id, episode in zip(episode_ids, episodes):
+                for future in batch[episode_id]:
+                    if future.done():
+                        continue
+                    if episode is None:
+                        future.set_exception(LookupError(f"未找到播客集: {episode_id}"))
+                    else:
+                        future.set_result(episode)
+        except Exception as e:
+            error = e
+        finally:
+            # 请求失败、批次被取消或返回的条目少于请求的ID时，还在等待的调用方不能一直挂起
+            for episode_id, futures in batch.items():
+                for future in futures:
+                    if future.done():
+                        continue
+                    if error is not None:
+                        future.set_exception(error)
+                    elif episodes is None:
+                        future.cancel()
+                    else:
+                        future.set_exception(LookupError(f"Spotify 未返回播客集: {episode_id}"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0
+        }
+
+class SingleFlight:
+    """
+    合并同一键上同时进行的请求：第一个请求执行，其余请求等待它的结果或错误
+    """
+
+    def __init__(self):
+        # 键 -> 正在执行的任务
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行 fn()，同一键已有进行中的任务时直接等待该任务
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        # 某个调用方断开时不取消共享的任务
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有调用方都已断开时，避免“异常未被获取”的警告
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.calls + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / requests, 4) if requests else 0.0
+        }
+
+# 进程内共享实例
+_client: Optional[SpotifyClient] = None
+
+def get_spotify_client() -> SpotifyClient:
+    """
+    获取进程内共享的客户端，首次调用时创建
+    """
+    global _client
+    if _client is None:
+        _client = SpotifyClient()
+    return _client
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 与 0419_xiaohongshu/xiaohongshu_jobs.py 代码相同，只有环境变量前缀、默认值和说明文字不同。两个应用分别部署、互不导入，因此各保留一份；
+# 修改时同步另一份，tests/test_mirrored_modules.py 检查两份是否一致。
+
+"""
+异步任务队列：提交一批播客链接后立即返回任务ID，由固定数量的后台工作协程逐条处理
+
+  - 队列按条目计数，待处理条目超过 JOB_QUEUE_SIZE 时拒绝新任务（背压）
+  - 客户端轮询或长轮询任务状态，每次取回自上次以来完成的部分结果
+  - 设置 SPOTIFY_JOB_DB 时任务和已完成的结果写入 SQLite，重启后未完成的条目重新入队
+
+任务只保存在接收它的进程中，多个工作进程之间不共享，因此只在单工作进程下启用：
+启动入口把工作进程数写入 SPOTIFY_WORKER_PROCESSES，大于 1 时 API 不创建任务队列。
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# 工作协程数：整理单集在 CPU 上进行，耗时主要在等待 API；
+# 同时进行的单集查询会合并为一次批量请求，默认 50 个协程正好填满一批
+JOB_WORKERS = int(os.getenv("SPOTIFY_JOB_WORKERS", "50"))
+# 队列中最多等待的条目数，超出后新任务返回 429
+JOB_QUEUE_SIZE = int(os.getenv("SPOTIFY_JOB_QUEUE_SIZE", "10000"))
+# 单个任务最多条目数
+JOB_MAX_ITEMS = int(os.getenv("SPOTIFY_JOB_MAX_ITEMS", "1000"))
+# 已结束的任务保留多久（秒），过期后查询返回 404
+JOB_RETENTION = float(os.getenv("SPOTIFY_JOB_RETENTION", "3600"))
+# 长轮询最长等待时间（秒）
+JOB_MAX_WAIT = float(os.getenv("SPOTIFY_JOB_MAX_WAIT", "60"))
+# 队列满时建议客户端等待的时间（秒）
+JOB_RETRY_AFTER = int(os.getenv("SPOTIFY_JOB_RETRY_AFTER", "5"))
+# 持久化文件路径，默认为空即只保存在内存中
+JOB_DB = os.getenv("SPOTIFY_JOB_DB", "")
+# 服务的工作进程数，由启动入口设置
+WORKER_PROCESSES = max(1, int(os.getenv("SPOTIFY_WORKER_PROCESSES", "1")))
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FINISHED = (DONE, CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    items TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+class QueueFull(Exception):
+    """
+    队列中等待的条目过多，暂时不接受新任务
+    """
+
+    def __init__(self, message: str, retry_after: int = JOB_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class Job:
+    """
+    一个任务：输入条目、处理选项和按完成顺序排列的结果
+    """
+
+    def __init__(
+        self,
+        items: List[str],
+        options: Dict[str, Any],
+        job_id: Optional[str] = None,
+        status: str = QUEUED,
+        created_at: Optional[float] = None
+    ):
+        self.id = job_id or uuid.uuid4().hex
+        self.items = items
+        self.options = options
+        self.status = status
+        self.created_at = created_at or time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # 按完成顺序排列，每条带 index 指向输入位置
+        self.results: List[Dict[str, Any]] = []
+        self.done_indices = set()
+        # 仍在队列中等待的条目数，取消时从队列的待处理数中减去
+        self.queued = 0
+        self.succeeded = 0
+        self.failed = 0
+        # 每次有新结果或状态变化时触发，然后换成新的事件
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def add_result(self, entry: Dict[str, Any]) -> None:
+        self.results.append(entry)
+        self.done_indices.add(entry["index"])
+        if "data" in entry:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, since: int, timeout: float) -> None:
+        """
+        等到出现第 since 条之后的结果或任务结束，最多等待 timeout 秒
+        """
+        if timeout <= 0 or self.finished or len(self.results) > since:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self, since: int = 0) -> Dict[str, Any]:
+        """
+        任务状态，results 只包含第 since 条之后的结果，下次轮询传入 next
+        """
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.items),
+            "completed": len(self.results),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "results": self.results[since:],
+            "next": len(self.results)
+        }
+
+class JobStore:
+    """
+    SQLite 任务存储：任务在提交时写入，每条结果完成时写入；可在多个线程中共用
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def add(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, items, options, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job.id, json.dumps(job.items, ensure_ascii=False), json.dumps(job.options), job.status, job.created_at)
+            )
+            self._conn.commit()
+
+    def add_result(self, job_id: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, idx, entry) VALUES (?, ?, ?)",
+                (job_id, entry["index"], json.dumps(entry, ensure_ascii=False))
+            )
+            self._conn.commit()
+
+    def update(self, job_id: str, status: str, started_at: Optional[float], finished_at: Optional[float]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, finished_at = ? WHERE id = ?",
+                (status, started_at, finished_at, job_id)
+            )
+            self._conn.commit()
+
+    def load(self, retention: float) -> List[Job]:
+        """
+        读出未结束的任务和保留期内已结束的任务，同时删除过期任务
+        """
+        expired = time.time() - retention
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM job_results WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)",
+                (expired,)
+            )
+            self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (expired,))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT id, items, options, status, created_at, started_at, finished_at FROM jobs ORDER BY created_at"
+            ).fetchall()
+            results = self._conn.execute("SELECT job_id, entry FROM job_results ORDER BY rowid").fetchall()
+        jobs = {}
+        for job_id, items, options, status, created_at, started_at, finished_at in rows:
+            job = Job(json.loads(items), json.loads(options), job_id, status, created_at)
+            job.started_at = started_at
+            job.finished_at = finished_at
+            jobs[job_id] = job
+        for job_id, entry in results:
+            if job_id in jobs:
+                jobs[job_id].add_result(json.loads(entry))
+        return list(jobs.values())
+
+    def delete(self, job_ids: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM job_results WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class JobQueue:
+    """
+    进程内任务队列：条目按提交顺序排队，workers 个工作协程逐条调用 runner(item, options)
+
+    runner 返回该条目的结果字典（成功时含 data，失败时含 error），抛出的异常记为该条失败。
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        workers: int = JOB_WORKERS,
+        maxsize: int = JOB_QUEUE_SIZE,
+        retention: float = JOB_RETENTION,
+        path: str = JOB_DB
+    ):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self.retention = retention
+        self.jobs: Dict[str, Job] = {}
+        self.processed = 0
+        self.rejected = 0
+        self.busy = 0
+        # 未取消的任务在队列中的条目数；已取消任务的条目仍留在队列中，但不计入
+        self._pending = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self.store = JobStore(path) if path else None
+        # SQLite 写入放在单独的线程中按顺序执行，不阻塞事件循环
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spotify-jobs") if path else None
+
+    async def _write(self, method: str, *args: Any) -> None:
+        """
+        在写入线程中调用 JobStore 的方法，未启用持久化时什么也不做
+        """
+        if self.store is not None:
+            await asyncio.get_running_loop().run_in_executor(self._writer, getattr(self.store, method), *args)
+
+    async def start(self) -> None:
+        """
+        恢复持久化的任务并启动工作协程
+        """
+        if self.store is not None:
+            jobs = await asyncio.get_running_loop().run_in_executor(self._writer, self.store.load, self.retention)
+            restored = 0
+            for job in jobs:
+                self.jobs[job.id] = job
+                if job.finished:
+                    continue
+                remaining = [index for index in range(len(job.items)) if index not in job.done_indices]
+                # 最后一条结果已写入、但状态还没来得及更新时退出，恢复后直接结束
+                if not remaining:
+                    await self._finish(job, DONE)
+                    continue
+                self._enqueue(job, remaining)
+                restored += len(remaining)
+            if restored:
+                print(f"已恢复 {restored} 条未完成的任务条目")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        停止工作协程；持久化时正在处理的条目在下次启动时重新处理
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store is not None:
+            await asyncio.get_running_loop().run_in_executor(self._writer, self.store.close)
+            self._writer.shutdown(wait=True)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _enqueue(self, job: Job, indices: List[int]) -> None:
+        for index in indices:
+            self._queue.put_nowait((job.id, index))
+        job.queued += len(indices)
+        self._pending += len(indices)
+
+    async def submit(self, items: List[str], options: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        提交任务，立即返回；队列放不下全部条目时抛出 QueueFull，不接受部分条目
+        """
+        if self.pending + len(items) > self.maxsize:
+            self.rejected += 1
+            raise QueueFull(f"任务队列已满（等待中 {self.pending} 条，上限 {self.maxsize} 条），请稍后重试")
+        self._prune()
+        job = Job(list(items), options or {})
+        self.jobs[job.id] = job
+        self._enqueue(job, list(range(len(job.items))))
+        await self._write("add", job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        取消任务：尚未开始的条目不再处理，已完成的结果保留
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        await self._finish(job, CANCELLED)
+        return job
+
+    async def _finish(self, job: Job, status: str) -> None:
+        # 剩余条目出队时直接跳过，不再计入待处理数
+        self._pending -= job.queued
+        job.queued = 0
+        job.status = status
+        job.finished_at = time.time()
+        job.notify()
+        await self._write("update", job.id, job.status, job.started_at, job.finished_at)
+
+    def _prune(self) -> None:
+        """
+        删除超过保留期的已结束任务
+        """
+        expired = time.time() - self.retention
+        job_ids = [job.id for job in self.jobs.values() if job.finished and job.finished_at < expired]
+        for job_id in job_ids:
+            del self.jobs[job_id]
+        if job_ids and self._writer is not None:
+            self._writer.submit(self.store.delete, job_ids)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, index = await self._queue.get()
+            job = self.jobs.get(job_id)
+            # 任务已取消或已过期时跳过剩余条目，这些条目在结束任务时已从待处理数中减去
+            if job is None or job.finished:
+                continue
+            job.queued -= 1
+            self._pending -= 1
+            if index in job.done_indices:
+                continue
+            if job.status == QUEUED:
+                job.status = RUNNING
+                job.started_at = time.time()
+                await self._write("update", job.id, job.status, job.started_at, None)
+            item = job.items[index]
+            self.busy += 1
+            try:
+                entry = await self.runner(item, job.options)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                entry = {"input": item, "error": f"处理时发生错误: {str(e)}"}
+            finally:
+                self.busy -= 1
+            self.processed += 1
+            if job.finished:
+                continue
+            entry = {"index": index, **entry}
+            job.add_result(entry)
+            await self._write("add_result", job.id, entry)
+            if len(job.results) == len(job.items):
+                await self._finish(job, DONE)
+            else:
+                job.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        statuses = {status: 0 for status in (QUEUED, RUNNING, DONE, CANCELLED)}
+        for job in self.jobs.values():
+            statuses[job.status] += 1
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "pending": self.pending,
+            "max_pending": self.maxsize,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "jobs": statuses,
+            "persistent": self.store is not None
+        }
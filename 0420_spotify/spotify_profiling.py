@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 与 0419_xiaohongshu/xiaohongshu_profiling.py 逐行对应，只有环境变量前缀不同。两个应用分别部署、互不导入，因此各保留一份；
+# 修改时同步另一份，tests/test_mirrored_modules.py 检查两份是否一致。
+
+import os
+import sys
+import time
+import hmac
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 管理员令牌，未设置时不允许开启分析
+ADMIN_TOKEN = os.getenv("SPOTIFY_ADMIN_TOKEN", "")
+# 分析结果文件保存目录
+PROFILE_DIR = os.getenv("SPOTIFY_PROFILE_DIR", "profiles")
+# 单次请求采样间隔、持续采样间隔（秒）
+SAMPLE_INTERVAL = float(os.getenv("SPOTIFY_PROFILE_SAMPLE_INTERVAL", "0.001"))
+CONTINUOUS_INTERVAL = float(os.getenv("SPOTIFY_PROFILE_CONTINUOUS_INTERVAL", "0.05"))
+# 持续采样最多保留的不同调用栈数，超出后新栈计入 (other)
+MAX_STACKS = int(os.getenv("SPOTIFY_PROFILE_MAX_STACKS", "5000"))
+# 返回的热点函数条数
+TOP_N = int(os.getenv("SPOTIFY_PROFILE_TOP", "20"))
+
+# 分析模式
+CPROFILE = "cprofile"
+SAMPLING = "sampling"
+MODES = (CPROFILE, SAMPLING)
+
+# 栈顶落在这些位置的线程处于空闲等待，不计入采样
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+IDLE_FUNCTIONS = {("thread.py", "_worker")}
+OTHER_STACK = ("(other)",)
+
+def is_admin(token: Optional[str]) -> bool:
+    """
+    校验管理员令牌，未配置令牌时始终返回 False
+    """
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _stack(frame) -> Optional[Tuple[str, ...]]:
+    """
+    把帧链转换为从根到叶的调用栈，空闲线程返回 None
+    """
+    leaf = frame.f_code
+    filename = os.path.basename(leaf.co_filename)
+    if filename in IDLE_FILES or (filename, leaf.co_name) in IDLE_FUNCTIONS:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+class StackSampler:
+    """
+    后台线程定时读取 sys._current_frames()，按调用栈累计采样次数
+
+    thread_ids 为空时采样除自身外的所有线程。
+    """
+
+    def __init__(
+        self,
+        interval: float = SAMPLE_INTERVAL,
+        thread_ids: Optional[List[int]] = None,
+        max_stacks: int = MAX_STACKS
+    ):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.max_stacks = max_stacks
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "StackSampler":
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="spotify-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.started_at = time.time()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(own_id)
+
+    def sample(self, own_id: Optional[int] = None) -> None:
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                stack = _stack(frame)
+                if stack is None:
+                    continue
+                if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                    stack = OTHER_STACK
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def report(self, top: int = TOP_N) -> Dict[str, Any]:
+        """
+        汇总热点：按自身采样数（栈顶）和累计采样数（出现在栈中）排序的函数，以及最热的调用栈
+        """
+        with self._lock:
+            stacks = dict(self.stacks)
+            samples = self.samples
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        share = lambda count: round(count / samples, 4) if samples else 0.0
+        return {
+            "mode": SAMPLING,
+            "interval": self.interval,
+            "samples": samples,
+            "top_self": [{"function": f, "samples": c, "share": share(c)} for f, c in own.most_common(top)],
+            "top_total": [{"function": f, "samples": c, "share": share(c)} for f, c in total.most_common(top)],
+            "top_stacks": [{"stack": ";".join(s), "samples": c} for s, c in Counter(stacks).most_common(top)]
+        }
+
+    def collapsed(self) -> str:
+        """
+        输出 flamegraph.pl / speedscope 可读的折叠栈格式
+        """
+        with self._lock:
+            return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+def _cprofile_report(profiler: cProfile.Profile, top: int) -> Dict[str, Any]:
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{name} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6)
+        })
+    rows.sort(key=lambda row: row["tottime"], reverse=True)
+    return {"mode": CPROFILE, "total_calls": stats.total_calls, "top": rows[:top]}
+
+def _profile_path(prefix: str, suffix: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{threading.get_ident() % 100000}{suffix}"
+    return os.path.join(PROFILE_DIR, name)
+
+def profile_call(
+    mode: str,
+    fn: Callable[..., Any],
+    *args: Any,
+    top: int = TOP_N,
+    save: bool = False,
+    name: str = "scrape"
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    在当前线程中执行 fn(*args) 并分析，返回 (结果, 分析报告)
+
+    cprofile 为确定性分析，记录每次函数调用；sampling 只在后台线程定时采样当前线程，
+    开销更低。save 为 True 时把 .prof 或折叠栈文件写入 PROFILE_DIR，路径放在报告的 file 字段中。
+    """
+    start = time.perf_counter()
+    if mode == CPROFILE:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = fn(*args)
+        finally:
+            profiler.disable()
+        report = _cprofile_report(profiler, top)
+        if save:
+            report["file"] = _profile_path(name, ".prof")
+            profiler.dump_stats(report["file"])
+    elif mode == SAMPLING:
+        sampler = StackSampler(thread_ids=[threading.get_ident()]).start()
+        try:
+            result = fn(*args)
+        finally:
+            sampler.stop()
+        report = sampler.report(top)
+        if save:
+            report["file"] = _profile_path(name, ".collapsed")
+            with open(report["file"], "w", encoding="utf-8") as f:
+                f.write(sampler.collapsed())
+    else:
+        raise ValueError(f"未知的分析模式: {mode}")
+    report["seconds"] = round(time.perf_counter() - start, 6)
+    return result, report
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 与 0419_xiaohongshu/xiaohongshu_ratelimit.py 代码相同，只有环境变量前缀和默认值不同。两个应用分别部署、互不导入，因此各保留一份；
+# 修改时同步另一份，tests/test_mirrored_modules.py 检查两份是否一致。
+
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# 服务的工作进程数，由启动入口设置。限速状态在每个进程内各自维护，
+# 下面的速率、突发容量、并发数和 AIMD 步长都是所有进程合计的值，启动时按进程数平分
+WORKER_PROCESSES = max(1, int(os.getenv("SPOTIFY_WORKER_PROCESSES", "1")))
+# 每个上游主机的初始/最小/最大请求速率（次/秒）与突发容量
+RATE = float(os.getenv("SPOTIFY_RATE", "10")) / WORKER_PROCESSES
+MIN_RATE = float(os.getenv("SPOTIFY_MIN_RATE", "0.2")) / WORKER_PROCESSES
+MAX_RATE = float(os.getenv("SPOTIFY_MAX_RATE", "50")) / WORKER_PROCESSES
+BURST = max(1.0, float(os.getenv("SPOTIFY_BURST", "20")) / WORKER_PROCESSES)
+# 每个上游主机的初始/最大并发数
+CONCURRENCY = max(1.0, float(os.getenv("SPOTIFY_CONCURRENCY", "8")) / WORKER_PROCESSES)
+MAX_CONCURRENCY = max(1.0, float(os.getenv("SPOTIFY_MAX_CONCURRENCY", "64")) / WORKER_PROCESSES)
+# AIMD：成功时每秒约增加的速率，被限流时的乘性减小系数
+RATE_STEP = float(os.getenv("SPOTIFY_RATE_STEP", "0.5")) / WORKER_PROCESSES
+DECREASE_FACTOR = float(os.getenv("SPOTIFY_DECREASE_FACTOR", "0.5"))
+# 重试：最多尝试次数、总时限（秒）、退避基数与上限（秒）
+RETRY_ATTEMPTS = int(os.getenv("SPOTIFY_RETRY_ATTEMPTS", "4"))
+RETRY_DEADLINE = float(os.getenv("SPOTIFY_RETRY_DEADLINE", "20"))
+RETRY_BASE = float(os.getenv("SPOTIFY_RETRY_BASE", "0.5"))
+RETRY_CAP = float(os.getenv("SPOTIFY_RETRY_CAP", "8"))
+
+# 请求结果分类
+OK = "ok"
+THROTTLED = "throttled"  # 429、5xx、验证码页：重试，并降低速率和并发
+RETRY = "retry"          # 连接错误、超时：重试，不调整速率
+FATAL = "fatal"          # 其他错误：直接抛出
+
+class UpstreamThrottled(Exception):
+    """
+    上游持续限流，在总时限内重试仍未成功
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 头（秒数或 HTTP 日期），返回需要等待的秒数
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE, cap: float = RETRY_CAP) -> float:
+    """
+    带抖动的指数退避（full jitter）：在 [0, min(cap, base * 2^attempt)] 中随机取值
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class HostLimiter:
+    """
+    单个上游主机的令牌桶限速 + AIMD 自适应并发
+
+    成功时速率和并发上限线性增加，被限流时乘性减小；同一轮限流只减小一次，
+    在减小之前发出的请求再失败不会重复减小。Retry-After 会暂停该主机的所有请求。
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE,
+        burst: float = BURST,
+        concurrency: float = CONCURRENCY,
+        min_rate: float = MIN_RATE,
+        max_rate: float = MAX_RATE,
+        max_concurrency: float = MAX_CONCURRENCY
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.limit = concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.tokens = burst
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Condition()
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """
+        等待令牌和并发名额，返回请求开始时间
+        """
+        # 按到达顺序排队取令牌
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, started: float, outcome: str, retry_after: Optional[float] = None) -> None:
+        """
+        归还并发名额，并根据结果调整速率和并发上限
+        """
+        now = time.monotonic()
+        if outcome == OK:
+            self.successes += 1
+            # 约每秒增加 RATE_STEP，每个并发窗口增加 1
+            self.rate = min(self.max_rate, self.rate + RATE_STEP / self.rate)
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        elif outcome == THROTTLED:
+            self.throttled += 1
+            if started >= self._last_decrease:
+                self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+                self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                self.tokens = min(self.tokens, 0.0)
+                self._last_decrease = now
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+        else:
+            self.errors += 1
+
+        async with self._slots:
+            self.in_flight -= 1
+            self._slots.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "blocked_for": round(max(self.blocked_until - time.monotonic(), 0.0), 3),
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "errors": self.errors
+        }
+
+class RateLimiter:
+    """
+    按主机维护 HostLimiter，并提供带重试的调用
+    """
+
+    def __init__(self, **limiter_options: Any):
+        self.limiter_options = limiter_options
+        self._hosts: Dict[str, HostLimiter] = {}
+        self.retries = 0
+
+    def for_host(self, host: str) -> HostLimiter:
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = self._hosts[host] = HostLimiter(**self.limiter_options)
+        return limiter
+
+    async def call(
+        self,
+        host: str,
+        fn: Callable[[], Awaitable[Any]],
+        classify: Callable[[BaseException], Tuple[str, Optional[float]]],
+        attempts: int = RETRY_ATTEMPTS,
+        deadline: float = RETRY_DEADLINE
+    ) -> Any:
+        """
+        在主机限速下执行 fn()，可重试的错误按退避或 Retry-After 等待后重试，
+        超过次数或总时限时抛出最后一次的错误（持续限流时抛出 UpstreamThrottled）
+        """
+        limiter = self.for_host(host)
+        give_up_at = None
+        attempt = 0
+        while True:
+            started = await limiter.acquire()
+            # 总时限从第一次真正发出请求开始计算，不包括排队等待的时间
+            if give_up_at is None:
+                give_up_at = started + deadline
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                await limiter.release(started, RETRY)
+                raise
+            except Exception as e:
+                outcome, retry_after = classify(e)
+                await limiter.release(started, outcome, retry_after)
+                attempt += 1
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                if outcome == FATAL or attempt >= attempts or time.monotonic() + delay > give_up_at:
+                    if outcome == THROTTLED:
+                        raise UpstreamThrottled(f"上游限流: {e}", retry_after) from e
+                    raise
+                self.retries += 1
+                await asyncio.sleep(delay)
+            else:
+                await limiter.release(started, OK)
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_processes": WORKER_PROCESSES,
+            "retries": self.retries,
+            "hosts": {host: limiter.stats() for host, limiter in self._hosts.items()}
+        }
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 与 0419_xiaohongshu/xiaohongshu_search.py 的分词和查询部分（split_runs 到 make_snippet）相同，索引表结构各自不同。
+# 两个应用分别部署、互不导入，因此各保留一份；修改时同步另一份，tests/test_mirrored_modules.py 检查两份是否一致。
+
+"""
+本地全文检索：把播客集写入 SQLite FTS5 倒排索引，按关键词检索标题、节目名和描述，
+命中的播客集同时列出匹配的章节时间戳
+
+中文按相邻两字切分（二元分词），英文和数字按单词切分并转为小写。查询按同样的方式切分，
+每个查询词内的词元必须相邻出现（短语匹配），所有查询词都出现才算命中，按 BM25 排序。
+索引使用无内容（contentless）FTS5 表，原文只在 docs 表中保存一份；内容未变的播客集不重写索引。
+
+API 默认不建索引；设置 SPOTIFY_SEARCH_INDEX 为文件路径后，提取到的播客集才在后台写入索引，
+/search 才可用。命令行工具未设置该变量时使用 spotify_search.db。
+
+用法：
+    python spotify_search.py index episodes.jsonl
+    python spotify_search.py search "播客 创业"
+    python spotify_search.py stats
+    python spotify_search.py rebuild
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 索引文件路径，默认为空即 API 不启用
+SEARCH_INDEX_PATH = os.getenv("SPOTIFY_SEARCH_INDEX", "")
+# 默认和最多返回的结果数
+SEARCH_LIMIT = int(os.getenv("SPOTIFY_SEARCH_LIMIT", "20"))
+SEARCH_MAX_LIMIT = int(os.getenv("SPOTIFY_SEARCH_MAX_LIMIT", "100"))
+# 摘要长度（字符）
+SNIPPET_CHARS = int(os.getenv("SPOTIFY_SEARCH_SNIPPET_CHARS", "80"))
+# BM25 中单集标题、节目名、描述的权重
+COLUMN_WEIGHTS = (5.0, 3.0, 1.0)
+
+# 中日韩文字：假名、统一表意文字（含扩展A）、谚文、兼容表意文字
+CJK_RANGES = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+CJK_RUN = re.compile(f"[{CJK_RANGES}]+")
+# 连续的中日韩文字，或连续的其他字母数字
+RUN_PATTERN = re.compile(f"[{CJK_RANGES}]+|[^\\W_{CJK_RANGES}]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamps TEXT NOT NULL,
+    upload_date TEXT,
+    image TEXT,
+    digest TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(title, author, content, content='');
+"""
+
+def split_runs(text: str) -> List[str]:
+    """
+    规范化（NFKC、小写）后切成连续的中日韩文字段和字母数字段
+    """
+    return RUN_PATTERN.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+def run_tokens(run: str) -> List[str]:
+    """
+    中日韩文字段切成相邻两字，其他段整体作为一个词元
+    """
+    if len(run) > 1 and CJK_RUN.fullmatch(run):
+        return [run[i:i + 2] for i in range(len(run) - 1)]
+    return [run]
+
+def index_tokens(text: str) -> List[str]:
+    """
+    建索引用的词元；中日韩文字段末尾再加上最后一个字，单字查询用前缀匹配即可找到每一处
+    """
+    tokens = []
+    for run in split_runs(text):
+        tokens.extend(run_tokens(run))
+        if len(run) > 1 and CJK_RUN.fullmatch(run):
+            tokens.append(run[-1])
+    return tokens
+
+def index_text(text: str) -> str:
+    return " ".join(index_tokens(text))
+
+def parse_query(query: str) -> List[Tuple[List[str], bool]]:
+    """
+    把查询切成短语列表，每项为 (词元, 是否前缀匹配)；单个中日韩文字用前缀匹配
+    """
+    phrases = []
+    for run in split_runs(query):
+        phrases.append((run_tokens(run), len(run) == 1 and bool(CJK_RUN.fullmatch(run))))
+    return phrases
+
+def match_expression(phrases: List[Tuple[List[str], bool]]) -> str:
+    """
+    生成 FTS5 查询表达式：每个短语加引号，多个短语之间为 AND
+    """
+    return " ".join(f'"{" ".join(tokens)}"' + ("*" if prefix else "") for tokens, prefix in phrases)
+
+def phrase_matches(text: str, phrases: List[Tuple[List[str], bool]]) -> bool:
+    """
+    判断一段文本是否包含全部短语，与索引的匹配规则一致
+    """
+    tokens = " " + index_text(text) + " "
+    for words, prefix in phrases:
+        needle = " " + " ".join(words) + ("" if prefix else " ")
+        if needle not in tokens:
+            return False
+    return True
+
+def make_snippet(text: str, query: str, size: int = SNIPPET_CHARS) -> str:
+    """
+    截取第一个查询词附近的一段文本，找不到时取开头
+    """
+    text = text or ""
+    start = 0
+    for run in split_runs(query):
+        match = re.search(re.escape(run), text, re.IGNORECASE)
+        if match:
+            start = max(0, match.start() - size // 4)
+            break
+    snippet = text[start:start + size]
+    return ("…" if start > 0 else "") + snippet + ("…" if start + size < len(text) else "")
+
+def timestamp_seconds(value: str) -> int:
+    """
+    把 HH:MM:SS 或 MM:SS 转换为秒数
+    """
+    seconds = 0
+    for part in value.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+def episode_key(url: str) -> str:
+    """
+    从播客集链接中取出 episode ID 作为索引键
+    """
+    return url.split('/')[-1].split('?')[0]
+
+def _digest(*values: str) -> str:
+    return hashlib.sha1("\x00".join(values).encode("utf-8")).hexdigest()
+
+class SearchIndex:
+    """
+    SQLite FTS5 倒排索引，每个播客集一行；可在多个线程中共用
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.documents = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        self.writes = 0
+        self.unchanged = 0
+        self.queries = 0
+
+    def _add(self, key: str, url: str, result: Dict[str, Any]) -> bool:
+        title = result.get("episode_title") or ""
+        author = result.get("podcast_name") or ""
+        content = result.get("description") or ""
+        timestamps = json.dumps(result.get("timestamps") or [], ensure_ascii=False)
+        upload_date = result.get("upload_date")
+        image = result.get("image")
+        digest = _digest(title, author, content, timestamps)
+        row = self._conn.execute(
+            "SELECT id, title, author, content, digest FROM docs WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None and row[4] == digest:
+            self.unchanged += 1
+            return False
+        if row is None:
+            doc_id = self._conn.execute(
+                "INSERT INTO docs (key, url, title, author, content, timestamps, upload_date, image, digest, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, title, author, content, timestamps, upload_date, image, digest, time.time())
+            ).lastrowid
+            self.documents += 1
+        else:
+            doc_id = row[0]
+            # 无内容表删除时需要提供原来写入的词元
+            self._conn.execute(
+                "INSERT INTO docs_fts (docs_fts, rowid, title, author, content) VALUES ('delete', ?, ?, ?, ?)",
+                (doc_id, index_text(row[1]), index_text(row[2]), index_text(row[3]))
+            )
+            self._conn.execute(
+                "UPDATE docs SET url = ?, title = ?, author = ?, content = ?, timestamps = ?, upload_date = ?, image = ?, "
+                "digest = ?, indexed_at = ? WHERE id = ?",
+                (url, title, author, content, timestamps, upload_date, image, digest, time.time(), doc_id)
+            )
+        self._conn.execute(
+            "INSERT INTO docs_fts (rowid, title, author, content) VALUES (?, ?, ?, ?)",
+            (doc_id, index_text(title), index_text(author), index_text(content))
+        )
+        self.writes += 1
+        return True
+
+    def add(self, key: str, url: str, result: Dict[str, Any]) -> bool:
+        """
+        写入或更新一个播客集，内容未变时不改动索引；返回是否写入
+        """
+        with self._lock:
+            written = self._add(key, url, result)
+            self._conn.commit()
+        return written
+
+    def add_many(self, records: Iterable[Tuple[str, str, Dict[str, Any]]], batch_size: int = 1000) -> int:
+        """
+        批量写入 (key, url, 结果)，每 batch_size 条提交一次；返回写入条数
+        """
+        written = 0
+        with self._lock:
+            for i, (key, url, result) in enumerate(records, 1):
+                written += self._add(key, url, result)
+                if i % batch_size == 0:
+                    self._conn.commit()
+            self._conn.commit()
+        return written
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        按相关度返回命中的播客集，每条附带 score、描述摘要和匹配的章节时间戳
+        """
+        phrases = parse_query(query)
+        if not phrases:
+            return []
+        with self._lock:
+            self.queries += 1
+            rows = self._conn.execute(
+                "SELECT rowid, rank FROM docs_fts WHERE docs_fts MATCH ? AND rank MATCH ? "
+                "ORDER BY rank LIMIT ? OFFSET ?",
+                (match_expression(phrases), f"bm25({', '.join(map(str, COLUMN_WEIGHTS))})", limit, offset)
+            ).fetchall()
+            if not rows:
+                return []
+            ids = [row[0] for row in rows]
+            docs = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    f"SELECT id, key, url, title, author, content, timestamps, upload_date, image FROM docs "
+                    f"WHERE id IN ({','.join('?' * len(ids))})",
+                    ids
+                )
+            }
+        results = []
+        for doc_id, rank in rows:
+            key, url, title, author, content, timestamps, upload_date, image = docs[doc_id]
+            # 章节级命中：描述中的时间戳条目单独匹配，可直接跳转到对应位置
+            hits = [
+                {**chapter, "seconds": timestamp_seconds(chapter["time"])}
+                for chapter in json.loads(timestamps)
+                if phrase_matches(chapter["description"], phrases)
+            ]
+            results.append({
+                "key": key,
+                "url": url,
+                "episode_title": title,
+                "podcast_name": author,
+                "upload_date": upload_date,
+                "image": image,
+                # bm25 越小越相关，取反后越大越相关
+                "score": round(-rank, 4),
+                "snippet": make_snippet(content, query),
+                "timestamps": hits
+            })
+        return results
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """
+        用 docs 表中的原文重建倒排索引（分词规则变化后使用），并合并索引段
+        """
+        count = 0
+        with self._lock:
+            self._conn.execute("INSERT INTO docs_fts (docs_fts) VALUES ('delete-all')")
+            last_id = 0
+            while True:
+                rows = self._conn.execute(
+                    "SELECT id, title, author, content FROM docs WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                self._conn.executemany(
+                    "INSERT INTO docs_fts (rowid, title, author, content) VALUES (?, ?, ?, ?)",
+                    [(doc_id, index_text(title), index_text(author), index_text(content)) for doc_id, title, author, content in rows]
+                )
+                count += len(rows)
+                last_id = rows[-1][0]
+            self._conn.execute("INSERT INTO docs_fts (docs_fts) VALUES ('optimize')")
+            self._conn.commit()
+        return count
+
+    def optimize(self) -> None:
+        """
+        合并索引段，大批量写入后执行可以加快查询
+        """
+        with self._lock:
+            self._conn.execute("INSERT INTO docs_fts (docs_fts) VALUES ('optimize')")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "path": self.path,
+            "documents": self.documents,
+            "bytes": page_count * page_size,
+            "writes": self.writes,
+            "unchanged": self.unchanged,
+            "queries": self.queries
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def iter_results(path: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    从结果文件中读出 (key, url, 结果)
+
+    支持 /show/episodes 输出的 NDJSON、单条结果或 /scrape/batch 返回的 JSON 文件。
+    """
+    def expand(record: Any) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        if isinstance(record, list):
+            for item in record:
+                yield from expand(item)
+        elif isinstance(record, dict):
+            if isinstance(record.get("results"), list):
+                yield from expand(record["results"])
+            elif isinstance(record.get("data"), dict):
+                url = record["data"].get("url") or record.get("url")
+                if url:
+                    yield episode_key(url), url, record["data"]
+            elif record.get("url") and "episode_title" in record:
+                yield episode_key(record["url"]), record["url"], record
+
+    with open(path, encoding="utf-8") as f:
+        first = f.readline()
+        try:
+            records = [json.loads(first)] if first.strip() else []
+        except ValueError:
+            # 不是 JSONL，按整个 JSON 文件读取
+            f.seek(0)
+            yield from expand(json.load(f))
+            return
+        for record in records:
+            yield from expand(record)
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            yield from expand(record)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spotify 播客本地全文检索")
+    parser.add_argument("--db", default=SEARCH_INDEX_PATH or "spotify_search.db", help="索引文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    index_parser = sub.add_parser("index", help="把结果文件写入索引（JSONL 或 JSON）")
+    index_parser.add_argument("files", nargs="+")
+    search_parser = sub.add_parser("search", help="检索")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-n", "--limit", type=int, default=SEARCH_LIMIT)
+    sub.add_parser("stats", help="查看索引统计")
+    sub.add_parser("rebuild", help="用已保存的原文重建倒排索引")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.db)
+    try:
+        if args.command == "index":
+            start = time.time()
+            for path in args.files:
+                written = index.add_many(iter_results(path))
+                print(f"{path}: 写入 {written} 条")
+            index.optimize()
+            print(f"索引完成，共 {index.documents} 集，耗时 {time.time() - start:.1f}s")
+        elif args.command == "search":
+            start = time.perf_counter()
+            results = index.search(args.query, args.limit)
+            for result in results:
+                print(f"{result['score']:>8.3f}  {result['episode_title']}  @{result['podcast_name']}  {result['url']}")
+                print(f"          {result['snippet']}")
+                for chapter in result["timestamps"]:
+                    print(f"          [{chapter['time']}] {chapter['description']}")
+            print(f"{len(results)} 条结果，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+        elif args.command == "stats":
+            print(json.dumps(index.stats(), ensure_ascii=False, indent=2))
+        elif args.command == "rebuild":
+            start = time.time()
+            count = index.rebuild()
+            print(f"重建完成，共 {count} 集，耗时 {time.time() - start:.1f}s")
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
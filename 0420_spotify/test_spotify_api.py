@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+节目播客集抓取的测试：逐页获取、预取下一页、按字段输出，以及中途出错时的 NDJSON error 行
+"""
+
+import json
+import asyncio
+
+from spotify_api import crawl_show_episodes, stream_show_episodes
+
+def make_episode(number: int) -> dict:
+    return {
+        "id": f"ep{number}",
+        "name": f"第{number}集",
+        "description": "00:00 - 开场\n12:30 - 正题",
+        "release_date": "2024-01-01",
+        "duration_ms": 3600000 + number,
+        "images": [],
+        "language": "zh",
+        "explicit": False,
+        "external_urls": {"spotify": f"https://open.spotify.com/episode/ep{number}"}
+    }
+
+class StubClient:
+    """
+    按页返回节目播客集；pages[0] 随节目信息返回，其余页按 offset 请求
+    """
+
+    def __init__(self, pages, fail_at=None):
+        self.pages = pages
+        self.fail_at = fail_at
+        self.offsets = []
+
+    async def call(self, method, *args):
+        await asyncio.sleep(0)
+        return method(*args)
+
+    def show(self, show_id):
+        return {
+            "name": "测试节目",
+            "external_urls": {"spotify": f"https://open.spotify.com/show/{show_id}"},
+            "episodes": self.page_at(0)
+        }
+
+    def show_episodes(self, show_id, offset=0, limit=50):
+        self.offsets.append(offset)
+        if offset == self.fail_at:
+            raise RuntimeError("upstream 502")
+        return self.page_at(offset)
+
+    def page_at(self, offset):
+        start = 0
+        for index, items in enumerate(self.pages):
+            if start == offset:
+                has_next = index + 1 < len(self.pages)
+                return {"items": [make_episode(number) for number in items], "next": "next-page" if has_next else None}
+            start += len(items)
+        raise AssertionError(f"unexpected offset {offset}")
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+def test_crawl_reads_every_page():
+    client = StubClient([[1, 2], [3, 4], [5]])
+    records = asyncio.run(collect(crawl_show_episodes("show1", client)))
+    assert [record["url"] for record in records] == [f"https://open.spotify.com/episode/ep{n}" for n in range(1, 6)]
+    assert client.offsets == [2, 4]
+    assert records[0]["podcast_name"] == "测试节目"
+    assert records[0]["additional_info"]["show_url"] == "https://open.spotify.com/show/show1"
+    assert records[0]["timestamps"] == [{"time": "00:00", "description": "开场"}, {"time": "12:30", "description": "正题"}]
+
+def test_crawl_single_page_makes_no_extra_request():
+    client = StubClient([[1, 2]])
+    records = asyncio.run(collect(crawl_show_episodes("show1", client)))
+    assert len(records) == 2
+    assert client.offsets == []
+
+def test_crawl_prefetches_next_page():
+    async def main():
+        client = StubClient([[1, 2], [3]])
+        crawl = crawl_show_episodes("show1", client)
+        await crawl.__anext__()
+        # 还在处理第一页时，第二页已经开始请求
+        await asyncio.sleep(0.01)
+        assert client.offsets == [2]
+        assert [record["url"][-3:] async for record in crawl] == ["ep2", "ep3"]
+
+    asyncio.run(main())
+
+def test_crawl_closed_early_cancels_prefetch():
+    async def main():
+        client = StubClient([[1, 2], [3]])
+        crawl = crawl_show_episodes("show1", client)
+        await crawl.__anext__()
+        await crawl.aclose()
+        await asyncio.sleep(0.01)
+        # 预取任务已取消，没有留下未完成的任务
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        assert pending == []
+
+    asyncio.run(main())
+
+def test_crawl_selects_fields():
+    client = StubClient([[1], [2]])
+    records = asyncio.run(collect(crawl_show_episodes("show1", client, frozenset({"episode_title"}))))
+    assert records == [
+        {"episode_title": "第1集", "url": "https://open.spotify.com/episode/ep1"},
+        {"episode_title": "第2集", "url": "https://open.spotify.com/episode/ep2"}
+    ]
+
+def test_stream_writes_ndjson_and_error_line_mid_stream():
+    client = StubClient([[1, 2], [3, 4], [5]], fail_at=4)
+    lines = asyncio.run(collect(stream_show_episodes("show1", client)))
+    assert all(line.endswith("\n") for line in lines)
+    records = [json.loads(line) for line in lines]
+    # 前两页正常输出，第三页请求失败时输出一行 error 后结束
+    assert [record.get("url", "")[-3:] for record in records[:-1]] == ["ep1", "ep2", "ep3", "ep4"]
+    assert "upstream 502" in records[-1]["error"]
+    assert client.offsets == [2, 4]
+
+def test_stream_error_before_first_page():
+    class FailingShow(StubClient):
+        def show(self, show_id):
+            raise RuntimeError("not found")
+
+    lines = asyncio.run(collect(stream_show_episodes("show1", FailingShow([[1]]))))
+    assert len(lines) == 1
+    assert "not found" in json.loads(lines[0])["error"]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+EpisodeBatcher 的测试：合并查询、按数量和等待时间触发请求、逐条分发结果和错误，以及批次失败或取消时不留下挂起的调用方
+"""
+
+import time
+import asyncio
+
+import pytest
+
+from spotify_client import EpisodeBatcher
+
+class StubClient:
+    """
+    只实现 EpisodeBatcher 用到的 call 和 episodes
+    """
+
+    def __init__(self, missing=(), error=None, short=0, delay=0.0):
+        self.missing = set(missing)
+        self.error = error
+        self.short = short
+        self.delay = delay
+        self.batches = []
+
+    async def call(self, method, *args):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return method(*args)
+
+    def episodes(self, episode_ids):
+        self.batches.append(list(episode_ids))
+        if self.error is not None:
+            raise self.error
+        episodes = [None if episode_id in self.missing else {"id": episode_id} for episode_id in episode_ids]
+        return episodes[:len(episodes) - self.short]
+
+def test_concurrent_lookups_share_one_request():
+    async def main():
+        client = StubClient()
+        batcher = EpisodeBatcher(client, max_size=50, max_wait=0.01)
+        results = await asyncio.gather(batcher.get("a"), batcher.get("b"), batcher.get("a"))
+        assert results == [{"id": "a"}, {"id": "b"}, {"id": "a"}]
+        # 重复的ID只请求一次
+        assert client.batches == [["a", "b"]]
+        assert batcher.stats() == {"requests": 3, "batches": 1, "avg_batch_size": 3.0}
+
+    asyncio.run(main())
+
+def test_flush_when_batch_is_full():
+    async def main():
+        client = StubClient()
+        # 等待时间很长，只有凑满一批才会立即发出
+        batcher = EpisodeBatcher(client, max_size=2, max_wait=60)
+        start = time.monotonic()
+        results = await asyncio.wait_for(asyncio.gather(batcher.get("a"), batcher.get("b")), 1)
+        assert results == [{"id": "a"}, {"id": "b"}]
+        assert time.monotonic() - start < 1
+        assert client.batches == [["a", "b"]]
+
+    asyncio.run(main())
+
+def test_flush_after_max_wait():
+    async def main():
+        client = StubClient()
+        batcher = EpisodeBatcher(client, max_size=50, max_wait=0.05)
+        start = time.monotonic()
+        assert await batcher.get("a") == {"id": "a"}
+        assert time.monotonic() - start >= 0.04
+        assert client.batches == [["a"]]
+
+    asyncio.run(main())
+
+def test_full_batches_split_by_size():
+    async def main():
+        client = StubClient()
+        batcher = EpisodeBatcher(client, max_size=2, max_wait=0.01)
+        ids = ["a", "b", "c", "d", "e"]
+        results = await asyncio.gather(*(batcher.get(episode_id) for episode_id in ids))
+        assert results == [{"id": episode_id} for episode_id in ids]
+        assert client.batches == [["a", "b"], ["c", "d"], ["e"]]
+
+    asyncio.run(main())
+
+def test_missing_episode_fails_only_its_callers():
+    async def main():
+        client = StubClient(missing={"b"})
+        batcher = EpisodeBatcher(client, max_size=50, max_wait=0.01)
+        results = await asyncio.gather(batcher.get("a"), batcher.get("b"), batcher.get("b"), return_exceptions=True)
+        assert results[0] == {"id": "a"}
+        for result in results[1:]:
+            assert isinstance(result, LookupError)
+            assert "b" in str(result)
+
+    asyncio.run(main())
+
+def test_request_error_reaches_every_caller():
+    async def main():
+        error = RuntimeError("upstream 500")
+        batcher = EpisodeBatcher(StubClient(error=error), max_size=50, max_wait=0.01)
+        results = await asyncio.wait_for(asyncio.gather(batcher.get("a"), batcher.get("b"), return_exceptions=True), 1)
+        assert results == [error, error]
+
+    asyncio.run(main())
+
+def test_short_response_does_not_leave_callers_waiting():
+    async def main():
+        batcher = EpisodeBatcher(StubClient(short=1), max_size=50, max_wait=0.01)
+        results = await asyncio.wait_for(asyncio.gather(batcher.get("a"), batcher.get("b"), return_exceptions=True), 1)
+        assert results[0] == {"id": "a"}
+        assert isinstance(results[1], LookupError)
+        assert "未返回" in str(results[1])
+
+    asyncio.run(main())
+
+def test_cancelled_batch_cancels_callers():
+    async def main():
+        batcher = EpisodeBatcher(StubClient(delay=10), max_size=1, max_wait=0.01)
+        caller = asyncio.ensure_future(batcher.get("a"))
+        await asyncio.sleep(0.01)
+        for task in list(batcher._tasks):
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(caller, 1)
+
+    asyncio.run(main())
+
+def test_cancelled_caller_does_not_affect_others():
+    async def main():
+        client = StubClient(delay=0.02)
+        batcher = EpisodeBatcher(client, max_size=50, max_wait=0.01)
+        first = asyncio.ensure_future(batcher.get("a"))
+        second = asyncio.ensure_future(batcher.get("a"))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await asyncio.wait_for(second, 1) == {"id": "a"}
+        assert first.cancelled()
+        assert client.batches == [["a"]]
+
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+冷启动基准测试
+
+多次启动服务进程（生产模式，单工作进程），测量：
+  - import：在新进程中导入 API 模块的耗时
+  - first_response：从启动进程到 /health 第一次返回 200
+  - ready：从启动进程到 /ready 返回 200（预热完成）
+
+输出每项的中位数和最小值。Spotify 在拿到令牌前不会就绪，没有网络或未设置 SPOTIPY_CLIENT_ID /
+SPOTIPY_CLIENT_SECRET（此时用占位凭据启动，只测 first_response）时 ready 显示为超时。
+
+用法：
+    python benchmarks/bench_coldstart.py
+    python benchmarks/bench_coldstart.py --apps xiaohongshu --runs 10 --save benchmarks/coldstart.json
+"""
+
+import os
+import ssl
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPS = {
+    "xiaohongshu": {"dir": os.path.join(ROOT, "0419_xiaohongshu"), "module": "xiaohongshu_api", "server": "xiaohongshu_server.py"},
+    "spotify": {"dir": os.path.join(ROOT, "0420_spotify"), "module": "spotify_api", "server": "spotify_server.py"}
+}
+
+# 自签名证书，不校验
+_INSECURE = ssl.create_default_context()
+_INSECURE.check_hostname = False
+_INSECURE.verify_mode = ssl.CERT_NONE
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def status_of(url: str) -> Optional[int]:
+    """
+    请求一次，返回状态码；连接失败返回 None
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=1, context=_INSECURE) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+def wait_for(url: str, status: int, deadline: float, interval: float = 0.005) -> Optional[float]:
+    """
+    轮询直到返回指定状态码，返回到达时刻；超时返回 None
+    """
+    while time.perf_counter() < deadline:
+        if status_of(url) == status:
+            return time.perf_counter()
+        time.sleep(interval)
+    return None
+
+def measure_import(app: Dict[str, str]) -> float:
+    code = f"import time; t = time.perf_counter(); import {app['module']}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=app["dir"], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def measure_start(app: Dict[str, str], timeout: float) -> Dict[str, Optional[float]]:
+    port = free_port()
+    command = [sys.executable, app["server"], "--prod", "--workers", "1", "--host", "127.0.0.1", "--port", str(port)]
+    scheme = "https" if app["module"] == "spotify_api" else "http"
+    base = f"{scheme}://127.0.0.1:{port}"
+    start = time.perf_counter()
+    env = dict(os.environ)
+    env.setdefault("SPOTIPY_CLIENT_ID", "placeholder")
+    env.setdefault("SPOTIPY_CLIENT_SECRET", "placeholder")
+    process = subprocess.Popen(command, cwd=app["dir"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        first = wait_for(f"{base}/health", 200, deadline)
+        ready = wait_for(f"{base}/ready", 200, deadline) if first else None
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {
+        "first_response": first - start if first else None,
+        "ready": ready - start if ready else None
+    }
+
+def summarize(values: List[Optional[float]]) -> Dict[str, Any]:
+    done = [value for value in values if value is not None]
+    return {
+        "median_ms": round(statistics.median(done) * 1000, 1) if done else None,
+        "min_ms": round(min(done) * 1000, 1) if done else None,
+        "timeouts": len(values) - len(done)
+    }
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "meta": {"python": platform.python_version(), "runs": args.runs, "timeout": args.timeout},
+        "results": {}
+    }
+    for name in args.apps:
+        app = APPS[name]
+        imports, firsts, readies = [], [], []
+        for _ in range(args.runs):
+            imports.append(measure_import(app))
+            result = measure_start(app, args.timeout)
+            firsts.append(result["first_response"])
+            readies.append(result["ready"])
+        report["results"][name] = {
+            "import": summarize(imports),
+            "first_response": summarize(firsts),
+            "ready": summarize(readies)
+        }
+    return report
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Python {report['meta']['python']}，每项 {report['meta']['runs']} 次")
+    print(f"{'应用':<14}{'阶段':<18}{'中位数(ms)':>12}{'最小(ms)':>12}{'超时':>6}")
+    for name, phases in report["results"].items():
+        for phase, stats in phases.items():
+            median = "-" if stats["median_ms"] is None else stats["median_ms"]
+            minimum = "-" if stats["min_ms"] is None else stats["min_ms"]
+            print(f"{name:<14}{phase:<18}{median:>12}{minimum:>12}{stats['timeouts']:>6}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=sorted(APPS))
+    parser.add_argument("--runs", type=int, default=5, help="每个应用启动次数")
+    parser.add_argument("--timeout", type=float, default=20, help="单次启动等待就绪的最长时间（秒）")
+    parser.add_argument("--save", help="把结果保存为 JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"结果已保存到 {args.save}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+压测：启动本地模拟上游和被测服务，按目标 RPS 或并发数请求 /scrape，
+报告吞吐、延迟分位数、错误率以及服务进程的 CPU 和内存
+
+模拟上游在单独的进程中运行：
+  - 小红书：/explore/<笔记ID> 按笔记ID轮流返回仓库中保存的页面，服务通过 HTTP_PROXY 访问它
+  - Spotify：/api/token 返回令牌，/v1/episodes 和 /v1/episodes/<ID> 返回由保存的页面生成的播客集，
+    服务通过 SPOTIFY_AUTH_URL / SPOTIFY_API_URL 访问它
+  - 可配置延迟、抖动、5xx 比例和 429 比例（令牌接口不注入错误）
+
+默认放开服务端的按主机限速，压测的是服务本身；--keep-limits 保留生产环境的限速配置。
+每个请求默认使用不同的笔记/播客集ID（全部未命中缓存）；--keys N 在 N 个ID之间循环，测量缓存命中路径。
+按 --rps 压测时延迟从计划发出的时刻算起，压测端排队的时间也计入延迟。
+
+用法：
+    python benchmarks/bench_load.py --app xiaohongshu --concurrency 32 --duration 20
+    python benchmarks/bench_load.py --app spotify --rps 200 --latency 50 --throttle-rate 0.01
+    python benchmarks/bench_load.py --app xiaohongshu --save benchmarks/load_xiaohongshu.json
+    python benchmarks/bench_load.py --app xiaohongshu --compare benchmarks/load_xiaohongshu.json --tolerance 0.2
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+import html as html_lib
+from collections import Counter
+from urllib.parse import parse_qs, quote, urlparse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+XHS_DIR = os.path.join(ROOT, "0419_xiaohongshu")
+SPOTIFY_DIR = os.path.join(ROOT, "0420_spotify")
+
+# 小红书页面夹具，与 bench_parse.py 使用的页面相同
+XHS_FIXTURES = (
+    os.path.join(XHS_DIR, "xiaohongshu_result.html"),
+    os.path.join(SPOTIFY_DIR, "debug_response.html"),
+    os.path.join(SPOTIFY_DIR, "spotify_response.html")
+)
+# 生成模拟播客集所用的页面
+SPOTIFY_FIXTURE = os.path.join(SPOTIFY_DIR, "debug_response.html")
+
+APPS = {
+    "xiaohongshu": {"dir": XHS_DIR, "server": "xiaohongshu_server.py", "args": []},
+    # 压测使用明文 HTTP，不计入 TLS 开销
+    "spotify": {"dir": SPOTIFY_DIR, "server": "spotify_server.py", "args": ["--ssl-keyfile", "", "--ssl-certfile", ""]}
+}
+
+# 放开按主机限速，避免压测结果只反映限速配置
+LIFTED_LIMITS = {
+    "xiaohongshu": {
+        "XHS_RATE": "100000", "XHS_MAX_RATE": "100000", "XHS_BURST": "100000",
+        "XHS_HOST_CONCURRENCY": "10000", "XHS_HOST_MAX_CONCURRENCY": "10000"
+    },
+    "spotify": {
+        "SPOTIFY_RATE": "100000", "SPOTIFY_MAX_RATE": "100000", "SPOTIFY_BURST": "100000",
+        "SPOTIFY_CONCURRENCY": "10000", "SPOTIFY_MAX_CONCURRENCY": "10000"
+    }
+}
+
+def read_fixture(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def spotify_episode_template() -> Dict[str, Any]:
+    """
+    用保存的 Spotify 页面生成一个播客集（Spotify API 格式），描述中的时间戳整理成逐行格式
+    """
+    page = read_fixture(SPOTIFY_FIXTURE)
+    title = re.search(r"<title>(.*?)</title>", page)
+    description = re.search(r'<meta name="description" content="([^"]*)"', page)
+    description = html_lib.unescape(description.group(1)) if description else ""
+    return {
+        "name": html_lib.unescape(title.group(1)).split(" - ")[0] if title else "模拟播客集",
+        "description": re.sub(r"\s*(\d{1,2}:\d{2}:\d{2})\s+", r"\n\1 - ", description),
+        "release_date": "2025-04-20",
+        "duration_ms": 3723000,
+        "language": "en",
+        "explicit": False,
+        "images": [{"url": "https://i.scdn.co/image/fixture", "height": 640, "width": 640}],
+        "show": {"name": "模拟节目", "external_urls": {"spotify": "https://open.spotify.com/show/fixture"}}
+    }
+
+class Upstream:
+    """
+    模拟上游（ASGI 应用）：按配置注入延迟、5xx 和 429
+    """
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, throttle_rate: float, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.pages = [read_fixture(path).encode("utf-8") for path in XHS_FIXTURES]
+        self.episode = spotify_episode_template()
+
+    def make_episode(self, episode_id: str) -> Dict[str, Any]:
+        url = f"https://open.spotify.com/episode/{episode_id}"
+        return {**self.episode, "id": episode_id, "external_urls": {"spotify": url}}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        # 经 HTTP 代理转发的请求使用绝对形式的地址
+        if path.startswith("http"):
+            path = urlparse(path).path
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+
+        if path == "/":
+            # 就绪探测和预热连接
+            return await self.respond(send, scope, 200, b"", "text/plain")
+        if path == "/api/token":
+            body = {"access_token": "fixture-token", "token_type": "Bearer", "expires_in": 3600}
+            return await self.respond(send, scope, 200, json.dumps(body).encode(), "application/json")
+
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            return await self.respond(send, scope, 429, b"", "text/plain", [(b"retry-after", b"1")])
+        if roll < self.throttle_rate + self.error_rate:
+            return await self.respond(send, scope, 500, b"", "text/plain")
+
+        if path.startswith("/explore/"):
+            note_id = path.rsplit("/", 1)[-1]
+            page = self.pages[int(note_id, 16) % len(self.pages)] if re.fullmatch(r"[0-9a-f]+", note_id) else self.pages[0]
+            return await self.respond(send, scope, 200, page, "text/html; charset=utf-8")
+        # spotipy 批量接口请求的是 episodes/?ids=
+        if path.rstrip("/") == "/v1/episodes":
+            ids = (query.get("ids") or [""])[0].split(",")
+            body = {"episodes": [self.make_episode(episode_id) for episode_id in ids if episode_id]}
+            return await self.respond(send, scope, 200, json.dumps(body).encode(), "application/json")
+        if path.startswith("/v1/episodes/"):
+            body = self.make_episode(path.rsplit("/", 1)[-1])
+            return await self.respond(send, scope, 200, json.dumps(body).encode(), "application/json")
+        return await self.respond(send, scope, 404, b"", "text/plain")
+
+    async def respond(self, send, scope, status: int, body: bytes, content_type: str, headers=None):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())] + (headers or [])
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+def serve_upstream(args: argparse.Namespace) -> None:
+    import uvicorn
+    upstream = Upstream(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.seed)
+    uvicorn.run(upstream, host="127.0.0.1", port=args.port, log_level="warning", access_log=False, lifespan="off")
+
+def _proc_children() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 进程名可能包含空格，从最后一个右括号之后解析
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+def process_tree(pid: int) -> List[int]:
+    """
+    进程及其全部子进程（多工作进程模式下包含 uvicorn 的各个工作进程）
+    """
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return [pid] + [child.pid for child in process.children(recursive=True)]
+        except psutil.Error:
+            return []
+    children = _proc_children()
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children.get(current, []))
+    return pids
+
+def _usage(pid: int) -> Tuple[float, float]:
+    """
+    单个进程的累计 CPU 时间（秒）和常驻内存（字节），没有 psutil 时读取 /proc
+    """
+    if psutil is not None:
+        process = psutil.Process(pid)
+        times = process.cpu_times()
+        return times.user + times.system, process.memory_info().rss
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return cpu, int(line.split()[1]) * 1024
+    return cpu, 0
+
+def cpu_and_rss(pids: List[int]) -> Optional[Dict[str, float]]:
+    """
+    进程组累计 CPU 时间（秒）和当前常驻内存（字节）；既没有 psutil 也没有 /proc 时返回 None
+    """
+    if psutil is None and not os.path.isdir("/proc"):
+        return None
+    # 进程可能在采样期间退出
+    errors = (OSError, ValueError, IndexError) + ((psutil.Error,) if psutil is not None else ())
+    cpu = rss = 0.0
+    for pid in pids:
+        try:
+            process_cpu, process_rss = _usage(pid)
+        except errors:
+            continue
+        cpu += process_cpu
+        rss += process_rss
+    return {"cpu": cpu, "rss": rss}
+
+class ProcessMonitor:
+    """
+    后台线程定时采样服务进程组的常驻内存，记录峰值；start/stop 之间的 CPU 时间用于计算 CPU 占用
+    """
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0.0
+        self.processes = 0
+        self._start: Optional[Dict[str, float]] = None
+        self._started_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        pids = process_tree(self.pid)
+        self.processes = len(pids)
+        usage = cpu_and_rss(pids)
+        if usage:
+            self.peak_rss = max(self.peak_rss, usage["rss"])
+        return usage
+
+    def start(self) -> "ProcessMonitor":
+        self._start = self.sample()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="bench-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        end = self.sample()
+        elapsed = time.perf_counter() - self._started_at
+        if not self._start or not end:
+            return {"cpu_percent": None, "rss_mb": None, "peak_rss_mb": None, "processes": self.processes}
+        return {
+            # 多个工作进程时可能超过 100
+            "cpu_percent": round((end["cpu"] - self._start["cpu"]) / elapsed * 100, 1),
+            "rss_mb": round(end["rss"] / 2 ** 20, 1),
+            "peak_rss_mb": round(self.peak_rss / 2 ** 20, 1),
+            "processes": self.processes
+        }
+
+def target_url(app: str, n: int) -> str:
+    """
+    第 n 个被抓取的链接；小红书使用 http 链接，经 HTTP_PROXY 发往模拟上游
+    """
+    if app == "xiaohongshu":
+        return f"http://www.xiaohongshu.com/explore/{n:024x}"
+    return f"https://open.spotify.com/episode/{n:022d}"
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+async def drive(
+    base: str,
+    make_path: Callable[[int], str],
+    duration: float,
+    warmup: float,
+    concurrency: int,
+    rps: Optional[float],
+    timeout: float
+) -> Dict[str, Any]:
+    """
+    压测主循环；只统计预热结束后开始（或计划开始）的请求
+    """
+    import httpx
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = iter(range(10 ** 12))
+    loop_start = time.perf_counter()
+    window_start = loop_start + warmup
+    window_end = window_start + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=timeout, trust_env=False) as client:
+
+        async def one(scheduled: float) -> None:
+            try:
+                response = await client.get(make_path(next(counter)))
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = e.__class__.__name__
+            finished = time.perf_counter()
+            if window_start <= scheduled < window_end:
+                latencies.append(finished - scheduled)
+                statuses[status] += 1
+
+        if rps:
+            # 开环：按固定间隔发出请求，连接数达到上限时在客户端排队
+            interval = 1 / rps
+            tasks = set()
+            i = 0
+            while True:
+                scheduled = loop_start + i * interval
+                if scheduled >= window_end:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.create_task(one(scheduled))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                i += 1
+            if tasks:
+                await asyncio.wait(tasks, timeout=timeout)
+        else:
+            # 闭环：concurrency 个请求方各自收到响应后立即发出下一个请求
+            async def worker() -> None:
+                while True:
+                    started = time.perf_counter()
+                    if started >= window_end:
+                        return
+                    await one(started)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies.sort()
+    total = len(latencies)
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "requests": total,
+        "rps": round(total / duration, 1),
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(latencies[-1] if latencies else None),
+            "mean": ms(sum(latencies) / total if total else None)
+        },
+        "error_rate": round(1 - ok / total, 4) if total else None,
+        "statuses": dict(statuses)
+    }
+
+def wait_ready(url: str, deadline: float) -> bool:
+    import urllib.error
+    import urllib.request
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.1)
+    return False
+
+def start_process(command: List[str], cwd: str, env: Dict[str, str], log: str) -> subprocess.Popen:
+    output = open(log, "w")
+    return subprocess.Popen(command, cwd=cwd, env=env, stdout=output, stderr=subprocess.STDOUT)
+
+def stop_process(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def app_env(args: argparse.Namespace, upstream: str, workdir: str) -> Dict[str, str]:
+    """
+    被测服务的环境变量：上游指向模拟服务，页面存储和搜索索引放在临时目录
+    """
+    env = {key: value for key, value in os.environ.items() if key.lower() not in ("http_proxy", "https_proxy", "all_proxy", "no_proxy")}
+    if args.app == "xiaohongshu":
+        env.update({
+            "HTTP_PROXY": upstream,
+            "XHS_WARMUP_URL": "",
+            "XHS_PAGE_STORE": os.path.join(workdir, "pages.db"),
+            "XHS_SEARCH_INDEX": os.path.join(workdir, "search.db")
+        })
+    else:
+        env.update({
+            "SPOTIFY_AUTH_URL": f"{upstream}/api/token",
+            "SPOTIFY_API_URL": f"{upstream}/v1/",
+            "SPOTIFY_SEARCH_INDEX": os.path.join(workdir, "search.db"),
+            # 模拟服务不校验凭据
+            "SPOTIPY_CLIENT_ID": "bench-load",
+            "SPOTIPY_CLIENT_SECRET": "bench-load"
+        })
+    if not args.keep_limits:
+        env.update(LIFTED_LIMITS[args.app])
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    app = APPS[args.app]
+    upstream_port = free_port()
+    app_port = free_port()
+    upstream = f"http://127.0.0.1:{upstream_port}"
+    base = f"http://127.0.0.1:{app_port}"
+
+    with tempfile.TemporaryDirectory(prefix="bench-load-") as workdir:
+        upstream_process = start_process(
+            [
+                sys.executable, os.path.abspath(__file__), "--serve-upstream", "--port", str(upstream_port),
+                "--latency", str(args.latency), "--jitter", str(args.jitter),
+                "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate), "--seed", str(args.seed)
+            ],
+            ROOT,
+            dict(os.environ),
+            os.path.join(workdir, "upstream.log")
+        )
+        app_process = None
+        try:
+            if not wait_ready(f"{upstream}/", time.perf_counter() + args.start_timeout):
+                raise RuntimeError("模拟上游启动失败")
+            app_process = start_process(
+                [
+                    sys.executable, app["server"], "--prod", "--workers", str(args.workers),
+                    "--host", "127.0.0.1", "--port", str(app_port)
+                ] + app["args"],
+                app["dir"],
+                app_env(args, upstream, workdir),
+                os.path.join(workdir, "app.log")
+            )
+            if not wait_ready(f"{base}/ready", time.perf_counter() + args.start_timeout):
+                with open(os.path.join(workdir, "app.log"), encoding="utf-8", errors="replace") as f:
+                    print(f.read()[-2000:])
+                raise RuntimeError(f"{args.app} 服务未就绪")
+
+            keys = args.keys
+            offset = random.Random(args.seed).randrange(10 ** 9)
+            make_path = lambda n: "/scrape?url=" + quote(target_url(args.app, offset + (n % keys if keys else n)), safe="")
+            monitor = ProcessMonitor(app_process.pid).start()
+            result = asyncio.run(drive(base, make_path, args.duration, args.warmup, args.concurrency, args.rps, args.timeout))
+            result["server"] = monitor.stop()
+        finally:
+            if app_process is not None:
+                stop_process(app_process)
+            stop_process(upstream_process)
+
+    return {
+        "meta": {
+            "app": args.app,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workers": args.workers,
+            "mode": f"rps={args.rps}" if args.rps else f"concurrency={args.concurrency}",
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "keys": args.keys,
+            "upstream": {
+                "latency_ms": args.latency,
+                "jitter_ms": args.jitter,
+                "error_rate": args.error_rate,
+                "throttle_rate": args.throttle_rate
+            },
+            "limits": "production" if args.keep_limits else "lifted",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "result": result
+    }
+
+def print_report(report: Dict[str, Any]) -> None:
+    meta, result = report["meta"], report["result"]
+    latency, server = result["latency_ms"], result["server"]
+    print(f"{meta['app']}  {meta['mode']}  工作进程 {meta['workers']}  Python {meta['python']}")
+    print(f"上游: 延迟 {meta['upstream']['latency_ms']}±{meta['upstream']['jitter_ms']}ms，"
+          f"5xx {meta['upstream']['error_rate']:.1%}，429 {meta['upstream']['throttle_rate']:.1%}，限速 {meta['limits']}")
+    print(f"请求数 {result['requests']}  RPS {result['rps']}  错误率 {result['error_rate']}")
+    print(f"延迟(ms)  p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"服务进程  CPU {server['cpu_percent']}%  RSS {server['rss_mb']} MB（峰值 {server['peak_rss_mb']} MB），进程数 {server['processes']}")
+    print(f"状态码: {json.dumps(result['statuses'], ensure_ascii=False)}")
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    与基线比较，返回 RPS 下降、p95/p99 上升或错误率上升超过容忍度的指标
+    """
+    current, base = report["result"], baseline.get("result", {})
+    regressions = []
+    if base.get("rps") and current["rps"] < base["rps"] * (1 - tolerance):
+        regressions.append(f"RPS: {base['rps']} -> {current['rps']}")
+    for name in ("p95", "p99"):
+        before, after = base.get("latency_ms", {}).get(name), current["latency_ms"][name]
+        if before and after and after > before * (1 + tolerance):
+            regressions.append(f"{name}: {before}ms -> {after}ms")
+    if base.get("error_rate") is not None and current["error_rate"] is not None:
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"错误率: {base['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="本地模拟上游的压测")
+    parser.add_argument("--app", choices=sorted(APPS), default="xiaohongshu")
+    parser.add_argument("--rps", type=float, default=None, help="目标 RPS（开环）；不指定时按 --concurrency 闭环压测")
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="并发数；按 RPS 压测时为最大连接数")
+    parser.add_argument("-d", "--duration", type=float, default=20, help="统计时长（秒）")
+    parser.add_argument("--warmup", type=float, default=3, help="预热时长（秒），期间的请求不统计")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="服务工作进程数")
+    parser.add_argument("--keys", type=int, default=0, help="在 N 个ID之间循环（测量缓存命中）；0 表示每个请求使用新ID")
+    parser.add_argument("--timeout", type=float, default=30, help="单个请求超时（秒）")
+    parser.add_argument("--latency", type=float, default=20, help="模拟上游的平均延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=5, help="延迟抖动（毫秒，均匀分布）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟上游返回 500 的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="模拟上游返回 429 的比例")
+    parser.add_argument("--keep-limits", action="store_true", help="保留服务端的按主机限速配置")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="额外传给服务的环境变量，可重复")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start-timeout", type=float, default=30, help="等待上游和服务就绪的最长时间（秒）")
+    parser.add_argument("--save", help="把结果保存为基线 JSON")
+    parser.add_argument("--compare", help="与基线 JSON 比较")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的 RPS 下降和延迟上升比例")
+    parser.add_argument("--serve-upstream", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.serve_upstream:
+        serve_upstream(args)
+        return 0
+
+    report = run(args)
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"基线已保存到 {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\n性能回退：")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n未发现性能回退")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+离线解析基准测试
+
+使用仓库中保存的页面（以及按比例放大的合成页面）测量：
+  - 小红书提取：初始状态 JSON、解析树构建、DOM 提取、整体 extract_note
+  - Spotify 描述处理：extract_timestamps、format_duration
+
+输出每个用例每个阶段的 ops/sec、平均耗时和峰值内存，可保存为基线 JSON 并与基线比较。
+
+用法：
+    python benchmarks/bench_parse.py
+    python benchmarks/bench_parse.py --save benchmarks/baseline.json
+    python benchmarks/bench_parse.py --compare benchmarks/baseline.json --tolerance 0.2
+"""
+
+import os
+import re
+import sys
+import json
+import html as html_lib
+import time
+import platform
+import argparse
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+XHS_DIR = os.path.join(ROOT, "0419_xiaohongshu")
+SPOTIFY_DIR = os.path.join(ROOT, "0420_spotify")
+sys.path.insert(0, XHS_DIR)
+sys.path.insert(0, SPOTIFY_DIR)
+
+import xiaohongshu_extract
+from xiaohongshu_extract import build_tree, extract_from_dom, extract_from_state, extract_note
+from spotify_api import extract_timestamps, format_duration
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/67f0a1b2c3d4e5f6a7b8c9d0"
+
+def read_fixture(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def scale_html(html: str, factor: int) -> str:
+    """
+    把 body 内容重复 factor 次，得到放大的页面
+    """
+    start = html.find("<body")
+    start = html.find(">", start) + 1
+    end = html.rfind("</body>")
+    if start <= 0 or end == -1:
+        return html * factor
+    return html[:start] + html[start:end] * factor + html[end:]
+
+def synthetic_state_page(images: int) -> str:
+    """
+    生成带 window.__INITIAL_STATE__ 的合成笔记页面
+    """
+    note_id = NOTE_URL.rsplit("/", 1)[-1]
+    image_list = []
+    for i in range(images):
+        image_list.append({
+            "urlDefault": f"http://sns-webpic-qc.xhscdn.com/202504/{i:08x}/1040g{i:016x}!nd_dft_wlteh_webp_3",
+            "urlPre": f"http://sns-webpic-qc.xhscdn.com/202504/{i:08x}/1040g{i:016x}!nd_prv_wlteh_webp_3",
+            "width": 1080,
+            "height": 1440
+        })
+    state = {
+        "note": {
+            "currentNoteId": note_id,
+            "noteDetailMap": {
+                note_id: {
+                    "note": {
+                        "noteId": note_id,
+                        "title": "合成笔记标题",
+                        "desc": "合成笔记正文。" * 200,
+                        "user": {"nickname": "合成作者", "avatar": None},
+                        "imageList": image_list
+                    }
+                }
+            }
+        }
+    }
+    blob = json.dumps(state, ensure_ascii=False).replace("null", "undefined")
+    padding = "<div class=\"feeds\">" + "<section><a href=\"/x\"><span>推荐</span></a></section>" * 500 + "</div>"
+    return (
+        "<!DOCTYPE html><html><head><title>合成笔记标题 - 小红书</title></head><body>"
+        f"{padding}<script>window.__INITIAL_STATE__={blob}</script></body></html>"
+    )
+
+def spotify_description(page: str) -> str:
+    """
+    从 Spotify 页面的 meta description 中取出节目描述，并把时间戳整理成逐行格式
+    """
+    match = re.search(r'<meta name="description" content="([^"]*)"', page)
+    description = html_lib.unescape(match.group(1)) if match else ""
+    # 页面中的时间戳连在一起，拆成 "00:00:00 - 标题" 的行
+    return re.sub(r"\s*(\d{1,2}:\d{2}:\d{2})\s+", r"\n\1 - ", description)
+
+def synthetic_description(lines: int) -> str:
+    parts = ["这是一段合成的节目描述。" * 20]
+    for i in range(lines):
+        parts.append(f"{i // 3600:02d}:{(i // 60) % 60:02d}:{i % 60:02d} - 第 {i} 段 章节标题")
+    return "\n".join(parts)
+
+def measure(func: Callable[[], Any], min_time: float, min_rounds: int) -> Dict[str, float]:
+    """
+    重复执行直到达到最短时间，返回 ops/sec、平均耗时和峰值内存
+    """
+    func()  # 预热
+    rounds = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while rounds < min_rounds or elapsed < min_time:
+        func()
+        rounds += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rounds": rounds,
+        "ops_per_sec": round(rounds / elapsed, 2),
+        "mean_ms": round(elapsed / rounds * 1000, 4),
+        "peak_kib": round(peak / 1024, 1)
+    }
+
+def xiaohongshu_cases(scale: int) -> Dict[str, str]:
+    result_page = read_fixture(os.path.join(XHS_DIR, "xiaohongshu_result.html"))
+    debug_page = read_fixture(os.path.join(SPOTIFY_DIR, "debug_response.html"))
+    spotify_page = read_fixture(os.path.join(SPOTIFY_DIR, "spotify_response.html"))
+    return {
+        "xhs_result": result_page,
+        "spotify_debug_page": debug_page,
+        "spotify_response_page": spotify_page,
+        f"xhs_result_x{scale}": scale_html(result_page, scale),
+        "synthetic_state_200img": synthetic_state_page(200)
+    }
+
+def spotify_cases(scale: int) -> Dict[str, str]:
+    page = read_fixture(os.path.join(SPOTIFY_DIR, "debug_response.html"))
+    return {
+        "debug_response_description": spotify_description(page),
+        f"synthetic_{scale * 25}_timestamps": synthetic_description(scale * 25)
+    }
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    backend = xiaohongshu_extract.resolve_backend(args.backend)
+
+    for name, page in xiaohongshu_cases(args.scale).items():
+        stages = {
+            "state": lambda page=page: extract_from_state(page, NOTE_URL),
+            "tree": lambda page=page: build_tree(page, backend),
+            "dom": lambda page=page: extract_from_dom(page, NOTE_URL, backend),
+            "extract_note": lambda page=page: extract_note(page, NOTE_URL, backend)
+        }
+        results[f"xhs/{name}"] = {
+            "bytes": len(page.encode("utf-8")),
+            "stages": {stage: measure(func, args.min_time, args.min_rounds) for stage, func in stages.items()}
+        }
+
+    durations = list(range(0, 4 * 3600 * 1000, 7919))
+    for name, description in spotify_cases(args.scale).items():
+        stages = {
+            "extract_timestamps": lambda description=description: extract_timestamps(description),
+        }
+        results[f"spotify/{name}"] = {
+            "bytes": len(description.encode("utf-8")),
+            "stages": {stage: measure(func, args.min_time, args.min_rounds) for stage, func in stages.items()}
+        }
+    results["spotify/format_duration_x%d" % len(durations)] = {
+        "bytes": 0,
+        "stages": {
+            "format_duration": measure(
+                lambda: [format_duration(ms) for ms in durations],
+                args.min_time,
+                args.min_rounds
+            )
+        }
+    }
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parser_backend": backend,
+            "scale": args.scale,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"解析器: {report['meta']['parser_backend']}  Python {report['meta']['python']}")
+    print(f"{'用例':<42}{'阶段':<20}{'ops/sec':>12}{'平均(ms)':>12}{'峰值(KiB)':>12}")
+    for case, data in report["results"].items():
+        for stage, stats in data["stages"].items():
+            print(f"{case:<42}{stage:<20}{stats['ops_per_sec']:>12}{stats['mean_ms']:>12}{stats['peak_kib']:>12}")
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    与基线比较，返回 ops/sec 下降超过容忍度的阶段
+    """
+    regressions = []
+    for case, data in report["results"].items():
+        base_case = baseline.get("results", {}).get(case)
+        if not base_case:
+            continue
+        for stage, stats in data["stages"].items():
+            base = base_case["stages"].get(stage)
+            if not base or not base["ops_per_sec"]:
+                continue
+            change = stats["ops_per_sec"] / base["ops_per_sec"] - 1
+            if change < -tolerance:
+                regressions.append(
+                    f"{case} {stage}: {base['ops_per_sec']} -> {stats['ops_per_sec']} ops/sec ({change:+.1%})"
+                )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="离线解析基准测试")
+    parser.add_argument("--backend", default=None, help="解析器后端：auto、lxml、html.parser")
+    parser.add_argument("--scale", type=int, default=20, help="合成页面的放大倍数")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个阶段最短测量时间（秒）")
+    parser.add_argument("--min-rounds", type=int, default=5, help="每个阶段最少执行次数")
+    parser.add_argument("--save", help="把结果保存为基线 JSON")
+    parser.add_argument("--compare", help="与基线 JSON 比较")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的 ops/sec 下降比例")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"基线已保存到 {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\n性能回退：")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n未发现性能回退")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+两个应用各自保留一份的通用模块必须保持一致
+
+小红书和 Spotify 两个应用分别部署、互不导入，通用模块各有一份。
+这里把两份中的应用名和环境变量前缀统一后比较，防止只修改了其中一份。
+"""
+
+import os
+import ast
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPS = {
+    "xiaohongshu": (os.path.join(ROOT, "0419_xiaohongshu"), (("XHS_", "APP_"), ("xiaohongshu", "app"), ("xhs", "app"))),
+    "spotify": (os.path.join(ROOT, "0420_spotify"), (("SPOTIFY_", "APP_"), ("Spotify", "app"), ("spotify", "app")))
+}
+
+# 除说明注释外逐行相同
+IDENTICAL = ("metrics", "profiling")
+# 代码相同，环境变量默认值、提示文字和文档字符串可以不同
+SAME_CODE = ("ratelimit", "jobs")
+# 只有分词和查询部分相同
+SEARCH_FUNCTIONS = (
+    "split_runs", "run_tokens", "index_tokens", "index_text",
+    "parse_query", "match_expression", "phrase_matches", "make_snippet"
+)
+
+def read_normalized(app: str, module: str) -> str:
+    directory, replacements = APPS[app]
+    with open(os.path.join(directory, f"{app}_{module}.py"), encoding="utf-8") as f:
+        text = f.read()
+    for old, new in replacements:
+        text = text.replace(old, new)
+    return text
+
+def without_mirror_note(text: str) -> str:
+    """
+    去掉文件开头指向另一份的说明注释
+    """
+    return "\n".join(line for line in text.splitlines() if not line.startswith("# 与 ") and "test_mirrored_modules" not in line)
+
+class _MaskStrings(ast.NodeTransformer):
+    def visit_Constant(self, node: ast.Constant) -> ast.Constant:
+        if isinstance(node.value, str):
+            return ast.copy_location(ast.Constant(value=""), node)
+        return node
+
+def code_shape(node: ast.AST) -> str:
+    """
+    语法树去掉字符串常量（文档、提示文字、环境变量默认值）后的结构
+    """
+    return ast.dump(_MaskStrings().visit(node))
+
+@pytest.mark.parametrize("module", IDENTICAL)
+def test_identical_modules(module):
+    assert without_mirror_note(read_normalized("xiaohongshu", module)) == without_mirror_note(read_normalized("spotify", module))
+
+@pytest.mark.parametrize("module", SAME_CODE)
+def test_same_code(module):
+    xhs = ast.parse(read_normalized("xiaohongshu", module))
+    spotify = ast.parse(read_normalized("spotify", module))
+    assert code_shape(xhs) == code_shape(spotify)
+
+@pytest.mark.parametrize("name", SEARCH_FUNCTIONS)
+def test_same_tokenizer(name):
+    shapes = []
+    for app in APPS:
+        tree = ast.parse(read_normalized(app, "search"))
+        functions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+        shapes.append(code_shape(functions[name]))
+    assert shapes[0] == shapes[1]